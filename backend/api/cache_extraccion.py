@@ -0,0 +1,181 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from api.models import db, CacheExtraccion
+
+
+# Caché de resultados de la IA en dos niveles:
+#   1) memoria del proceso: LRU acotado con TTL por entrada
+#   2) tabla cache_extraccion: compartida entre workers, con expiración
+# La clave es el texto normalizado más la fecha de referencia, porque "mañana" depende de hoy.
+
+def normalizar_texto(texto):
+    texto = unicodedata.normalize("NFC", texto).lower().strip()
+    texto = re.sub(r"\s+", " ", texto)
+    return texto.rstrip(" .!?¡¿")
+
+
+def clave_cache(texto, hoy):
+    crudo = f"{hoy.isoformat()}|{normalizar_texto(texto)}"
+    return hashlib.sha256(crudo.encode("utf-8")).hexdigest()
+
+
+class CacheLRU:
+    def __init__(self, maximo=1024, ttl=24 * 3600):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            valor, expira = entrada
+            if expira <= time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor, ttl=None):
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + (ttl or self.ttl))
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def borrar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class CacheExtraccionIA:
+    def __init__(self, maximo_memoria=1024, maximo_db=50000, ttl=24 * 3600, purgar_cada=200, refrescar_uso=300):
+        self.memoria = CacheLRU(maximo_memoria, ttl)
+        self.maximo_db = maximo_db
+        self.ttl = ttl
+        self.purgar_cada = purgar_cada
+        # Un acierto en la tabla actualiza 'usado' solo si tiene más de esto (s): una escritura
+        # por entrada cada tanto, no una por lectura
+        self.refrescar_uso = refrescar_uso
+        self._lock = threading.Lock()
+        self._escrituras = 0
+        self.hits_memoria = 0
+        self.hits_db = 0
+        self.misses = 0
+
+    def _contar(self, campo):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def get(self, texto, hoy):
+        clave = clave_cache(texto, hoy)
+        valor = self.memoria.get(clave)
+        if valor is not None:
+            self._contar("hits_memoria")
+            return dict(valor)
+
+        # Segundo nivel: la tabla compartida (conexión propia para no tocar la sesión del request)
+        try:
+            with db.engine.connect() as conn:
+                fila = conn.execute(
+                    db.select(CacheExtraccion.resultado, CacheExtraccion.expira, CacheExtraccion.usado)
+                    .where(CacheExtraccion.clave == clave)
+                ).first()
+        except Exception as ex:
+            print(f"Error leyendo caché de extracción: {ex}")
+            fila = None
+
+        ahora = datetime.now()
+        if fila is not None and fila.expira > ahora:
+            valor = json.loads(fila.resultado)
+            restante = (fila.expira - ahora).total_seconds()
+            self.memoria.set(clave, valor, ttl=restante)
+            self._contar("hits_db")
+            if fila.usado is None or (ahora - fila.usado).total_seconds() > self.refrescar_uso:
+                self._marcar_uso(clave, ahora)
+            return dict(valor)
+
+        self._contar("misses")
+        return None
+
+    def _marcar_uso(self, clave, ahora):
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(db.update(CacheExtraccion).where(CacheExtraccion.clave == clave).values(usado=ahora))
+        except Exception as ex:
+            print(f"Error actualizando uso de caché de extracción: {ex}")
+
+    def set(self, texto, hoy, valor):
+        clave = clave_cache(texto, hoy)
+        self.memoria.set(clave, dict(valor))
+        ahora = datetime.now()
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(db.delete(CacheExtraccion).where(CacheExtraccion.clave == clave))
+                conn.execute(db.insert(CacheExtraccion).values(
+                    clave=clave,
+                    resultado=json.dumps(valor, ensure_ascii=False),
+                    expira=ahora + timedelta(seconds=self.ttl),
+                    creado=ahora,
+                    usado=ahora
+                ))
+        except Exception as ex:
+            print(f"Error guardando caché de extracción: {ex}")
+            return
+
+        with self._lock:
+            self._escrituras += 1
+            toca_purgar = self._escrituras % self.purgar_cada == 0
+        if toca_purgar:
+            try:
+                self.purgar()
+            except Exception as ex:
+                print(f"Error purgando caché de extracción: {ex}")
+
+    def purgar(self):
+        """Borra entradas vencidas y, si la tabla supera maximo_db, las usadas hace más tiempo (LRU)."""
+        ahora = datetime.now()
+        with db.engine.begin() as conn:
+            conn.execute(db.delete(CacheExtraccion).where(CacheExtraccion.expira <= ahora))
+            total = conn.execute(db.select(db.func.count()).select_from(CacheExtraccion)).scalar()
+            if total > self.maximo_db:
+                limite = conn.execute(
+                    db.select(CacheExtraccion.usado)
+                    .order_by(CacheExtraccion.usado.desc())
+                    .offset(self.maximo_db).limit(1)
+                ).scalar()
+                conn.execute(db.delete(CacheExtraccion).where(CacheExtraccion.usado <= limite))
+
+    def serialize(self):
+        total = self.hits_memoria + self.hits_db + self.misses
+        return {
+            "hitsMemoria": self.hits_memoria,
+            "hitsDB": self.hits_db,
+            "misses": self.misses,
+            "tasaAciertos": round((self.hits_memoria + self.hits_db) / total, 4) if total else 0.0,
+            "entradasMemoria": len(self.memoria)
+        }
+
+
+cache_extraccion = CacheExtraccionIA(
+    maximo_memoria=int(os.getenv('CACHE_IA_MAXIMO_MEMORIA', 1024)),
+    maximo_db=int(os.getenv('CACHE_IA_MAXIMO_DB', 50000)),
+    ttl=int(os.getenv('CACHE_IA_TTL', 24 * 3600))
+)
@@ -0,0 +1,94 @@
+import time
+import threading
+from contextlib import contextmanager
+
+from api.metricas import metricas
+
+
+class CircuitoAbierto(Exception):
+    pass
+
+
+class Circuito:
+    """
+    Circuit breaker para una dependencia externa. Cuenta como fallo una excepción o una llamada
+    que tardó más de 'lenta' segundos; con 'umbral' fallos seguidos se abre y durante 'apertura'
+    segundos rechaza enseguida (CircuitoAbierto) en vez de dejar colgados a los workers.
+    Pasado ese tiempo deja pasar una sola llamada de prueba (semiabierto): si sale bien se
+    cierra, si no vuelve a abrirse.
+    """
+
+    CERRADO, SEMIABIERTO, ABIERTO = 'cerrado', 'semiabierto', 'abierto'
+    VALORES = {CERRADO: 0, SEMIABIERTO: 1, ABIERTO: 2}
+
+    def __init__(self, nombre, umbral=5, lenta=None, apertura=30.0):
+        self.nombre = nombre
+        self.umbral = umbral
+        self.lenta = lenta
+        self.apertura = apertura
+        self._estado = self.CERRADO
+        self._fallos = 0
+        self._abierto_desde = None
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+        metricas.circuito_estado.set(0, nombre)
+
+    def _cambiar(self, estado):
+        if estado == self._estado:
+            return
+        print(f"Circuito {self.nombre}: {self._estado} -> {estado}")
+        self._estado = estado
+        metricas.circuito_estado.set(self.VALORES[estado], self.nombre)
+
+    @property
+    def estado(self):
+        with self._lock:
+            return self._estado
+
+    def permitir(self):
+        with self._lock:
+            if self._estado == self.ABIERTO:
+                if time.monotonic() - self._abierto_desde < self.apertura:
+                    metricas.circuito_rechazos.inc(self.nombre)
+                    return False
+                self._cambiar(self.SEMIABIERTO)
+            if self._estado == self.SEMIABIERTO:
+                if self._prueba_en_curso:
+                    metricas.circuito_rechazos.inc(self.nombre)
+                    return False
+                self._prueba_en_curso = True
+            return True
+
+    def registrar(self, exito, duracion):
+        with self._lock:
+            self._prueba_en_curso = False
+            lenta = self.lenta is not None and duracion > self.lenta
+            if exito and not lenta:
+                self._fallos = 0
+                self._cambiar(self.CERRADO)
+                return
+            metricas.circuito_fallos.inc(self.nombre, 'lenta' if exito else 'error')
+            self._fallos += 1
+            if self._estado == self.SEMIABIERTO or self._fallos >= self.umbral:
+                self._abierto_desde = time.monotonic()
+                self._cambiar(self.ABIERTO)
+
+    @contextmanager
+    def llamada(self):
+        if not self.permitir():
+            raise CircuitoAbierto(f"Circuito {self.nombre} abierto")
+        inicio = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.registrar(False, time.perf_counter() - inicio)
+            raise
+        self.registrar(True, time.perf_counter() - inicio)
+
+    def serialize(self):
+        with self._lock:
+            restante = 0.0
+            if self._estado == self.ABIERTO:
+                restante = max(0.0, self.apertura - (time.monotonic() - self._abierto_desde))
+            return {'estado': self._estado, 'fallosSeguidos': self._fallos,
+                    'segundosParaReintentar': round(restante, 1)}
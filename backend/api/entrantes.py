@@ -0,0 +1,118 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from api.models import db, MensajeEntrante
+
+
+class ProcesadorEntrantes:
+    """
+    Pool de workers que procesa los mensajes de WhatsApp ya registrados por el webhook.
+    El manejador recibe (telefono, cuerpo) y devuelve una etiqueta que se guarda como resultado.
+    Un hilo aparte barre cada 'recuperar_despues' segundos los mensajes que quedaron sin procesar
+    (p. ej. por un reinicio justo después de recibirlos) y los vuelve a encolar.
+    """
+
+    def __init__(self, workers=4, recuperar_despues=30):
+        self.app = None
+        self.manejador = None
+        self.workers = workers
+        # Los pendientes más viejos que esto (p. ej. tras un reinicio) se vuelven a encolar, igual
+        # que los que quedaron 'procesando' desde hace más que esto (el worker murió a mitad)
+        self.recuperar_despues = recuperar_despues
+        self._pool = None
+        self._hilo = None
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+
+    def init_app(self, app, manejador):
+        self.app = app
+        self.manejador = manejador
+        self.workers = int(os.getenv('WEBHOOK_WORKERS', self.workers))
+        self.recuperar_despues = int(os.getenv('WEBHOOK_RECUPERAR_DESPUES', self.recuperar_despues))
+
+    def iniciar(self):
+        if self._pool is not None:
+            return
+        with self._lock:
+            if self._pool is not None:
+                return
+            self._detener.clear()
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='webhook')
+            self._hilo = threading.Thread(target=self._bucle, name='recuperar-entrantes', daemon=True)
+            self._hilo.start()
+
+    def detener(self, esperar=True):
+        with self._lock:
+            if self._pool is not None:
+                self._detener.set()
+                self._hilo.join()
+                self._pool.shutdown(wait=esperar)
+                self._hilo = None
+                self._pool = None
+
+    def encolar(self, id_mensaje):
+        self.iniciar()
+        return self._pool.submit(self._procesar, id_mensaje)
+
+    def _reclamable(self, limite):
+        # Pendiente, o 'procesando' con un reclamo vencido
+        return db.or_(
+            MensajeEntrante.estado == 'pendiente',
+            db.and_(MensajeEntrante.estado == 'procesando', MensajeEntrante.reclamado <= limite)
+        )
+
+    def _bucle(self):
+        # La primera pasada es al iniciar; después, cada 'recuperar_despues'
+        while not self._detener.is_set():
+            try:
+                self._recuperar_pendientes()
+            except Exception as ex:
+                print(f"Error recuperando mensajes entrantes: {ex}")
+            self._detener.wait(self.recuperar_despues)
+
+    def _recuperar_pendientes(self):
+        with self.app.app_context():
+            limite = datetime.now() - timedelta(seconds=self.recuperar_despues)
+            ids = [fila.idMensaje for fila in db.session.query(MensajeEntrante.idMensaje).filter(
+                self._reclamable(limite),
+                MensajeEntrante.recibido <= limite
+            )]
+        for id_mensaje in ids:
+            self._pool.submit(self._procesar, id_mensaje)
+
+    def _procesar(self, id_mensaje):
+        with self.app.app_context():
+            # Reclamamos el mensaje; si otro worker ya lo tomó (y no venció), no hacemos nada
+            ahora = datetime.now()
+            reclamado = db.session.execute(
+                db.update(MensajeEntrante)
+                .where(MensajeEntrante.idMensaje == id_mensaje,
+                       self._reclamable(ahora - timedelta(seconds=self.recuperar_despues)))
+                .values(estado='procesando', reclamado=ahora)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            if not reclamado:
+                return None
+
+            mensaje = db.session.get(MensajeEntrante, id_mensaje)
+            try:
+                resultado = self.manejador(mensaje.telefono, mensaje.cuerpo)
+                estado = 'procesado'
+            except Exception as ex:
+                print(f"Error procesando el mensaje entrante {id_mensaje}: {ex}")
+                db.session.rollback()
+                resultado = f"Error: {ex}"
+                estado = 'error'
+
+            mensaje = db.session.get(MensajeEntrante, id_mensaje)
+            mensaje.estado = estado
+            mensaje.resultado = (resultado or "")[:50]
+            mensaje.procesado = datetime.now()
+            db.session.commit()
+            return resultado
+
+
+procesador_entrantes = ProcesadorEntrantes()
@@ -0,0 +1,89 @@
+import re
+import unicodedata
+
+from api.metricas import metricas
+
+
+# Tabla de intenciones del bot de WhatsApp, en orden de prioridad (gana la primera que coincide).
+# Tipos de regla:
+#   exacto  -> el mensaje completo es una de las frases
+#   opcion  -> el mensaje es la frase, sola o seguida de signos ("1", "1.", "1)"; no "1 de mayo")
+#   palabra -> la frase aparece en cualquier parte como palabra(s) completa(s)
+#   regex   -> expresión regular tal cual (sobre el texto ya normalizado)
+# Las frases se escriben normalizadas: minúsculas y sin acentos.
+INTENCIONES = [
+    ('menu', 'exacto', ['hola', 'menu', 'opciones', 'que tal', 'buenas', 'buenas tardes', 'buenas noches']),
+    ('mas', 'exacto', ['mas', 'ver mas']),
+    ('crear', 'opcion', ['1']),
+    ('crear', 'palabra', ['crear tarea']),
+    ('nueva_tarea', 'palabra', ['manana', 'pasado', 'hoy', 'am', 'pm', 'agendar', 'a las', 'para el', 'el', 'dia',
+                                'lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo']),
+    # "10am", "18hs" (la hora pegada al número no tiene borde de palabra), "30/10", "2 de julio"
+    ('nueva_tarea', 'regex', [r'\b\d{1,2}(?::\d{2})?(?:am|pm|hs)\b', r'\b\d{1,2}/\d{1,2}\b',
+                              r'\b\d{1,2} de (?:enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre'
+                              r'|setiembre|octubre|noviembre|diciembre)\b']),
+    ('ver', 'opcion', ['2']),
+    ('ver', 'palabra', ['ver tarea', 'ver tareas', 'pendiente', 'pendientes']),
+]
+
+
+def normalizar_mensaje(texto):
+    """Minúsculas, sin acentos y con los espacios colapsados; se hace una sola vez por mensaje."""
+    texto = texto.lower()
+    if not texto.isascii():
+        # NFD separa las tildes; al pasar a ASCII se caen junto con emojis y signos ¿¡
+        texto = unicodedata.normalize('NFD', texto).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(texto.split())
+
+
+def _patron(tipo, frase):
+    if tipo == 'regex':
+        return frase
+    # Los espacios de la frase admiten cualquier cantidad de espacios
+    patron = r'\s+'.join(re.escape(p) for p in frase.split())
+    return '^' + patron + r'\W*$' if tipo == 'opcion' else patron
+
+
+class ClasificadorIntenciones:
+    """
+    Compila la tabla una sola vez: las reglas 'exacto' quedan en un dict y el resto en una única
+    regex con un grupo con nombre por regla (la alternativa en orden de prioridad). Clasificar es
+    un lookup más una pasada de la regex sobre el mensaje, en vez de un `in` por cada frase.
+    """
+
+    def __init__(self, tabla):
+        self.exactos = {}
+        self.grupos = {}  # nombre del grupo -> (prioridad, intención)
+        palabras, expresiones = [], []
+        for prioridad, (intencion, tipo, frases) in enumerate(tabla):
+            if tipo == 'exacto':
+                for frase in frases:
+                    self.exactos.setdefault(normalizar_mensaje(frase), intencion)
+                continue
+            grupo = f'r{prioridad}'
+            self.grupos[grupo] = (prioridad, intencion)
+            alternativa = f"(?P<{grupo}>{'|'.join(_patron(tipo, f) for f in frases)})"
+            # Las opciones pueden terminar en un signo, donde no hay borde de palabra
+            (palabras if tipo == 'palabra' else expresiones).append(alternativa)
+        # Un solo \b...\b alrededor de todas las frases: en las posiciones que no son borde de
+        # palabra la regex descarta enseguida, sin probar cada alternativa
+        patron = r'\b(?:' + '|'.join(palabras) + r')\b'
+        self.regex = re.compile('|'.join([patron] + expresiones))
+
+    def clasificar(self, texto, normalizado=False):
+        """Devuelve el nombre de la intención o None."""
+        if not normalizado:
+            texto = normalizar_mensaje(texto)
+        intencion = self.exactos.get(texto)
+        if intencion is None:
+            mejor = None
+            for coincidencia in self.regex.finditer(texto):
+                candidata = self.grupos[coincidencia.lastgroup]
+                if mejor is None or candidata < mejor:
+                    mejor = candidata
+            intencion = mejor[1] if mejor else None
+        metricas.intenciones.inc(intencion or 'sin_coincidencia')
+        return intencion
+
+
+clasificador_intenciones = ClasificadorIntenciones(INTENCIONES)
@@ -0,0 +1,154 @@
+import os
+import threading
+from bisect import bisect_left, bisect_right
+
+from api.models import db, Usuario, Tarea, Recurrencia
+from api.cache_extraccion import CacheLRU
+from api.recurrencia import expandir_recurrencias
+
+
+MINUTOS_DIA = 24 * 60
+
+
+def a_minutos(hora):
+    return hora.hour * 60 + hora.minute
+
+
+def minutos_a_hora(minutos):
+    minutos = min(minutos, MINUTOS_DIA - 1)
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+def rango_minutos(hora_inicio, hora_fin):
+    inicio = a_minutos(hora_inicio)
+    fin = a_minutos(hora_fin)
+    # Si termina antes de empezar, la tomamos como que sigue hasta el fin del día
+    return inicio, (fin if fin > inicio else MINUTOS_DIA)
+
+
+class IndiceDia:
+    """
+    Intervalos de un usuario en un día, ordenados por inicio. Guarda además el máximo fin
+    acumulado, así saber si [a, b) choca con algo es un bisect + una lectura: O(log n).
+    """
+
+    def __init__(self, intervalos=()):
+        self.intervalos = sorted(intervalos)  # (inicio, fin, idTarea)
+        self.inicios = [i[0] for i in self.intervalos]
+        self._recalcular_maximos(0)
+
+    def _recalcular_maximos(self, desde):
+        if desde == 0:
+            self.max_fin = []
+        else:
+            del self.max_fin[desde:]
+        acumulado = self.max_fin[desde - 1] if desde else 0
+        for inicio, fin, _ in self.intervalos[desde:]:
+            acumulado = max(acumulado, fin)
+            self.max_fin.append(acumulado)
+
+    def hay_solape(self, inicio, fin):
+        # Intervalos que empiezan antes de 'fin'; alguno choca si el mayor fin supera 'inicio'
+        i = bisect_left(self.inicios, fin)
+        return i > 0 and self.max_fin[i - 1] > inicio
+
+    def solapes(self, inicio, fin):
+        if not self.hay_solape(inicio, fin):
+            return []
+        i = bisect_left(self.inicios, fin)
+        return [id_tarea for ini, f, id_tarea in self.intervalos[:i] if f > inicio]
+
+    def agregar(self, inicio, fin, id_tarea):
+        intervalo = (inicio, fin, id_tarea)
+        pos = bisect_right(self.intervalos, intervalo)
+        self.intervalos.insert(pos, intervalo)
+        self.inicios.insert(pos, inicio)
+        self._recalcular_maximos(pos)
+
+    def quitar(self, id_tarea):
+        for pos, intervalo in enumerate(self.intervalos):
+            if intervalo[2] == id_tarea:
+                del self.intervalos[pos]
+                del self.inicios[pos]
+                self._recalcular_maximos(pos)
+                return True
+        return False
+
+    def libres(self, desde, hasta, duracion):
+        """Huecos de al menos 'duracion' minutos dentro de [desde, hasta)."""
+        huecos = []
+        cursor = desde
+        for inicio, fin, _ in self.intervalos:
+            if inicio >= hasta:
+                break
+            if inicio - cursor >= duracion:
+                huecos.append((cursor, inicio))
+            cursor = max(cursor, fin)
+        if hasta - cursor >= duracion:
+            huecos.append((cursor, hasta))
+        return huecos
+
+
+class IndiceIntervalos:
+    """
+    Índices por (usuario, día) en memoria. Cada entrada recuerda la revisión de tareas del usuario
+    con la que se armó; si otra instancia cambió algo, la revisión no coincide y se reconstruye.
+    """
+
+    def __init__(self, maximo=4096, ttl=3600):
+        self._cache = CacheLRU(maximo, ttl)
+        self._lock = threading.Lock()
+
+    def _revision(self, id_usuario):
+        return db.session.query(Usuario.revisionTareas).filter(Usuario.idUsuario == id_usuario).scalar()
+
+    def _construir(self, id_usuario, fecha):
+        # Range scan sobre ix_tarea_usuario_fecha_hora + las ocurrencias recurrentes de ese día
+        filas = db.session.query(Tarea.horaInicio, Tarea.horaFin, Tarea.idTarea).filter(
+            Tarea.idUsuario == id_usuario,
+            Tarea.fecha == fecha,
+            ~db.exists().where(Recurrencia.idTarea == Tarea.idTarea)
+        ).all()
+        intervalos = [(*rango_minutos(ini, fin), id_tarea) for ini, fin, id_tarea in filas]
+        intervalos += [(*rango_minutos(o.horaInicio, o.horaFin), o.idTarea)
+                       for o in expandir_recurrencias(id_usuario, fecha, fecha)]
+        return IndiceDia(intervalos)
+
+    def obtener(self, id_usuario, fecha):
+        """Devuelve (indice, revision); la revisión se pasa luego a registrar_alta/registrar_baja."""
+        revision = self._revision(id_usuario)
+        entrada = self._cache.get((id_usuario, fecha))
+        if entrada is not None and entrada[0] == revision:
+            return entrada[1], revision
+        indice = self._construir(id_usuario, fecha)
+        self._cache.set((id_usuario, fecha), (revision, indice))
+        return indice, revision
+
+    def registrar_alta(self, id_usuario, fecha, hora_inicio, hora_fin, id_tarea, revision_anterior):
+        # Actualización incremental: solo si el índice estaba al día justo antes de este cambio
+        with self._lock:
+            entrada = self._cache.get((id_usuario, fecha))
+            if entrada is None or entrada[0] != revision_anterior:
+                return
+            # Copia: otros hilos pueden estar leyendo el índice anterior
+            indice = IndiceDia(entrada[1].intervalos)
+            indice.agregar(*rango_minutos(hora_inicio, hora_fin), id_tarea)
+            self._cache.set((id_usuario, fecha), (revision_anterior + 1, indice))
+
+    def registrar_baja(self, id_usuario, fecha, id_tarea, revision_anterior):
+        with self._lock:
+            entrada = self._cache.get((id_usuario, fecha))
+            if entrada is None or entrada[0] != revision_anterior:
+                return
+            indice = IndiceDia(entrada[1].intervalos)
+            indice.quitar(id_tarea)
+            self._cache.set((id_usuario, fecha), (revision_anterior + 1, indice))
+
+    def limpiar(self):
+        self._cache.limpiar()
+
+
+indice_intervalos = IndiceIntervalos(
+    maximo=int(os.getenv('INDICE_INTERVALOS_MAXIMO', 4096)),
+    ttl=int(os.getenv('INDICE_INTERVALOS_TTL', 3600))
+)
@@ -0,0 +1,45 @@
+import time
+import threading
+
+
+class TokenBucket:
+    """
+    Limitador de tasa compartido entre hilos: 'tasa' tokens por segundo con ráfagas de hasta
+    'capacidad'. Cada envío consume un token; si no hay, se espera a que se repongan.
+    """
+
+    def __init__(self, tasa, capacidad=None):
+        self.tasa = float(tasa)
+        self.capacidad = float(capacidad if capacidad is not None else max(1.0, self.tasa))
+        self._tokens = self.capacidad
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reponer(self, ahora):
+        self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+
+    def intentar(self, cantidad=1):
+        """Consume sin esperar; False si no alcanzan los tokens."""
+        with self._lock:
+            self._reponer(time.monotonic())
+            if self._tokens >= cantidad:
+                self._tokens -= cantidad
+                return True
+            return False
+
+    def esperar(self, cantidad=1, timeout=None):
+        """Bloquea hasta consumir 'cantidad' tokens; False si antes se cumple el timeout."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._reponer(ahora)
+                if self._tokens >= cantidad:
+                    self._tokens -= cantidad
+                    return True
+                falta = (cantidad - self._tokens) / self.tasa
+            # El sleep va fuera del lock: los demás hilos también calculan su propia espera
+            if limite is not None and ahora + falta > limite:
+                return False
+            time.sleep(falta)
@@ -0,0 +1,323 @@
+import os
+import time
+import random
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from api.models import db, MensajeSaliente
+from api.metricas import metricas
+from api.limites import TokenBucket
+
+
+# ---------------------------- Transportes ----------------------------
+# Un transporte solo sabe entregar un mensaje: send(destino, cuerpo).
+# Si falla debe lanzar una excepción para que el despachador reintente.
+# TransporteLimitado envuelve a cualquiera de ellos con el límite de mensajes por segundo.
+
+class TransporteTwilio:
+    # obtener_client es una función: el cliente de Twilio se crea recién en el primer envío
+    def __init__(self, obtener_client, numero_origen):
+        self.obtener_client = obtener_client
+        self.numero_origen = numero_origen
+
+    def send(self, destino, cuerpo):
+        self.obtener_client().messages.create(
+            from_=self.numero_origen,
+            to=f"whatsapp:{destino}",
+            body=cuerpo
+        )
+
+
+class ErrorTwilio(Exception):
+    def __init__(self, mensaje, status=None):
+        super().__init__(mensaje)
+        self.status = status
+
+
+class TransporteTwilioHttp:
+    """
+    API REST de Twilio (POST .../Messages.json) sobre una sesión HTTP por proceso: las conexiones
+    quedan abiertas (keep-alive) en un pool de hasta 'pool' conexiones y cada envío no paga el
+    handshake TCP+TLS. base_url se puede apuntar a un servidor local para pruebas.
+
+    Reintenta solo lo que seguro no llegó a Twilio: 429, 502/503/504 y errores de conexión
+    (respetando Retry-After). Un timeout de lectura no se reintenta porque el mensaje pudo salir.
+    """
+
+    REINTENTABLES = (429, 502, 503, 504)
+
+    def __init__(self, account_sid, auth_token, numero_origen, base_url='https://api.twilio.com',
+                 pool=10, timeout=10.0, reintentos=2, backoff=0.5):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.numero_origen = numero_origen
+        self.base_url = base_url.rstrip('/')
+        self.pool = pool
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.backoff = backoff
+        self._sesion = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _obtener_sesion(self):
+        # Una sesión por proceso: tras un fork (gunicorn) los sockets del padre no se comparten
+        if self._sesion is None or self._pid != os.getpid():
+            with self._lock:
+                if self._sesion is None or self._pid != os.getpid():
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    sesion = requests.Session()
+                    sesion.auth = (self.account_sid, self.auth_token)
+                    adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool, max_retries=0)
+                    sesion.mount('https://', adaptador)
+                    sesion.mount('http://', adaptador)
+                    self._sesion, self._pid = sesion, os.getpid()
+        return self._sesion
+
+    def send(self, destino, cuerpo):
+        import requests
+
+        url = f"{self.base_url}/2010-04-01/Accounts/{self.account_sid}/Messages.json"
+        datos = {'From': self.numero_origen, 'To': f"whatsapp:{destino}", 'Body': cuerpo}
+        sesion = self._obtener_sesion()
+        for intento in range(self.reintentos + 1):
+            espera = self.backoff * (2 ** intento)
+            try:
+                respuesta = sesion.post(url, data=datos, timeout=self.timeout)
+            except requests.ConnectionError as ex:
+                error, motivo = ErrorTwilio(f"Conexión con Twilio: {ex}"), 'conexion'
+            else:
+                if respuesta.status_code < 300:
+                    return respuesta.json().get('sid')
+                error = ErrorTwilio(f"Twilio {respuesta.status_code}: {respuesta.text[:200]}", respuesta.status_code)
+                if respuesta.status_code not in self.REINTENTABLES:
+                    raise error
+                motivo = str(respuesta.status_code)
+                retry_after = respuesta.headers.get('Retry-After', '')
+                if retry_after.isdigit():
+                    espera = float(retry_after)
+            if intento == self.reintentos:
+                raise error
+            metricas.whatsapp_reintentos.inc(motivo)
+            time.sleep(espera)
+
+
+class EnvioLimitado(Exception):
+    """El token bucket estaba vacío. 'espera' es cuánto falta (s) para que haya lugar."""
+
+    def __init__(self, espera, modo):
+        super().__init__(f"Límite de mensajes por segundo alcanzado (modo {modo})")
+        self.espera = espera
+        self.modo = modo
+
+
+class TransporteLimitado:
+    """
+    Envuelve otro transporte con un token bucket de mensajes por segundo, compartido por todos
+    los hilos del proceso. Con el bucket vacío, según 'modo':
+      bloquear -> espera un token hasta espera_maxima segundos (después, EnvioLimitado)
+      encolar  -> EnvioLimitado enseguida; el despachador lo reprograma sin gastar un intento
+      fallar   -> EnvioLimitado enseguida y cuenta como intento fallido
+    """
+
+    MODOS = ('bloquear', 'encolar', 'fallar')
+
+    def __init__(self, transporte, mensajes_por_segundo, rafaga=None, modo='bloquear', espera_maxima=30.0):
+        if modo not in self.MODOS:
+            raise ValueError(f"Modo de límite desconocido: {modo}")
+        self.transporte = transporte
+        self.limitador = TokenBucket(mensajes_por_segundo, rafaga)
+        self.modo = modo
+        self.espera_maxima = espera_maxima
+
+    def send(self, destino, cuerpo):
+        if not self.limitador.intentar():
+            metricas.whatsapp_limitados.inc(self.modo)
+            if self.modo != 'bloquear' or not self.limitador.esperar(timeout=self.espera_maxima):
+                raise EnvioLimitado(1.0 / self.limitador.tasa, self.modo)
+        return self.transporte.send(destino, cuerpo)
+
+
+class TransporteFalso:
+    """Twilio local para pruebas y corridas de carga: guarda los mensajes en memoria."""
+
+    def __init__(self, latencia=0.0, tasa_fallos=0.0):
+        self.latencia = latencia
+        self.tasa_fallos = tasa_fallos
+        self.enviados = []
+        self._lock = threading.Lock()
+
+    def send(self, destino, cuerpo):
+        if self.latencia:
+            time.sleep(self.latencia)
+        if self.tasa_fallos and random.random() < self.tasa_fallos:
+            raise RuntimeError("Fallo simulado del transporte")
+        with self._lock:
+            self.enviados.append((destino, cuerpo))
+
+
+# ---------------------------- Outbox ----------------------------
+
+def encolar_mensaje(destino, cuerpo):
+    """Agrega el mensaje a la sesión actual. Se persiste con el commit de quien llama."""
+    mensaje = MensajeSaliente(destino=destino, cuerpo=cuerpo, estado='pendiente',
+                              intentos=0, proximoIntento=datetime.now())
+    db.session.add(mensaje)
+    return mensaje
+
+
+class Despachador:
+    """
+    Toma lotes de mensajes pendientes del outbox y los envía con un pool de workers.
+    Los fallos se reintentan con backoff exponencial hasta max_intentos.
+    """
+
+    def __init__(self, app=None, transporte=None, workers=4, lote=20, max_intentos=5,
+                 backoff_base=2.0, backoff_max=300.0, intervalo=1.0, lease=60.0):
+        self.app = app
+        self.transporte = transporte
+        self.workers = workers
+        self.lote = lote
+        self.max_intentos = max_intentos
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.intervalo = intervalo
+        self.lease = lease
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app, transporte):
+        self.app = app
+        self.transporte = transporte
+        self.workers = int(os.getenv('OUTBOX_WORKERS', self.workers))
+        self.lote = int(os.getenv('OUTBOX_LOTE', self.lote))
+        self.max_intentos = int(os.getenv('OUTBOX_MAX_INTENTOS', self.max_intentos))
+        self.backoff_base = float(os.getenv('OUTBOX_BACKOFF_BASE', self.backoff_base))
+        self.intervalo = float(os.getenv('OUTBOX_INTERVALO', self.intervalo))
+
+    # ---- Ciclo de vida del hilo
+    def iniciar(self):
+        if self._hilo is not None:
+            return
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self._detener.clear()
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='outbox')
+            self._hilo = threading.Thread(target=self._bucle, name='despachador-outbox', daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        with self._lock:
+            if self._hilo is None:
+                return
+            self._detener.set()
+            self._despertar.set()
+            self._hilo.join()
+            self._pool.shutdown(wait=True)
+            self._hilo = None
+            self._pool = None
+
+    def notificar(self):
+        self._despertar.set()
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            try:
+                with self.app.app_context():
+                    procesados = self.procesar_lote()
+            except Exception as ex:
+                print(f"Error en despachador de mensajes: {ex}")
+                procesados = 0
+            # Si el lote vino lleno seguimos sin esperar
+            if procesados < self.lote:
+                self._despertar.wait(self.intervalo)
+                self._despertar.clear()
+
+    # ---- Trabajo
+    def reclamar_lote(self):
+        ahora = datetime.now()
+        candidatos = db.session.query(MensajeSaliente.idMensaje).filter(
+            MensajeSaliente.estado.in_(('pendiente', 'enviando')),
+            MensajeSaliente.proximoIntento <= ahora
+        ).order_by(MensajeSaliente.proximoIntento).limit(self.lote).all()
+
+        # UPDATE condicional por fila: si otro proceso lo reclamó primero, rowcount es 0
+        vence = ahora + timedelta(seconds=self.lease)
+        reclamados = []
+        for (id_mensaje,) in candidatos:
+            resultado = db.session.execute(
+                db.update(MensajeSaliente)
+                .where(MensajeSaliente.idMensaje == id_mensaje,
+                       MensajeSaliente.estado.in_(('pendiente', 'enviando')),
+                       MensajeSaliente.proximoIntento <= ahora)
+                .values(estado='enviando', proximoIntento=vence)
+            )
+            if resultado.rowcount:
+                reclamados.append(id_mensaje)
+        db.session.commit()
+
+        if not reclamados:
+            return []
+        return MensajeSaliente.query.filter(MensajeSaliente.idMensaje.in_(reclamados)).all()
+
+    def procesar_lote(self, pool=None):
+        mensajes = self.reclamar_lote()
+        if not mensajes:
+            return 0
+
+        pool = pool or self._pool
+        if pool is None:
+            resultados = [self._enviar(m.destino, m.cuerpo) for m in mensajes]
+        else:
+            resultados = list(pool.map(lambda m: self._enviar(m.destino, m.cuerpo), mensajes))
+
+        ahora = datetime.now()
+        for mensaje, error in zip(mensajes, resultados):
+            if isinstance(error, EnvioLimitado) and error.modo == 'encolar':
+                # No llegó a intentarse: vuelve a la cola sin contar el intento
+                mensaje.estado = 'pendiente'
+                mensaje.proximoIntento = ahora + timedelta(seconds=error.espera)
+                continue
+            mensaje.intentos += 1
+            error = str(error) if error is not None else None
+            if error is None:
+                mensaje.estado = 'enviado'
+                mensaje.enviado = ahora
+                mensaje.ultimoError = None
+            elif mensaje.intentos >= self.max_intentos:
+                mensaje.estado = 'fallido'
+                mensaje.ultimoError = error[:255]
+            else:
+                mensaje.estado = 'pendiente'
+                mensaje.ultimoError = error[:255]
+                espera = min(self.backoff_base ** mensaje.intentos, self.backoff_max)
+                mensaje.proximoIntento = ahora + timedelta(seconds=espera)
+        db.session.commit()
+        return len(mensajes)
+
+    def _enviar(self, destino, cuerpo):
+        try:
+            with metricas.span('whatsapp_envio'):
+                self.transporte.send(destino, cuerpo)
+            return None
+        except EnvioLimitado as ex:
+            return ex
+        except Exception as ex:
+            return str(ex) or ex.__class__.__name__
+
+    def vaciar(self, timeout=10.0):
+        """Procesa en el hilo actual hasta que no queden mensajes listos (útil en pruebas)."""
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            if not self.procesar_lote():
+                return True
+        return False
+
+
+despachador = Despachador()
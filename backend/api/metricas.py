@@ -0,0 +1,228 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import request
+from sqlalchemy import event
+
+
+# Métricas en memoria del proceso, expuestas en formato de texto de Prometheus (/metrics).
+# No hace falta un colector aparte: Prometheus (o un curl) lee directo de la app.
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_SENTENCIAS = (1, 2, 3, 5, 10, 20, 50, 100)
+BUCKETS_TOKENS = (100, 200, 300, 400, 600, 800, 1200, 1600, 3200)
+
+
+def _etiquetas(nombres, valores):
+    if not nombres:
+        return ""
+    pares = []
+    for nombre, valor in zip(nombres, valores):
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pares.append(f'{nombre}="{valor}"')
+    return "{" + ",".join(pares) + "}"
+
+
+class Contador:
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *valores, cantidad=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            items = sorted(self._valores.items())
+        for valores, total in items:
+            lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, valores)} {total}")
+        return lineas
+
+
+class Histograma:
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.buckets = tuple(buckets)
+        self._series = {}  # valores de etiquetas -> [conteos por bucket (+Inf al final), suma]
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *valores):
+        # Se guarda el conteo de cada bucket sin acumular; se acumula recién al exponer
+        posicion = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][posicion] += 1
+            serie[1] += valor
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        nombres = self.etiquetas + ('le',)
+        with self._lock:
+            items = sorted((valores, (list(conteos), suma)) for valores, (conteos, suma) in self._series.items())
+        for valores, (conteos, suma) in items:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + ('+Inf',), conteos):
+                acumulado += conteo
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(nombres, valores + (limite,))} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, valores)} {suma:.6f}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, valores)} {acumulado}")
+        return lineas
+
+
+class Medidor:
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def set(self, valor, *valores):
+        with self._lock:
+            self._valores[valores] = valor
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} gauge"]
+        with self._lock:
+            items = sorted(self._valores.items())
+        for valores, valor in items:
+            lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, valores)} {valor}")
+        return lineas
+
+
+class Metricas:
+    """
+    Latencia por endpoint, sentencias SQL por request (cantidad y tiempo, con eventos del engine)
+    y spans de llamadas externas. init_app registra los hooks de Flask y los eventos de SQLAlchemy.
+    """
+
+    def __init__(self):
+        self.habilitadas = True
+        self._local = threading.local()
+        self.requests = Contador('planificador_http_requests_total', 'Requests atendidos',
+                                 ('endpoint', 'metodo', 'status'))
+        self.latencia = Histograma('planificador_http_request_duration_seconds', 'Latencia por endpoint',
+                                   ('endpoint', 'metodo'))
+        self.sql_por_request = Histograma('planificador_sql_sentencias_por_request',
+                                          'Sentencias SQL ejecutadas en cada request', ('endpoint',),
+                                          buckets=BUCKETS_SENTENCIAS)
+        self.sql_segundos_por_request = Histograma('planificador_sql_segundos_por_request',
+                                                   'Tiempo total en SQL de cada request', ('endpoint',))
+        self.sql_total = Contador('planificador_sql_sentencias_total', 'Sentencias SQL ejecutadas', ('origen',))
+        self.spans = Histograma('planificador_span_duration_seconds',
+                                'Duración de llamadas instrumentadas (envío de WhatsApp, extracción con IA, ...)',
+                                ('span', 'resultado'))
+        self.whatsapp_limitados = Contador('planificador_whatsapp_limitados_total',
+                                           'Envíos que encontraron vacío el límite de mensajes por segundo', ('modo',))
+        self.whatsapp_reintentos = Contador('planificador_whatsapp_reintentos_total',
+                                            'Reintentos de envío a Twilio (429, 5xx, conexión)', ('motivo',))
+        self.intenciones = Contador('planificador_whatsapp_intenciones_total',
+                                    'Mensajes de WhatsApp por intención detectada', ('intencion',))
+        self.circuito_estado = Medidor('planificador_circuito_estado',
+                                       'Estado del circuit breaker (0 cerrado, 1 semiabierto, 2 abierto)', ('circuito',))
+        self.circuito_fallos = Contador('planificador_circuito_fallos_total',
+                                        'Llamadas contadas como fallo por el circuit breaker', ('circuito', 'motivo'))
+        self.circuito_rechazos = Contador('planificador_circuito_rechazos_total',
+                                          'Llamadas rechazadas sin intentar porque el circuito estaba abierto', ('circuito',))
+        self.ia_hedging = Contador('planificador_ia_hedging_total',
+                                   'Pedidos al proveedor de IA secundario (disparado, respaldo) y cuántos ganó', ('resultado',))
+        self.ia_tokens = Contador('planificador_ia_tokens_total',
+                                  'Tokens facturados por el proveedor de IA (prompt, respuesta)', ('proveedor', 'tipo'))
+        self.ia_tokens_prompt = Histograma('planificador_ia_tokens_prompt',
+                                           'Tokens del prompt por llamada al proveedor de IA', ('proveedor',),
+                                           buckets=BUCKETS_TOKENS)
+
+    def init_app(self, app, engine):
+        self.habilitadas = os.getenv('METRICAS_HABILITADAS', '1') == '1'
+        if not self.habilitadas:
+            return
+        app.before_request(self._antes_request)
+        app.after_request(self._despues_request)
+        event.listen(engine, 'before_cursor_execute', self._antes_sql)
+        event.listen(engine, 'after_cursor_execute', self._despues_sql)
+
+    # ---- Requests
+    def _antes_request(self):
+        estado = self._local
+        estado.inicio = time.perf_counter()
+        estado.sql = 0
+        estado.sql_segundos = 0.0
+        estado.en_request = True
+
+    def _despues_request(self, respuesta):
+        estado = self._local
+        if not getattr(estado, 'en_request', False):
+            return respuesta
+        estado.en_request = False
+        duracion = time.perf_counter() - estado.inicio
+        # La regla ("/tarea/<int:id_tarea>") y no la URL, para no crear una serie por id
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'sin_ruta'
+        self.latencia.observar(duracion, endpoint, request.method)
+        self.requests.inc(endpoint, request.method, str(respuesta.status_code))
+        self.sql_por_request.observar(estado.sql, endpoint)
+        self.sql_segundos_por_request.observar(estado.sql_segundos, endpoint)
+        return respuesta
+
+    # ---- SQL
+    def _antes_sql(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metricas_inicio', []).append(time.perf_counter())
+
+    def _despues_sql(self, conn, cursor, statement, parameters, context, executemany):
+        inicios = conn.info.get('metricas_inicio')
+        duracion = time.perf_counter() - inicios.pop() if inicios else 0.0
+        estado = self._local
+        if getattr(estado, 'en_request', False):
+            estado.sql += 1
+            estado.sql_segundos += duracion
+            self.sql_total.inc('request')
+        else:
+            self.sql_total.inc('segundo_plano')
+
+    # ---- Spans
+    @contextmanager
+    def span(self, nombre):
+        inicio = time.perf_counter()
+        resultado = 'ok'
+        try:
+            yield
+        except Exception:
+            resultado = 'error'
+            raise
+        finally:
+            if self.habilitadas:
+                self.spans.observar(time.perf_counter() - inicio, nombre, resultado)
+
+    def medir(self, nombre):
+        """Decorador: registra cada llamada a la función como un span."""
+        def decorador(funcion):
+            @wraps(funcion)
+            def envoltura(*args, **kwargs):
+                with self.span(nombre):
+                    return funcion(*args, **kwargs)
+            return envoltura
+        return decorador
+
+    def exponer(self):
+        lineas = []
+        for metrica in (self.requests, self.latencia, self.sql_por_request, self.sql_segundos_por_request,
+                        self.sql_total, self.spans, self.whatsapp_limitados, self.whatsapp_reintentos,
+                        self.intenciones, self.circuito_estado, self.circuito_fallos, self.circuito_rechazos,
+                        self.ia_hedging, self.ia_tokens, self.ia_tokens_prompt):
+            lineas.extend(metrica.exponer())
+        return "\n".join(lineas) + "\n"
+
+
+metricas = Metricas()
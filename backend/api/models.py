@@ -1,8 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import String, Integer, Date, Time, ForeignKey, Boolean, Float
-from datetime import date, time
-from sqlalchemy.orm import Mapped, mapped_column, relationship, backref
+from sqlalchemy import String, Integer, Date, Time, DateTime, Text, ForeignKey, Boolean, Float
+from datetime import date, time, datetime
+from sqlalchemy.orm import Mapped, mapped_column, relationship, backref, Session
+from sqlalchemy.orm.attributes import get_history
+from sqlalchemy import event
 from sqlalchemy import LargeBinary
+from sqlalchemy.dialects import sqlite, postgresql
 import uuid
 
 
@@ -17,6 +20,8 @@ class Usuario(db.Model):
     email: Mapped[str] = mapped_column(String(120), unique=True, nullable=False)
     clave: Mapped[str] = mapped_column(String(120))
     telefono: Mapped[str] = mapped_column(String(20), unique=True, nullable=False)
+    # Se incrementa con cada alta, baja o cambio de una de sus tareas (ETag de los listados)
+    revisionTareas: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
   
     def serialize(self):
         return {
@@ -31,6 +36,10 @@ class Usuario(db.Model):
 
 class Tarea(db.Model):
     __tablename__ = 'tarea'
+    __table_args__ = (
+        # Índice compuesto para que la consulta semanal sea un range scan por usuario
+        db.Index('ix_tarea_usuario_fecha_hora', 'idUsuario', 'fecha', 'horaInicio'),
+    )
 
     idTarea: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     titulo: Mapped[str] = mapped_column(String(120), nullable=False)
@@ -55,4 +64,310 @@ class Tarea(db.Model):
             'etiqueta': self.etiqueta,
             'imageUrl': self.imageUrl,
             'idUsuario': self.idUsuario
-        }
\ No newline at end of file
+        }
+
+
+# ---------------------------- Recurrencia ----------------------------
+# La tarea "plantilla" guarda título, horario y la fecha de inicio (DTSTART); la regla dice cómo
+# se repite. Las ocurrencias no se guardan: se expanden al listar, solo dentro de la ventana pedida.
+
+class Recurrencia(db.Model):
+    __tablename__ = 'recurrencia'
+
+    idRecurrencia: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    idTarea: Mapped[int] = mapped_column(Integer, ForeignKey('tarea.idTarea'), unique=True, nullable=False)
+    idUsuario: Mapped[int] = mapped_column(Integer, ForeignKey('usuario.idUsuario'), nullable=False, index=True)
+    frecuencia: Mapped[str] = mapped_column(String(10), nullable=False)  # 'diaria' | 'semanal'
+    intervalo: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    diasSemana: Mapped[str] = mapped_column(String(20), nullable=True)  # "0,2,4" (lunes=0), solo semanal
+    hasta: Mapped[date] = mapped_column(Date, nullable=True)
+    cantidad: Mapped[int] = mapped_column(Integer, nullable=True)
+
+    tarea = relationship('Tarea', backref=backref('recurrencia', uselist=False, cascade='all, delete-orphan'))
+
+    def serialize(self):
+        return {
+            'idRecurrencia': self.idRecurrencia,
+            'idTarea': self.idTarea,
+            'frecuencia': self.frecuencia,
+            'intervalo': self.intervalo,
+            'dias': [int(d) for d in self.diasSemana.split(',')] if self.diasSemana else [],
+            'hasta': self.hasta.strftime('%Y-%m-%d') if self.hasta else None,
+            'cantidad': self.cantidad
+        }
+
+
+class ExcepcionRecurrencia(db.Model):
+    __tablename__ = 'excepcion_recurrencia'
+    __table_args__ = (
+        db.UniqueConstraint('idRecurrencia', 'fecha', name='uq_excepcion_recurrencia_fecha'),
+    )
+
+    idExcepcion: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    idRecurrencia: Mapped[int] = mapped_column(Integer, ForeignKey('recurrencia.idRecurrencia'), nullable=False)
+    fecha: Mapped[date] = mapped_column(Date, nullable=False)  # fecha de la ocurrencia afectada
+    cancelada: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    # Si la ocurrencia se editó, estos campos pisan a los de la plantilla
+    titulo: Mapped[str] = mapped_column(String(120), nullable=True)
+    descripcion: Mapped[str] = mapped_column(String(120), nullable=True)
+    horaInicio: Mapped[time] = mapped_column(Time, nullable=True)
+    horaFin: Mapped[time] = mapped_column(Time, nullable=True)
+    etiqueta: Mapped[str] = mapped_column(String(50), nullable=True)
+
+    recurrencia = relationship('Recurrencia', backref=backref('excepciones', lazy=True, cascade='all, delete-orphan'))
+
+
+def incrementar_revision_tareas(conexion, ids_usuario):
+    # UPDATE directo (sin pasar por el ORM) para poder usarlo también dentro de un flush
+    for id_usuario in set(ids_usuario):
+        conexion.execute(
+            Usuario.__table__.update()
+            .where(Usuario.__table__.c.idUsuario == id_usuario)
+            .values(revisionTareas=Usuario.__table__.c.revisionTareas + 1)
+        )
+
+
+@event.listens_for(Session, 'before_flush')
+def _revision_tareas_en_flush(session, flush_context, instances):
+    ids_usuario = [
+        obj.idUsuario
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(obj, (Tarea, Recurrencia)) and obj.idUsuario is not None
+        and (obj not in session.dirty or session.is_modified(obj))
+    ]
+    if ids_usuario:
+        incrementar_revision_tareas(session.connection(), ids_usuario)
+
+
+# ---------------------------- Recordatorio ----------------------------
+# Aviso por WhatsApp minutosAntes del inicio. venceEn es (fecha + horaInicio - minutosAntes) ya calculado,
+# así el programador carga la próxima ventana con un range scan sobre (estado, venceEn).
+# En las tareas recurrentes, al enviarse se reprograma para la ocurrencia siguiente.
+
+class Recordatorio(db.Model):
+    __tablename__ = 'recordatorio'
+    __table_args__ = (
+        db.Index('ix_recordatorio_estado_vence', 'estado', 'venceEn'),
+    )
+
+    idRecordatorio: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    idTarea: Mapped[int] = mapped_column(Integer, ForeignKey('tarea.idTarea'), unique=True, nullable=False)
+    idUsuario: Mapped[int] = mapped_column(Integer, ForeignKey('usuario.idUsuario'), nullable=False)
+    minutosAntes: Mapped[int] = mapped_column(Integer, nullable=False)
+    venceEn: Mapped[datetime] = mapped_column(DateTime, nullable=True)  # None: no quedan ocurrencias
+    estado: Mapped[str] = mapped_column(String(20), nullable=False, default='pendiente')  # pendiente | enviado | vencido
+    enviado: Mapped[datetime] = mapped_column(DateTime, nullable=True)  # último envío
+
+    tarea = relationship('Tarea', backref=backref('recordatorio', uselist=False, cascade='all, delete-orphan'))
+
+    def serialize(self):
+        return {
+            'idRecordatorio': self.idRecordatorio,
+            'idTarea': self.idTarea,
+            'minutosAntes': self.minutosAntes,
+            'venceEn': self.venceEn.strftime('%Y-%m-%d %H:%M') if self.venceEn else None,
+            'estado': self.estado
+        }
+
+
+# ---------------------------- Mensaje saliente (outbox de WhatsApp) ----------------------------
+
+class MensajeSaliente(db.Model):
+    __tablename__ = 'mensaje_saliente'
+    __table_args__ = (
+        # El despachador busca siempre por estado y próximo intento
+        db.Index('ix_mensaje_saliente_estado_proximo', 'estado', 'proximoIntento'),
+    )
+
+    idMensaje: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    destino: Mapped[str] = mapped_column(String(30), nullable=False)
+    cuerpo: Mapped[str] = mapped_column(Text, nullable=False)
+    estado: Mapped[str] = mapped_column(String(20), nullable=False, default='pendiente')
+    intentos: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    proximoIntento: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.now)
+    ultimoError: Mapped[str] = mapped_column(String(255), nullable=True)
+    creado: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.now)
+    enviado: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    def serialize(self):
+        return {
+            'idMensaje': self.idMensaje,
+            'destino': self.destino,
+            'estado': self.estado,
+            'intentos': self.intentos,
+            'ultimoError': self.ultimoError
+        }
+
+
+# ---------------------------- Caché de extracción con IA ----------------------------
+
+class CacheExtraccion(db.Model):
+    __tablename__ = 'cache_extraccion'
+
+    clave: Mapped[str] = mapped_column(String(64), primary_key=True)
+    resultado: Mapped[str] = mapped_column(Text, nullable=False)
+    expira: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+    creado: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.now)
+    # Último acierto (actualizado cada tanto): al pasar de maximo_db se borran los menos usados
+    usado: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.now, index=True)
+
+
+# ---------------------------- Mensaje entrante (webhook de WhatsApp) ----------------------------
+
+class MensajeEntrante(db.Model):
+    __tablename__ = 'mensaje_entrante'
+
+    idMensaje: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # Twilio reintenta con el mismo MessageSid: la restricción única evita procesarlo dos veces
+    messageSid: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    telefono: Mapped[str] = mapped_column(String(30), nullable=False)
+    cuerpo: Mapped[str] = mapped_column(Text, nullable=False)
+    estado: Mapped[str] = mapped_column(String(20), nullable=False, default='pendiente', index=True)
+    resultado: Mapped[str] = mapped_column(String(50), nullable=True)
+    recibido: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.now)
+    # Cuándo lo tomó un worker; un 'procesando' viejo es de un worker que murió y se vuelve a tomar
+    reclamado: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    procesado: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+
+# ---------------------------- Listado de tareas por WhatsApp ----------------------------
+# Dónde quedó el último listado enviado a cada usuario, para que "más" siga desde ahí.
+
+class CursorListadoWhatsapp(db.Model):
+    __tablename__ = 'cursor_listado_whatsapp'
+
+    idUsuario: Mapped[int] = mapped_column(Integer, ForeignKey('usuario.idUsuario'), primary_key=True)
+    cursor: Mapped[str] = mapped_column(String(120), nullable=False)
+    expira: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+# ---------------------------- Resumen diario por WhatsApp ----------------------------
+# Checkpoint del envío del resumen de un día: hasta qué idUsuario se completó. Si la corrida
+# se corta, la siguiente sigue desde ultimoUsuario en vez de empezar de nuevo.
+
+class EjecucionResumenDiario(db.Model):
+    __tablename__ = 'ejecucion_resumen_diario'
+
+    fecha: Mapped[date] = mapped_column(Date, primary_key=True)
+    ultimoUsuario: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    estado: Mapped[str] = mapped_column(String(20), nullable=False, default='en_curso')  # en_curso | completo
+    enviados: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sinTareas: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    reencolados: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # fallaron y quedaron en el outbox
+    inicio: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.now)
+    actualizado: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.now)
+
+    def serialize(self):
+        return {
+            'fecha': self.fecha.strftime('%Y-%m-%d'),
+            'ultimoUsuario': self.ultimoUsuario,
+            'estado': self.estado,
+            'enviados': self.enviados,
+            'sinTareas': self.sinTareas,
+            'reencolados': self.reencolados
+        }
+
+
+# ---------------------------- Resumen semanal por etiqueta ----------------------------
+# Cantidad de tareas y minutos por (usuario, semana ISO, etiqueta). Se mantiene en la misma
+# transacción que las altas y bajas de tareas, así las estadísticas no agregan sobre 'tarea'.
+
+class ResumenSemanal(db.Model):
+    __tablename__ = 'resumen_semanal'
+
+    idUsuario: Mapped[int] = mapped_column(Integer, ForeignKey('usuario.idUsuario'), primary_key=True)
+    semana: Mapped[str] = mapped_column(String(8), primary_key=True)  # "2025-W27"
+    etiqueta: Mapped[str] = mapped_column(String(50), primary_key=True)
+    cantidad: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    minutos: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+def semana_iso(fecha):
+    anio, semana, _ = fecha.isocalendar()
+    return f"{anio}-W{semana:02d}"
+
+
+def minutos_tarea(hora_inicio, hora_fin):
+    inicio = hora_inicio.hour * 60 + hora_inicio.minute
+    fin = hora_fin.hour * 60 + hora_fin.minute
+    # Si termina antes de empezar, cuenta hasta el fin del día
+    return (fin if fin > inicio else 24 * 60) - inicio
+
+
+def acumular_resumen(deltas, id_usuario, fecha, hora_inicio, hora_fin, etiqueta, signo=1):
+    """Suma (o resta, con signo=-1) una tarea al dict de deltas {(idUsuario, semana, etiqueta): [cantidad, minutos]}."""
+    delta = deltas.setdefault((id_usuario, semana_iso(fecha), etiqueta), [0, 0])
+    delta[0] += signo
+    delta[1] += signo * minutos_tarea(hora_inicio, hora_fin)
+    return deltas
+
+
+# INSERT ... ON CONFLICT DO UPDATE donde el dialecto lo soporta; si no, UPDATE y luego INSERT
+_INSERT_CON_CONFLICTO = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def aplicar_resumen_semanal(conexion, deltas):
+    # Upsert directo (sin ORM), igual que incrementar_revision_tareas, para usarlo dentro de un flush
+    tabla = ResumenSemanal.__table__
+    for (id_usuario, semana, etiqueta), (cantidad, minutos) in deltas.items():
+        if not cantidad and not minutos:
+            continue
+        insert = _INSERT_CON_CONFLICTO.get(conexion.dialect.name)
+        if insert is not None:
+            sentencia = insert(tabla).values(idUsuario=id_usuario, semana=semana, etiqueta=etiqueta,
+                                             cantidad=cantidad, minutos=minutos)
+            conexion.execute(sentencia.on_conflict_do_update(
+                index_elements=['idUsuario', 'semana', 'etiqueta'],
+                set_={'cantidad': tabla.c.cantidad + cantidad, 'minutos': tabla.c.minutos + minutos}
+            ))
+            continue
+        actualizadas = conexion.execute(
+            tabla.update()
+            .where(tabla.c.idUsuario == id_usuario, tabla.c.semana == semana, tabla.c.etiqueta == etiqueta)
+            .values(cantidad=tabla.c.cantidad + cantidad, minutos=tabla.c.minutos + minutos)
+        ).rowcount
+        if not actualizadas:
+            conexion.execute(tabla.insert().values(idUsuario=id_usuario, semana=semana, etiqueta=etiqueta,
+                                                   cantidad=cantidad, minutos=minutos))
+
+
+CAMPOS_RESUMEN = ('idUsuario', 'fecha', 'horaInicio', 'horaFin', 'etiqueta')
+
+
+def _valor_anterior(obj, atributo):
+    historial = get_history(obj, atributo)
+    if historial.deleted:
+        return historial.deleted[0]
+    return (historial.unchanged or historial.added)[0]
+
+
+def _es_tarea_resumible(session, obj):
+    # Las plantillas de tareas recurrentes no van a resumen_semanal: sus ocurrencias (con las
+    # excepciones) se suman al leer cada semana, en /estadisticas/semana
+    if not isinstance(obj, Tarea):
+        return False
+    with session.no_autoflush:
+        return obj.recurrencia is None
+
+
+@event.listens_for(Session, 'before_flush')
+def _resumen_semanal_en_flush(session, flush_context, instances):
+    deltas = {}
+    for obj in session.new:
+        if _es_tarea_resumible(session, obj):
+            acumular_resumen(deltas, obj.idUsuario, obj.fecha, obj.horaInicio, obj.horaFin, obj.etiqueta)
+    for obj in session.deleted:
+        if _es_tarea_resumible(session, obj):
+            acumular_resumen(deltas, *(_valor_anterior(obj, a) for a in CAMPOS_RESUMEN), signo=-1)
+    for obj in session.dirty:
+        if _es_tarea_resumible(session, obj) and session.is_modified(obj):
+            anteriores = tuple(_valor_anterior(obj, a) for a in CAMPOS_RESUMEN)
+            actuales = tuple(getattr(obj, a) for a in CAMPOS_RESUMEN)
+            if anteriores == actuales:
+                continue
+            if anteriores[0] is not None:
+                acumular_resumen(deltas, *anteriores, signo=-1)
+            if actuales[0] is not None:
+                acumular_resumen(deltas, *actuales)
+    if deltas:
+        aplicar_resumen_semanal(session.connection(), deltas)
@@ -0,0 +1,74 @@
+import os
+
+from sqlalchemy import event
+
+
+# Perfiles de ajuste del motor de base de datos. DB_PERFIL:
+#   "auto"    -> según el dialecto de la URI (SQLite: WAL + pragmas, Postgres: pool + timeouts)
+#   "ninguno" -> valores por defecto de SQLAlchemy (como antes)
+
+def perfil_motor():
+    return os.getenv('DB_PERFIL', 'auto')
+
+
+def es_sqlite(uri):
+    return uri.startswith('sqlite')
+
+
+def es_postgres(uri):
+    return uri.startswith('postgresql')
+
+
+def opciones_motor(uri):
+    """Devuelve el dict para SQLALCHEMY_ENGINE_OPTIONS."""
+    if perfil_motor() == 'ninguno':
+        return {}
+
+    if es_postgres(uri):
+        opciones = {
+            'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+            'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            # Las conexiones muertas (reinicio del servidor, idle timeout del proxy) se detectan antes de usarlas
+            'pool_pre_ping': True,
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        }
+        timeout_ms = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 5000))
+        if timeout_ms:
+            opciones['connect_args'] = {'options': f"-c statement_timeout={timeout_ms}"}
+        return opciones
+
+    if es_sqlite(uri):
+        # El timeout del driver es el mismo busy_timeout; lo dejamos alineado con el pragma
+        return {'connect_args': {'timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000)) / 1000}}
+
+    return {}
+
+
+def pragmas_sqlite():
+    return [
+        f"PRAGMA journal_mode={os.getenv('SQLITE_JOURNAL_MODE', 'WAL')}",
+        # Con WAL, NORMAL no pierde consistencia; solo puede perder las últimas transacciones si se corta la luz
+        f"PRAGMA synchronous={os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+        # Negativo = KB de caché de páginas por conexión
+        f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_KB', 20000))}",
+        f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_MB', 128)) * 1024 * 1024}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def configurar_motor(engine):
+    """Registra los ajustes que van por conexión (pragmas de SQLite) en el engine ya creado."""
+    if perfil_motor() == 'ninguno' or engine.dialect.name != 'sqlite':
+        return
+    pragmas = pragmas_sqlite()
+
+    @event.listens_for(engine, 'connect')
+    def _pragmas_al_conectar(conexion_dbapi, registro):
+        cursor = conexion_dbapi.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
@@ -0,0 +1,265 @@
+import re
+import threading
+import unicodedata
+from datetime import datetime, timedelta
+
+
+# Parser de reglas para frases de tareas en español ("mañana a las 10", "el sábado a las 15", ...).
+# Devuelve el mismo dict que la IA (title, date, hour, endHour, category, description) junto con
+# una confianza; si la confianza no alcanza el umbral, quien llama debe recurrir al LLM.
+
+UMBRAL_CONFIANZA = 0.8
+
+DIAS = {
+    "lunes": 0, "martes": 1, "miércoles": 2,
+    "jueves": 3, "viernes": 4, "sábado": 5, "domingo": 6
+}
+
+MESES = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6, "julio": 7,
+    "agosto": 8, "septiembre": 9, "setiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12
+}
+
+# Palabras clave por categoría, sin acentos (el texto se normaliza antes de comparar)
+CATEGORIAS = {
+    "Salud": ["medico", "doctor", "dentista", "odontologo", "hospital", "clinica", "gimnasio", "gym",
+              "correr", "yoga", "pilates", "terapia", "psicologo", "farmacia", "vacuna", "entrenar",
+              "nutricionista", "kinesiologo"],
+    "Estudio": ["clase", "estudiar", "examen", "parcial", "curso", "universidad", "facultad", "colegio",
+                "ingles", "leer", "tesis", "taller", "repasar", "final"],
+    "Trabajo": ["reunion", "trabajo", "oficina", "cliente", "informe", "entrega", "proyecto", "llamada",
+                "meeting", "jefe", "presentacion", "entrevista"],
+    "Hogar": ["limpiar", "lavar", "cocinar", "compras", "supermercado", "ropa", "casa", "plantas",
+              "basura", "planchar", "mercado", "ordenar"],
+    "Personal": ["cumpleanos", "cita", "cena", "almuerzo", "amigos", "familia", "cine", "fiesta",
+                 "perro", "paseo", "viaje", "peluqueria", "banco", "mama", "papa"],
+}
+
+_DIAS_PLANOS = "lunes|martes|miercoles|jueves|viernes|sabado|domingo"
+_MESES_PLANOS = "|".join(MESES)
+_HORA = r"(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.|hs|h)?"
+
+RE_PASADO_MANANA = re.compile(r"\bpasado\s+manana\b")
+RE_MANANA = re.compile(r"(?<!la )\bmanana\b")
+RE_HOY = re.compile(r"\bhoy\b")
+RE_DIA_SEMANA = re.compile(r"\b(?:el\s+)?(?:proximo\s+|este\s+)?(" + _DIAS_PLANOS + r")\b(?:\s+que\s+viene)?")
+RE_DIA_MES = re.compile(r"\b(?:el\s+)?(?:dia\s+)?(\d{1,2})\s+de\s+(" + _MESES_PLANOS + r")(?:\s+(?:de\s+)?(\d{4}))?\b")
+RE_FECHA_BARRAS = re.compile(r"\b(?:el\s+)?(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b")
+RE_EL_DIA = re.compile(r"\bel\s+(?:dia\s+)?(\d{1,2})\b(?!\s*(?::|am|pm|hs|h\b))")
+
+RE_RANGO = re.compile(r"\b(?:de|desde)\s+(?:las?\s+)?" + _HORA + r"\s*(?:a|hasta)\s+(?:las?\s+)?" + _HORA + r"(?![\w:])")
+RE_A_LAS = re.compile(r"\ba\s+las?\s+" + _HORA + r"(?![\w:])")
+RE_HORA_SUFIJO = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.|hs|h)(?![\w])")
+RE_HORA_PUNTOS = re.compile(r"\b(\d{1,2}):(\d{2})\b")
+RE_HASTA = re.compile(r"\bhasta\s+(?:las?\s+)?" + _HORA + r"(?![\w:])")
+RE_TARDE = re.compile(r"\b(?:de|por|a)\s+la\s+(?:tarde|noche)\b")
+RE_MANANA_FRANJA = re.compile(r"\b(?:de|por|a|en)\s+la\s+manana\b")
+
+RE_RELLENO_INICIO = re.compile(
+    r"^(?:(?:tengo\s+que|tengo|hay\s+que|debo|necesito|recordar|recordarme|recuerdame|agendar|agenda|"
+    r"anotar|crear\s+tarea|quiero|me\s+toca|voy\s+a)\s+)+"
+)
+RE_CONECTORES_BORDE = re.compile(r"^(?:(?:el|la|los|las|a|de|del|para|por|y|en|con)\s+)+|(?:\s+(?:el|la|los|las|a|de|del|para|por|y|en|con))+$")
+
+
+def next_weekday_date(dia_nombre, hoy=None):
+    today = hoy or datetime.now().date()
+    target = DIAS.get(dia_nombre.lower(), None)
+    if target is None:
+        target = DIAS.get(_DIAS_CON_ACENTO.get(quitar_acentos(dia_nombre.lower()), ""), None)
+    if target is None:
+        return None
+    days_a_sumar = (target - today.weekday() + 7) % 7
+    return today + timedelta(days=days_a_sumar or 7)
+
+
+def quitar_acentos(texto):
+    # Carácter por carácter para conservar las posiciones respecto al texto original
+    return "".join(unicodedata.normalize("NFD", ch)[0] for ch in texto)
+
+
+_DIAS_CON_ACENTO = {quitar_acentos(d): d for d in DIAS}
+
+
+# ---- Estadísticas del camino rápido (reglas) frente al LLM
+class EstadisticasParser:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reglas = 0
+        self.llm = 0
+
+    def registrar(self, camino):
+        with self._lock:
+            if camino == "reglas":
+                self.reglas += 1
+            else:
+                self.llm += 1
+
+    def tasa_aciertos(self):
+        total = self.reglas + self.llm
+        return self.reglas / total if total else 0.0
+
+    def serialize(self):
+        return {"reglas": self.reglas, "llm": self.llm, "tasaAciertos": round(self.tasa_aciertos(), 4)}
+
+
+estadisticas_parser = EstadisticasParser()
+
+
+# ---- Fechas
+def _fecha_dia_mes(dia, mes, anio, hoy):
+    if anio:
+        return datetime(anio, mes, dia).date()
+    candidata = datetime(hoy.year, mes, dia).date()
+    if candidata < hoy:
+        candidata = datetime(hoy.year + 1, mes, dia).date()
+    return candidata
+
+
+def _buscar_fecha(plano, hoy):
+    m = RE_PASADO_MANANA.search(plano)
+    if m:
+        return hoy + timedelta(days=2), m.span()
+    m = RE_MANANA.search(plano)
+    if m:
+        return hoy + timedelta(days=1), m.span()
+    m = RE_HOY.search(plano)
+    if m:
+        return hoy, m.span()
+    m = RE_DIA_SEMANA.search(plano)
+    if m:
+        return next_weekday_date(m.group(1), hoy), m.span()
+    try:
+        m = RE_DIA_MES.search(plano)
+        if m:
+            anio = int(m.group(3)) if m.group(3) else None
+            return _fecha_dia_mes(int(m.group(1)), MESES[m.group(2)], anio, hoy), m.span()
+        m = RE_FECHA_BARRAS.search(plano)
+        if m:
+            anio = int(m.group(3)) if m.group(3) else None
+            if anio is not None and anio < 100:
+                anio += 2000
+            return _fecha_dia_mes(int(m.group(1)), int(m.group(2)), anio, hoy), m.span()
+        m = RE_EL_DIA.search(plano)
+        if m:
+            dia = int(m.group(1))
+            candidata = hoy.replace(day=dia)
+            if candidata < hoy:
+                mes_siguiente = (hoy.replace(day=1) + timedelta(days=32)).replace(day=1)
+                candidata = mes_siguiente.replace(day=dia)
+            return candidata, m.span()
+    except ValueError:
+        # Día inexistente (31 de junio, 30/02...): que decida el LLM
+        return None, None
+    return None, None
+
+
+# ---- Horas
+def _a_minutos(hora, minutos, sufijo, franja_pm, franja_am):
+    hora = int(hora)
+    minutos = int(minutos or 0)
+    if hora > 23 or minutos > 59:
+        return None
+    sufijo = (sufijo or "").replace(".", "")
+    if sufijo == "pm" or (not sufijo and franja_pm):
+        if hora < 12:
+            hora += 12
+    elif sufijo == "am" or franja_am:
+        if hora == 12:
+            hora = 0
+    return hora * 60 + minutos
+
+
+def _buscar_horas(plano):
+    """Devuelve (inicio, fin, spans) en minutos desde medianoche; fin puede ser None."""
+    franja_pm = RE_TARDE.search(plano)
+    franja_am = RE_MANANA_FRANJA.search(plano)
+    spans = [m.span() for m in (franja_pm, franja_am) if m]
+
+    m = RE_RANGO.search(plano)
+    if m:
+        inicio = _a_minutos(m.group(1), m.group(2), m.group(3), franja_pm, franja_am)
+        fin = _a_minutos(m.group(4), m.group(5), m.group(6) or m.group(3), franja_pm, franja_am)
+        if inicio is not None and fin is not None and fin <= inicio and fin + 12 * 60 > inicio:
+            fin += 12 * 60
+        return inicio, fin, spans + [m.span()]
+
+    for patron in (RE_A_LAS, RE_HORA_SUFIJO, RE_HORA_PUNTOS):
+        m = patron.search(plano)
+        if m:
+            sufijo = m.group(3) if patron.groups >= 3 else None
+            inicio = _a_minutos(m.group(1), m.group(2), sufijo, franja_pm, franja_am)
+            spans.append(m.span())
+            fin = None
+            h = RE_HASTA.search(plano)
+            if h:
+                fin = _a_minutos(h.group(1), h.group(2), h.group(3), franja_pm, franja_am)
+                if inicio is not None and fin is not None and fin <= inicio and fin + 12 * 60 > inicio:
+                    fin += 12 * 60
+                spans.append(h.span())
+            return inicio, fin, spans
+    return None, None, spans
+
+
+def _formatear_minutos(minutos):
+    minutos = min(minutos, 23 * 60 + 59)
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+# ---- Categoría y título
+def _categoria(plano):
+    for categoria, palabras in CATEGORIAS.items():
+        for palabra in palabras:
+            if re.search(r"\b" + palabra, plano):
+                return categoria
+    return "Otros"
+
+
+def _titulo(original, spans):
+    # Borramos del texto original las expresiones de fecha/hora ya interpretadas
+    caracteres = list(original)
+    for inicio, fin in spans:
+        for i in range(inicio, fin):
+            caracteres[i] = " "
+    titulo = re.sub(r"[\s,.;:!?¿¡]+", " ", "".join(caracteres)).strip()
+    titulo = RE_RELLENO_INICIO.sub("", titulo)
+    titulo = RE_CONECTORES_BORDE.sub("", titulo).strip()
+    return titulo[:1].upper() + titulo[1:120]
+
+
+def parsear_tarea(texto, hoy=None):
+    """
+    Interpreta la frase con reglas. Devuelve (datos, confianza); datos es None si no se pudo
+    extraer fecha, hora y título, en cuyo caso la confianza es baja y conviene usar el LLM.
+    """
+    hoy = hoy or datetime.now().date()
+    original = unicodedata.normalize("NFC", texto.strip()).lower()
+    plano = quitar_acentos(original)
+
+    fecha, span_fecha = _buscar_fecha(plano, hoy)
+    inicio, fin, spans_hora = _buscar_horas(plano)
+    if fecha is None or inicio is None:
+        return None, 0.3
+
+    if fin is None:
+        fin = inicio + 60
+    elif fin <= inicio or fin >= 24 * 60:
+        # Rango que cruza la medianoche: la tarea no puede terminar al otro día, que decida el LLM
+        return None, 0.3
+
+    spans = [span_fecha] + spans_hora
+    titulo = _titulo(original, spans)
+    if not titulo:
+        # La frase es solo fecha y hora: sin título no se crea la tarea, ni siquiera degradando
+        return None, 0.3
+    confianza = 0.9 if len(titulo) >= 3 else 0.5
+
+    datos = {
+        "title": titulo,
+        "date": fecha.strftime("%Y-%m-%d"),
+        "hour": _formatear_minutos(inicio),
+        "endHour": _formatear_minutos(fin),
+        "category": _categoria(plano),
+        "description": (original[:1].upper() + original[1:])[:120],
+    }
+    return datos, confianza
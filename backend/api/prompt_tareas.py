@@ -0,0 +1,184 @@
+import json
+import threading
+from datetime import datetime, timedelta
+
+from api.cache_extraccion import normalizar_texto
+from api.parser_tareas import next_weekday_date
+
+
+# Prompt para que el LLM convierta una frase en la tarea (title, date, hour, endHour, category,
+# description) y validación de lo que devuelve. El prompt se arma con instrucciones fijas más
+# ejemplos hasta llenar un presupuesto de tokens; los ejemplos se serializan con json.dumps, así
+# siempre son JSON válido y el modelo no copia errores de formato.
+
+CATEGORIAS_TAREA = ["Personal", "Trabajo", "Estudio", "Hogar", "Salud", "Otros"]
+DIAS_SEMANA = ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"]
+
+# Largo de titulo y descripcion en la tabla tarea
+MAXIMO_CARACTERES_CAMPO = 120
+# La frase del usuario entra siempre al prompt; más allá de esto se corta
+MAXIMO_CARACTERES_ENTRADA = 500
+
+# Para response_format de tipo json_schema (structured outputs de OpenAI)
+ESQUEMA_TAREA = {
+    "name": "tarea",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string"},
+            "description": {"type": "string"},
+            "date": {"type": "string", "description": "YYYY-MM-DD"},
+            "hour": {"type": "string", "description": "HH:MM, 24h"},
+            "endHour": {"type": "string", "description": "HH:MM, 24h"},
+            "category": {"type": "string", "enum": CATEGORIAS_TAREA},
+        },
+        "required": ["title", "description", "date", "hour", "endHour", "category"],
+        "additionalProperties": False,
+    },
+}
+
+INSTRUCCIONES = """Convertí la descripción de una tarea (español informal o spanglish) en un objeto JSON con estos campos:
+- "title": título corto de la tarea
+- "description": qué hay que hacer, en base a la frase original
+- "date": YYYY-MM-DD. Hoy es {dia} {hoy}. Resolvé "mañana", "pasado mañana", días de la semana (la próxima vez que caen) y fechas como "el 28"; nunca antes de hoy.
+- "hour": hora de inicio HH:MM en 24h. "a las 9" es 09:00; "a la noche" es PM.
+- "endHour": hora de fin HH:MM; si no se dice, una hora después de "hour".
+- "category": una de {categorias}.
+Respondé solo con el JSON, sin texto ni comentarios."""
+
+
+def _ejemplo(titulo, dias, hora, hora_fin, categoria, descripcion):
+    # dias: cantidad de días desde hoy, o el nombre del día de la semana
+    def generar(hoy):
+        fecha = next_weekday_date(dias, hoy) if isinstance(dias, str) else hoy + timedelta(days=dias)
+        return {"title": titulo, "description": descripcion, "date": fecha.isoformat(),
+                "hour": hora, "endHour": hora_fin, "category": categoria}
+    return generar
+
+
+# (entrada, ejemplo) en orden de utilidad: si no entran todos en el presupuesto se cortan los últimos
+EJEMPLOS = [
+    ("Tengo que ir al médico mañana a las 10",
+     _ejemplo("Ir al médico", 1, "10:00", "11:00", "Salud", "Tengo que ir al médico")),
+    ("Clase de inglés el sábado a las 15",
+     _ejemplo("Clase de inglés", "sábado", "15:00", "16:00", "Estudio", "Clase de inglés el sábado a las 15")),
+    ("reunión con el equipo pasado mañana de 9 a 10:30",
+     _ejemplo("Reunión con el equipo", 2, "09:00", "10:30", "Trabajo", "Reunión con el equipo")),
+    ("cena con amigos el viernes a la noche",
+     _ejemplo("Cena con amigos", "viernes", "21:00", "22:00", "Personal", "Cena con amigos el viernes")),
+]
+
+
+def estimar_tokens(texto):
+    # ~4 bytes por token; en UTF-8 las tildes y emojis suman más bytes, así el estimado no se queda corto
+    return (len(texto.encode("utf-8")) + 3) // 4
+
+
+class ConstructorPrompt:
+    """
+    Arma el prompt: instrucciones, ejemplos (sin repetir entradas) y la frase del usuario.
+    Los ejemplos se agregan en orden mientras el total estimado no pase 'presupuesto' tokens.
+    Todo menos la frase depende solo de la fecha, así que se arma una vez por día.
+    """
+
+    def __init__(self, instrucciones=INSTRUCCIONES, ejemplos=EJEMPLOS, presupuesto=600):
+        self.instrucciones = instrucciones
+        self.presupuesto = presupuesto
+        self.ejemplos = []
+        vistas = set()
+        for entrada, generar in ejemplos:
+            clave = normalizar_texto(entrada)
+            if clave not in vistas:
+                vistas.add(clave)
+                self.ejemplos.append((entrada, generar))
+        self._prefijo = (None, "", 0)  # (hoy, texto, ejemplos incluidos)
+        self.tokens_maximos = 0  # estimado del prompt más largo armado
+        self._lock = threading.Lock()
+
+    def _armar_prefijo(self, hoy, tokens_entrada):
+        partes = [self.instrucciones.format(dia=DIAS_SEMANA[hoy.weekday()], hoy=hoy.isoformat(),
+                                            categorias=", ".join(CATEGORIAS_TAREA))]
+        usados = estimar_tokens(partes[0]) + tokens_entrada
+        incluidos = 0
+        for entrada, generar in self.ejemplos:
+            bloque = f'Entrada: "{entrada}"\nJSON: {json.dumps(generar(hoy), ensure_ascii=False)}'
+            costo = estimar_tokens(bloque)
+            if usados + costo > self.presupuesto:
+                break
+            if incluidos == 0:
+                partes.append("Ejemplos:")
+                costo += 2
+            partes.append(bloque)
+            usados += costo
+            incluidos += 1
+        return "\n".join(partes), incluidos
+
+    def construir(self, texto, hoy=None):
+        """Devuelve (prompt, tokens estimados)."""
+        hoy = hoy or datetime.now().date()
+        texto = " ".join(texto.split())[:MAXIMO_CARACTERES_ENTRADA].replace('"', "'")
+        entrada = f'\nEntrada: "{texto}"\nJSON:'
+        with self._lock:
+            fecha, prefijo, _ = self._prefijo
+            if fecha != hoy:
+                # El prefijo se arma reservando lugar para una entrada del largo máximo
+                prefijo, incluidos = self._armar_prefijo(hoy, estimar_tokens(
+                    f'\nEntrada: "{"x" * MAXIMO_CARACTERES_ENTRADA}"\nJSON:'))
+                self._prefijo = (hoy, prefijo, incluidos)
+        prompt = prefijo + entrada
+        tokens = estimar_tokens(prompt)
+        self.tokens_maximos = max(self.tokens_maximos, tokens)
+        return prompt, tokens
+
+    @property
+    def ejemplos_incluidos(self):
+        return self._prefijo[2]
+
+    def serialize(self):
+        return {'presupuesto': self.presupuesto, 'ejemplos': len(self.ejemplos),
+                'ejemplosIncluidos': self.ejemplos_incluidos, 'tokensMaximos': self.tokens_maximos}
+
+
+def _hora(valor):
+    try:
+        return datetime.strptime(valor.strip(), "%H:%M")
+    except (AttributeError, ValueError):
+        return None
+
+
+def validar_tarea(datos):
+    """
+    Valida el dict que devolvió el LLM contra ESQUEMA_TAREA. Devuelve la tarea normalizada
+    (horas HH:MM con cero adelante, textos cortados al largo de la columna) o None si no sirve.
+    Completa lo que el prompt ya pide resolver así: sin descripción va el título, sin hora de fin
+    (o con una anterior al inicio) una hora después, y una categoría fuera de la lista es "Otros".
+    """
+    if not isinstance(datos, dict):
+        return None
+    titulo = datos.get("title")
+    if not isinstance(titulo, str) or not titulo.strip():
+        return None
+    try:
+        fecha = datetime.strptime(str(datos.get("date", "")).strip(), "%Y-%m-%d").date()
+    except ValueError:
+        return None
+    inicio = _hora(datos.get("hour"))
+    if inicio is None:
+        return None
+    fin = _hora(datos.get("endHour"))
+    if fin is None or fin <= inicio:
+        fin = min(inicio + timedelta(hours=1), inicio.replace(hour=23, minute=59))
+
+    descripcion = datos.get("description")
+    if not isinstance(descripcion, str) or not descripcion.strip():
+        descripcion = titulo
+    categoria = str(datos.get("category", "")).strip().capitalize()
+    return {
+        "title": titulo.strip()[:MAXIMO_CARACTERES_CAMPO],
+        "description": descripcion.strip()[:MAXIMO_CARACTERES_CAMPO],
+        "date": fecha.isoformat(),
+        "hour": inicio.strftime("%H:%M"),
+        "endHour": fin.strftime("%H:%M"),
+        "category": categoria if categoria in CATEGORIAS_TAREA else "Otros",
+    }
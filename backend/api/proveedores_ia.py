@@ -0,0 +1,318 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from api.metricas import metricas
+from api.circuito import CircuitoAbierto
+
+
+# Proveedores de LLM intercambiables. Todos reciben el prompt y devuelven el texto de la
+# respuesta; si no responden (timeout, error, circuito abierto) lanzan IANoDisponible.
+# EnrutadorIA elige el primario por configuración y, opcionalmente, hace hedging con el secundario.
+#
+# Formato de la respuesta (formato=):
+#   "texto"   -> sin response_format; el JSON se busca dentro del texto
+#   "json"    -> response_format json_object (OpenAI y DeepSeek)
+#   "esquema" -> response_format json_schema estricto (structured outputs de OpenAI); los
+#                proveedores que no lo admiten usan json_object
+# En todos los casos quien llama valida la respuesta: el modo JSON asegura la sintaxis, no los campos.
+
+class IANoDisponible(Exception):
+    pass
+
+
+def json_de_respuesta(contenido):
+    """dict con el JSON de la respuesta, tolerando texto alrededor; None si no hay JSON válido."""
+    contenido = (contenido or "").strip()
+    inicio, fin = contenido.find('{'), contenido.rfind('}')
+    if inicio == -1 or fin < inicio:
+        return None
+    try:
+        resultado = json.loads(contenido[inicio:fin + 1])
+    except ValueError:
+        return None
+    return resultado if isinstance(resultado, dict) else None
+
+
+class EstadisticasProveedor:
+    """Contadores y latencias recientes (de las llamadas que respondieron) de un proveedor."""
+
+    def __init__(self, ventana=200, minimo_muestras=20):
+        self.minimo_muestras = minimo_muestras
+        self._latencias = deque(maxlen=ventana)
+        self._conteos = {'llamadas': 0, 'errores': 0, 'rechazadas': 0, 'invalidas': 0, 'ganadas': 0,
+                         'tokensPrompt': 0, 'tokensRespuesta': 0}
+        self._lock = threading.Lock()
+
+    def registrar(self, resultado, duracion=None, uso=None):
+        with self._lock:
+            if resultado == 'ok':
+                self._latencias.append(duracion)
+            if uso is not None:
+                self._conteos['tokensPrompt'] += uso[0]
+                self._conteos['tokensRespuesta'] += uso[1]
+            if resultado in ('ok', 'error'):
+                self._conteos['llamadas'] += 1
+            if resultado != 'ok':
+                self._conteos[resultado if resultado != 'error' else 'errores'] += 1
+
+    def percentil(self, p):
+        """Latencia (s) del percentil p, o None si todavía no hay suficientes muestras."""
+        with self._lock:
+            if len(self._latencias) < self.minimo_muestras:
+                return None
+            ordenadas = sorted(self._latencias)
+        return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p))]
+
+    def serialize(self):
+        with self._lock:
+            conteos = dict(self._conteos)
+            ordenadas = sorted(self._latencias)
+        for nombre, p in (('p50Ms', 0.5), ('p90Ms', 0.9)):
+            conteos[nombre] = round(ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p))] * 1000, 1) \
+                if ordenadas else None
+        respondidas = conteos['llamadas'] - conteos['errores']
+        conteos['promedioTokensPrompt'] = round(conteos['tokensPrompt'] / respondidas, 1) if respondidas else None
+        return conteos
+
+
+class ProveedorIA:
+    admite_esquema = False
+
+    def __init__(self, nombre, modelo, timeout, circuito, formato='texto'):
+        self.nombre = nombre
+        self.modelo = modelo
+        self.timeout = timeout
+        self.circuito = circuito
+        self.formato = formato
+        self.estadisticas = EstadisticasProveedor()
+
+    def _formato_respuesta(self, esquema):
+        if self.formato == 'texto':
+            return None
+        if self.formato == 'esquema' and esquema is not None and self.admite_esquema:
+            return {"type": "json_schema", "json_schema": esquema}
+        return {"type": "json_object"}
+
+    def _completar(self, prompt, max_tokens, temperature, formato_respuesta):
+        """(contenido, (tokens del prompt, tokens de la respuesta) o None si la API no los informa)."""
+        raise NotImplementedError
+
+    def completar(self, prompt, max_tokens=150, temperature=0.2, esquema=None):
+        """esquema: el objeto json_schema de OpenAI ({"name", "strict", "schema"}), si formato='esquema'."""
+        inicio = time.perf_counter()
+        try:
+            with self.circuito.llamada(), metricas.span(f'ia_{self.nombre}'):
+                contenido, uso = self._completar(prompt, max_tokens, temperature, self._formato_respuesta(esquema))
+        except CircuitoAbierto as ex:
+            self.estadisticas.registrar('rechazadas')
+            raise IANoDisponible(str(ex)) from ex
+        except Exception as ex:
+            self.estadisticas.registrar('error')
+            raise IANoDisponible(f"{self.nombre}: {str(ex) or ex.__class__.__name__}") from ex
+        self.estadisticas.registrar('ok', time.perf_counter() - inicio, uso)
+        if uso is not None:
+            metricas.ia_tokens.inc(self.nombre, 'prompt', cantidad=uso[0])
+            metricas.ia_tokens.inc(self.nombre, 'respuesta', cantidad=uso[1])
+            metricas.ia_tokens_prompt.observar(uso[0], self.nombre)
+        return contenido
+
+    def serialize(self):
+        return {'modelo': self.modelo, 'formato': self.formato, 'circuito': self.circuito.serialize(),
+                **self.estadisticas.serialize()}
+
+
+def _uso(prompt_tokens, completion_tokens):
+    if prompt_tokens is None or completion_tokens is None:
+        return None
+    return int(prompt_tokens), int(completion_tokens)
+
+
+class ProveedorOpenAI(ProveedorIA):
+    """SDK oficial; obtener_client es la función que crea (una vez) el cliente."""
+
+    admite_esquema = True
+
+    def __init__(self, obtener_client, modelo, timeout, circuito, formato='texto'):
+        super().__init__('openai', modelo, timeout, circuito, formato)
+        self.obtener_client = obtener_client
+
+    def _completar(self, prompt, max_tokens, temperature, formato_respuesta):
+        opciones = {"response_format": formato_respuesta} if formato_respuesta else {}
+        respuesta = self.obtener_client().chat.completions.create(
+            model=self.modelo,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=temperature,
+            timeout=self.timeout,
+            **opciones
+        )
+        uso = getattr(respuesta, 'usage', None)
+        return respuesta.choices[0].message.content, \
+            uso and _uso(getattr(uso, 'prompt_tokens', None), getattr(uso, 'completion_tokens', None))
+
+
+class ProveedorChatHttp(ProveedorIA):
+    """
+    Cualquier API de chat compatible con la de OpenAI (DeepSeek, o la misma OpenAI apuntada a otra
+    URL) con requests y una sesión keep-alive por proceso. DeepSeek no admite json_schema:
+    admite_esquema=False hace que use json_object.
+    """
+
+    def __init__(self, nombre, url, api_key, modelo, timeout, circuito, formato='texto', admite_esquema=False,
+                 pool=10):
+        super().__init__(nombre, modelo, timeout, circuito, formato)
+        self.admite_esquema = admite_esquema
+        self.url = url
+        self.api_key = api_key
+        self.pool = pool
+        self._sesion = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _obtener_sesion(self):
+        if self._sesion is None or self._pid != os.getpid():
+            with self._lock:
+                if self._sesion is None or self._pid != os.getpid():
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    sesion = requests.Session()
+                    sesion.headers['Authorization'] = f"Bearer {self.api_key}"
+                    adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool, max_retries=0)
+                    sesion.mount('https://', adaptador)
+                    sesion.mount('http://', adaptador)
+                    self._sesion, self._pid = sesion, os.getpid()
+        return self._sesion
+
+    def _completar(self, prompt, max_tokens, temperature, formato_respuesta):
+        pedido = {
+            "model": self.modelo,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": False
+        }
+        if formato_respuesta:
+            pedido["response_format"] = formato_respuesta
+        respuesta = self._obtener_sesion().post(self.url, timeout=self.timeout, json=pedido)
+        respuesta.raise_for_status()
+        datos = respuesta.json()
+        uso = datos.get('usage') or {}
+        return datos['choices'][0]['message']['content'], \
+            _uso(uso.get('prompt_tokens'), uso.get('completion_tokens'))
+
+
+class EnrutadorIA:
+    """
+    Pide la respuesta al primario. Sin hedging, el secundario (si hay) es solo el respaldo cuando
+    el primario no responde o devuelve algo que no es JSON válido.
+
+    Con hedging, si el primario no respondió dentro de su percentil 'percentil' de latencia
+    (espera_inicial mientras no haya muestras suficientes) se dispara también el secundario y se
+    usa el primer JSON válido que llegue. El otro pedido sigue en su hilo y se descarta, pero
+    igual cuenta en las estadísticas de su proveedor. Esos pedidos abandonados ocupan hilos del
+    pool hasta que terminan, por eso 'workers' tiene que sobrar: si los pedidos nuevos quedan en
+    la cola del pool, la espera cuenta como latencia del primario y se disparan hedges de más.
+    """
+
+    def __init__(self, primario, secundario=None, hedging=False, percentil=0.9, espera_inicial=2.0,
+                 espera_minima=0.05, workers=32):
+        self.primario = primario
+        self.secundario = secundario
+        self.hedging = hedging and secundario is not None
+        self.percentil = percentil
+        self.espera_inicial = espera_inicial
+        self.espera_minima = espera_minima
+        self.workers = workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def proveedores(self):
+        return [p for p in (self.primario, self.secundario) if p is not None]
+
+    def espera_hedging(self):
+        observada = self.primario.estadisticas.percentil(self.percentil)
+        return max(self.espera_minima, observada if observada is not None else self.espera_inicial)
+
+    def _obtener_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ia')
+        return self._pool
+
+    def extraer(self, prompt, validar=json_de_respuesta, **opciones):
+        """Respuesta ya validada; None si respondieron pero nada fue válido; IANoDisponible si nadie respondió."""
+        if self.hedging:
+            return self._extraer_con_hedging(prompt, validar, opciones)
+
+        error, respondio = None, False
+        for proveedor in self.proveedores:
+            try:
+                contenido = proveedor.completar(prompt, **opciones)
+            except IANoDisponible as ex:
+                error = ex
+                continue
+            respondio = True
+            resultado = validar(contenido)
+            if resultado is not None:
+                proveedor.estadisticas.registrar('ganadas')
+                return resultado
+            proveedor.estadisticas.registrar('invalidas')
+        if respondio:
+            return None
+        raise error
+
+    def _extraer_con_hedging(self, prompt, validar, opciones):
+        pool = self._obtener_pool()
+        pendientes = {pool.submit(self.primario.completar, prompt, **opciones): self.primario}
+        limite = time.monotonic() + self.espera_hedging()
+        respaldo_lanzado = False
+        error, respondio = None, False
+
+        def lanzar_respaldo(motivo):
+            pendientes[pool.submit(self.secundario.completar, prompt, **opciones)] = self.secundario
+            metricas.ia_hedging.inc(motivo)
+            return True
+
+        while pendientes:
+            espera = None if respaldo_lanzado else max(0.0, limite - time.monotonic())
+            listos, _ = wait(list(pendientes), timeout=espera, return_when=FIRST_COMPLETED)
+            if not listos:
+                respaldo_lanzado = lanzar_respaldo('disparado')
+                continue
+            for futuro in listos:
+                proveedor = pendientes.pop(futuro)
+                try:
+                    contenido = futuro.result()
+                except IANoDisponible as ex:
+                    error = ex
+                    continue
+                respondio = True
+                resultado = validar(contenido)
+                if resultado is not None:
+                    proveedor.estadisticas.registrar('ganadas')
+                    if proveedor is self.secundario:
+                        metricas.ia_hedging.inc('gano_secundario')
+                    return resultado
+                proveedor.estadisticas.registrar('invalidas')
+            # El primario falló antes de la espera: el secundario sale ya, como respaldo
+            if not pendientes and not respaldo_lanzado:
+                respaldo_lanzado = lanzar_respaldo('respaldo')
+
+        if respondio:
+            return None
+        raise error
+
+    def serialize(self):
+        return {
+            'primario': self.primario.nombre,
+            'secundario': self.secundario.nombre if self.secundario else None,
+            'hedging': self.hedging,
+            'esperaHedgingMs': round(self.espera_hedging() * 1000, 1) if self.hedging else None,
+            'proveedores': {p.nombre: p.serialize() for p in self.proveedores}
+        }
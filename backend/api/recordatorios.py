@@ -0,0 +1,272 @@
+import os
+import heapq
+import threading
+from datetime import datetime, timedelta, time
+
+from api.models import db, Tarea, Usuario, Recordatorio, Recurrencia, ExcepcionRecurrencia
+from api.mensajeria import despachador, encolar_mensaje
+from api.recurrencia import fechas_ocurrencias
+
+MAXIMO_MINUTOS_ANTES = 7 * 24 * 60
+# Hasta dónde se buscan ocurrencias de una tarea recurrente para reprogramar su recordatorio
+HORIZONTE_RECORDATORIOS_DIAS = 400
+
+
+def validar_minutos_antes(valor):
+    """Devuelve (minutos, error)."""
+    try:
+        minutos = int(valor)
+    except (ValueError, TypeError):
+        return None, {'msg': 'Los minutos del recordatorio deben ser un entero'}
+    if minutos < 0 or minutos > MAXIMO_MINUTOS_ANTES:
+        return None, {'msg': f'Los minutos del recordatorio deben estar entre 0 y {MAXIMO_MINUTOS_ANTES}'}
+    return minutos, None
+
+
+def proximo_inicio(tarea, despues_de):
+    """
+    Inicio (datetime) de la primera ocurrencia de la tarea que empieza después de 'despues_de',
+    o None si no queda ninguna. Para las recurrentes respeta las excepciones (canceladas o con otra hora).
+    """
+    recurrencia = tarea.recurrencia
+    if recurrencia is None:
+        inicio = datetime.combine(tarea.fecha, tarea.horaInicio)
+        return inicio if inicio > despues_de else None
+
+    desde = max(despues_de.date(), tarea.fecha)
+    hasta = desde + timedelta(days=HORIZONTE_RECORDATORIOS_DIAS)
+    excepciones = {e.fecha: e for e in ExcepcionRecurrencia.query.filter(
+        ExcepcionRecurrencia.idRecurrencia == recurrencia.idRecurrencia,
+        ExcepcionRecurrencia.fecha >= desde,
+        ExcepcionRecurrencia.fecha <= hasta
+    )}
+    for fecha in fechas_ocurrencias(tarea.fecha, recurrencia.frecuencia, recurrencia.intervalo,
+                                    recurrencia.diasSemana, recurrencia.hasta, recurrencia.cantidad,
+                                    desde, hasta):
+        excepcion = excepciones.get(fecha)
+        if excepcion is not None and excepcion.cancelada:
+            continue
+        hora = (excepcion.horaInicio if excepcion is not None else None) or tarea.horaInicio
+        inicio = datetime.combine(fecha, hora)
+        if inicio > despues_de:
+            return inicio
+    return None
+
+
+def calcular_vencimiento(tarea, minutos_antes, despues_de=None):
+    inicio = proximo_inicio(tarea, despues_de or datetime.now())
+    return inicio - timedelta(minutes=minutos_antes) if inicio else None
+
+
+def programar_recordatorio(tarea, minutos_antes):
+    """Crea o actualiza el recordatorio de la tarea (en la sesión; se persiste con el commit de quien llama)."""
+    despues_de = datetime.now()
+    recordatorio = tarea.recordatorio
+    if recordatorio is None:
+        recordatorio = tarea.recordatorio = Recordatorio(idUsuario=tarea.idUsuario, minutosAntes=minutos_antes)
+    elif recordatorio.estado == 'pendiente' and recordatorio.venceEn is not None:
+        # Las ocurrencias de días anteriores a la que estaba programada ya se avisaron
+        objetivo = recordatorio.venceEn + timedelta(minutes=recordatorio.minutosAntes)
+        despues_de = max(despues_de, datetime.combine(objetivo.date(), time.min) - timedelta(microseconds=1))
+    recordatorio.minutosAntes = minutos_antes
+    recordatorio.venceEn = calcular_vencimiento(tarea, minutos_antes, despues_de)
+    recordatorio.estado = 'pendiente' if recordatorio.venceEn else 'vencido'
+    return recordatorio
+
+
+def texto_recordatorio(titulo, inicio, minutos_antes):
+    cuando = "ahora" if minutos_antes == 0 else f"en {minutos_antes} minutos"
+    return (
+        "⏰ *Recordatorio*\n\n"
+        f"📌 {titulo}\n"
+        f"🕒 Empieza {cuando} ({inicio.strftime('%d/%m %H:%M')})"
+    )
+
+
+class ProgramadorRecordatorios:
+    """
+    Carga solo los recordatorios que vencen en la próxima ventana (consulta por el índice
+    (estado, venceEn)), los guarda en un heap y, a medida que vencen, los envía por lotes.
+
+    Cada lote reclama sus recordatorios con un UPDATE condicional sobre (estado, venceEn) y encola
+    los WhatsApp en el outbox, todo en la misma transacción: si el proceso se reinicia, lo ya
+    enviado no se repite (cambió el estado o el venceEn) y lo vencido mientras estaba caído se
+    vuelve a cargar y sale con atraso, mientras la tarea no haya empezado hace más de 'tolerancia'.
+    """
+
+    def __init__(self, ventana=300, intervalo_carga=60, lote=500, maximo_carga=50000, tolerancia=60):
+        self.app = None
+        self.ventana = ventana
+        # Segundos después del inicio de la tarea en que el aviso todavía sale (minutosAntes=0 vence justo al inicio)
+        self.tolerancia = tolerancia
+        self.intervalo_carga = intervalo_carga
+        self.lote = lote
+        self.maximo_carga = maximo_carga
+        self._heap = []  # (venceEn, idRecordatorio)
+        self._en_heap = set()
+        self._proxima_carga = None
+        self._recargar = threading.Event()
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.ventana = int(os.getenv('RECORDATORIOS_VENTANA', self.ventana))
+        self.intervalo_carga = int(os.getenv('RECORDATORIOS_INTERVALO_CARGA', self.intervalo_carga))
+        self.lote = int(os.getenv('RECORDATORIOS_LOTE', self.lote))
+        self.tolerancia = int(os.getenv('RECORDATORIOS_TOLERANCIA', self.tolerancia))
+
+    # ---- Ciclo de vida del hilo
+    def iniciar(self):
+        if self._hilo is not None:
+            return
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle, name='programador-recordatorios', daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        with self._lock:
+            if self._hilo is None:
+                return
+            self._detener.set()
+            self._despertar.set()
+            self._hilo.join()
+            self._hilo = None
+
+    def notificar(self):
+        # Un recordatorio nuevo o cambiado puede caer dentro de la ventana ya cargada
+        self._recargar.set()
+        self._despertar.set()
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            try:
+                with self.app.app_context():
+                    procesados = self.ciclo()
+            except Exception as ex:
+                print(f"Error en programador de recordatorios: {ex}")
+                procesados = 0
+            if procesados >= self.lote:
+                continue
+            self._despertar.wait(self.segundos_hasta_proximo())
+            self._despertar.clear()
+
+    def segundos_hasta_proximo(self, ahora=None):
+        ahora = ahora or datetime.now()
+        proximo = self._proxima_carga or ahora
+        if self._heap and self._heap[0][0] < proximo:
+            proximo = self._heap[0][0]
+        return max(0.0, (proximo - ahora).total_seconds())
+
+    # ---- Trabajo
+    def ciclo(self, ahora=None):
+        ahora = ahora or datetime.now()
+        if self._proxima_carga is None or ahora >= self._proxima_carga or self._recargar.is_set():
+            self._recargar.clear()
+            self.cargar_ventana(ahora)
+        return self.procesar_vencidos(ahora)
+
+    def cargar_ventana(self, ahora):
+        hasta = ahora + timedelta(seconds=self.ventana)
+        filas = db.session.query(Recordatorio.idRecordatorio, Recordatorio.venceEn).filter(
+            Recordatorio.estado == 'pendiente',
+            Recordatorio.venceEn <= hasta
+        ).order_by(Recordatorio.venceEn).limit(self.maximo_carga).all()
+        db.session.rollback()
+
+        for id_recordatorio, vence in filas:
+            if (vence, id_recordatorio) not in self._en_heap:
+                self._en_heap.add((vence, id_recordatorio))
+                heapq.heappush(self._heap, (vence, id_recordatorio))
+
+        # Si la ventana vino cortada por maximo_carga, la próxima carga es apenas se vacíe el heap
+        if len(filas) >= self.maximo_carga:
+            self._proxima_carga = filas[-1][1]
+        else:
+            self._proxima_carga = ahora + timedelta(seconds=min(self.intervalo_carga, self.ventana))
+        return len(filas)
+
+    def procesar_vencidos(self, ahora=None):
+        ahora = ahora or datetime.now()
+        listos = []
+        while self._heap and self._heap[0][0] <= ahora and len(listos) < self.lote:
+            entrada = heapq.heappop(self._heap)
+            self._en_heap.discard(entrada)
+            listos.append(entrada)
+        if not listos:
+            return 0
+
+        vencimientos = {id_recordatorio: vence for vence, id_recordatorio in listos}
+        # Solo columnas; la tarea completa se carga únicamente para las recurrentes
+        filas = db.session.query(
+            Recordatorio.idRecordatorio, Recordatorio.idTarea, Recordatorio.minutosAntes,
+            Tarea.titulo, Usuario.telefono, Recurrencia.idRecurrencia
+        ).join(
+            Tarea, Tarea.idTarea == Recordatorio.idTarea
+        ).join(
+            Usuario, Usuario.idUsuario == Recordatorio.idUsuario
+        ).outerjoin(
+            Recurrencia, Recurrencia.idTarea == Recordatorio.idTarea
+        ).filter(Recordatorio.idRecordatorio.in_(list(vencimientos))).all()
+
+        mensajes = []
+        limite = ahora - timedelta(seconds=self.tolerancia)
+        for id_recordatorio, id_tarea, minutos_antes, titulo, telefono, id_recurrencia in filas:
+            vence = vencimientos[id_recordatorio]
+            inicio = vence + timedelta(minutes=minutos_antes)
+            a_tiempo = inicio >= limite
+            # Recurrente: se reprograma para la ocurrencia siguiente; si no, queda cerrado
+            siguiente = None
+            if id_recurrencia is not None:
+                siguiente = calcular_vencimiento(db.session.get(Tarea, id_tarea), minutos_antes, inicio)
+            if siguiente is not None:
+                valores = {'venceEn': siguiente}
+            else:
+                valores = {'estado': 'enviado' if a_tiempo else 'vencido'}
+            if a_tiempo:
+                valores['enviado'] = ahora
+
+            # Sin sincronizar la sesión: no hay objetos Recordatorio cargados que actualizar
+            reclamado = db.session.execute(
+                db.update(Recordatorio)
+                .where(Recordatorio.idRecordatorio == id_recordatorio,
+                       Recordatorio.estado == 'pendiente',
+                       Recordatorio.venceEn == vence)
+                .values(**valores)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            # Si la tarea ya empezó hace más de 'tolerancia' (p. ej. el proceso estuvo caído) no se avisa tarde
+            if reclamado and a_tiempo and telefono and telefono.startswith('+'):
+                mensajes.append((telefono, texto_recordatorio(titulo, inicio, minutos_antes)))
+            if reclamado and siguiente is not None and siguiente <= ahora + timedelta(seconds=self.ventana):
+                self._en_heap.add((siguiente, id_recordatorio))
+                heapq.heappush(self._heap, (siguiente, id_recordatorio))
+
+        # Los mensajes se encolan al final (un solo flush) y van en el mismo commit que el reclamo
+        for telefono, cuerpo in mensajes:
+            encolar_mensaje(telefono, cuerpo)
+        db.session.commit()
+        if mensajes:
+            despachador.notificar()
+        return len(listos)
+
+    def vaciar(self, ahora=None):
+        """Carga y procesa todo lo vencido hasta 'ahora' en el hilo actual (pruebas y benchmarks)."""
+        ahora = ahora or datetime.now()
+        total = 0
+        while self.cargar_ventana(ahora):
+            procesados = self.procesar_vencidos(ahora)
+            if not procesados:
+                break
+            while procesados:
+                total += procesados
+                procesados = self.procesar_vencidos(ahora)
+        return total
+
+
+programador_recordatorios = ProgramadorRecordatorios()
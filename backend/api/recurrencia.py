@@ -0,0 +1,183 @@
+import heapq
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from api.models import db, Tarea, Recurrencia, ExcepcionRecurrencia
+
+
+FRECUENCIAS = ('diaria', 'semanal')
+
+# Misma forma que las filas de COLUMNAS_TAREA; el serializador la distingue por tipo
+Ocurrencia = namedtuple('Ocurrencia', ['idTarea', 'titulo', 'descripcion', 'fecha', 'horaInicio',
+                                       'horaFin', 'etiqueta', 'imageUrl', 'idUsuario'])
+
+
+def clave_orden(fila):
+    return (fila.fecha, fila.horaInicio, fila.idTarea)
+
+
+# ---- Valida {"frecuencia", "intervalo", "dias", "hasta", "cantidad"}; devuelve (valores, error)
+def validar_recurrencia(data, fecha_inicio):
+    if not isinstance(data, dict):
+        return None, {'msg': 'La recurrencia debe ser un objeto'}
+
+    frecuencia = data.get('frecuencia')
+    if frecuencia not in FRECUENCIAS:
+        return None, {'msg': 'Frecuencia inválida', 'frecuencias': list(FRECUENCIAS)}
+
+    try:
+        intervalo = int(data.get('intervalo') or 1)
+        cantidad = int(data['cantidad']) if data.get('cantidad') else None
+        hasta = datetime.strptime(data['hasta'], '%Y-%m-%d').date() if data.get('hasta') else None
+    except (ValueError, TypeError) as err:
+        return None, {'msg': 'Recurrencia inválida', 'error': str(err)}
+    if intervalo < 1 or (cantidad is not None and cantidad < 1):
+        return None, {'msg': 'El intervalo y la cantidad deben ser mayores a 0'}
+    if hasta is not None and hasta < fecha_inicio:
+        return None, {'msg': 'La fecha "hasta" es anterior al inicio'}
+
+    dias_semana = None
+    if frecuencia == 'semanal':
+        dias = data.get('dias') or [fecha_inicio.weekday()]
+        if not isinstance(dias, list) or not all(isinstance(d, int) and 0 <= d <= 6 for d in dias):
+            return None, {'msg': 'Los días deben ser enteros de 0 (lunes) a 6 (domingo)'}
+        dias_semana = ",".join(str(d) for d in sorted(set(dias)))
+
+    return {
+        'frecuencia': frecuencia,
+        'intervalo': intervalo,
+        'diasSemana': dias_semana,
+        'hasta': hasta,
+        'cantidad': cantidad
+    }, None
+
+
+# ---- Fechas de las ocurrencias dentro de [desde, hasta_ventana], sin recorrer desde el inicio
+def fechas_ocurrencias(inicio, frecuencia, intervalo, dias_semana, hasta, cantidad, desde, hasta_ventana):
+    fin = min(hasta, hasta_ventana) if hasta else hasta_ventana
+    desde = max(desde, inicio) if desde else inicio
+
+    if frecuencia == 'diaria':
+        # Saltamos directo a la primera ocurrencia >= desde
+        indice = -(-(desde - inicio).days // intervalo)
+        fecha = inicio + timedelta(days=indice * intervalo)
+        paso = timedelta(days=intervalo)
+        while fecha <= fin and (cantidad is None or indice < cantidad):
+            yield fecha
+            fecha += paso
+            indice += 1
+        return
+
+    # Semanal: los periodos son semanas (lunes a domingo) contadas desde la semana de inicio
+    dias = [int(d) for d in dias_semana.split(',')] if dias_semana else [inicio.weekday()]
+    lunes_inicio = inicio - timedelta(days=inicio.weekday())
+    en_primera_semana = sum(1 for d in dias if d >= inicio.weekday())
+
+    semanas = (desde - lunes_inicio).days // 7
+    periodo = semanas // intervalo
+    while True:
+        lunes = lunes_inicio + timedelta(weeks=periodo * intervalo)
+        if lunes > fin:
+            return
+        # Índice de la primera ocurrencia de este periodo (para respetar "cantidad")
+        indice = 0 if periodo == 0 else en_primera_semana + (periodo - 1) * len(dias)
+        for d in dias:
+            fecha = lunes + timedelta(days=d)
+            if fecha < inicio:
+                continue
+            if cantidad is not None and indice >= cantidad:
+                return
+            if fecha > fin:
+                return
+            if fecha >= desde:
+                yield fecha
+            indice += 1
+        periodo += 1
+
+
+def _ocurrencias_de(plantilla, excepciones, desde, hasta_ventana, despues_de):
+    for fecha in fechas_ocurrencias(plantilla.fecha, plantilla.frecuencia, plantilla.intervalo,
+                                    plantilla.diasSemana, plantilla.hasta, plantilla.cantidad,
+                                    desde, hasta_ventana):
+        excepcion = excepciones.get((plantilla.idRecurrencia, fecha))
+        if excepcion is None:
+            ocurrencia = Ocurrencia(plantilla.idTarea, plantilla.titulo, plantilla.descripcion, fecha,
+                                    plantilla.horaInicio, plantilla.horaFin, plantilla.etiqueta,
+                                    plantilla.imageUrl, plantilla.idUsuario)
+        elif excepcion.cancelada:
+            continue
+        else:
+            ocurrencia = Ocurrencia(
+                plantilla.idTarea,
+                excepcion.titulo or plantilla.titulo,
+                excepcion.descripcion or plantilla.descripcion,
+                fecha,
+                excepcion.horaInicio or plantilla.horaInicio,
+                excepcion.horaFin or plantilla.horaFin,
+                excepcion.etiqueta or plantilla.etiqueta,
+                plantilla.imageUrl,
+                plantilla.idUsuario
+            )
+        if despues_de is not None and clave_orden(ocurrencia) <= despues_de:
+            continue
+        yield ocurrencia
+
+
+def _plantillas_y_excepciones(filtro_usuario, desde, hasta_ventana):
+    # Plantillas vigentes en la ventana y todas sus excepciones de la ventana: dos consultas en total
+    consulta = db.session.query(
+        Tarea.idTarea, Tarea.titulo, Tarea.descripcion, Tarea.fecha, Tarea.horaInicio, Tarea.horaFin,
+        Tarea.etiqueta, Tarea.imageUrl, Tarea.idUsuario,
+        Recurrencia.idRecurrencia, Recurrencia.frecuencia, Recurrencia.intervalo,
+        Recurrencia.diasSemana, Recurrencia.hasta, Recurrencia.cantidad
+    ).join(Recurrencia, Recurrencia.idTarea == Tarea.idTarea).filter(
+        filtro_usuario,
+        Tarea.fecha <= hasta_ventana
+    )
+    if desde is not None:
+        consulta = consulta.filter(db.or_(Recurrencia.hasta.is_(None), Recurrencia.hasta >= desde))
+    plantillas = consulta.all()
+    if not plantillas:
+        return [], {}
+
+    filtro = [ExcepcionRecurrencia.idRecurrencia.in_([p.idRecurrencia for p in plantillas]),
+              ExcepcionRecurrencia.fecha <= hasta_ventana]
+    if desde is not None:
+        filtro.append(ExcepcionRecurrencia.fecha >= desde)
+    excepciones = {(e.idRecurrencia, e.fecha): e for e in ExcepcionRecurrencia.query.filter(*filtro)}
+    return plantillas, excepciones
+
+
+def expandir_recurrencias(id_usuario, desde, hasta_ventana, despues_de=None):
+    """
+    Generador de las ocurrencias de todas las tareas recurrentes del usuario en la ventana,
+    ordenadas por (fecha, horaInicio, idTarea). despues_de es la clave del cursor, si hay.
+    """
+    if despues_de is not None and (desde is None or despues_de[0] > desde):
+        desde = despues_de[0]
+
+    plantillas, excepciones = _plantillas_y_excepciones(Recurrencia.idUsuario == id_usuario, desde, hasta_ventana)
+    if not plantillas:
+        return iter(())
+
+    return heapq.merge(
+        *(_ocurrencias_de(p, excepciones, desde, hasta_ventana, despues_de) for p in plantillas),
+        key=clave_orden
+    )
+
+
+def ocurrencias_por_usuario(ids_usuario, fecha):
+    """{idUsuario: [Ocurrencia, ...]} de un día para varios usuarios a la vez (dos consultas en total)."""
+    plantillas, excepciones = _plantillas_y_excepciones(Recurrencia.idUsuario.in_(ids_usuario), fecha, fecha)
+    resultado = {}
+    for plantilla in plantillas:
+        for ocurrencia in _ocurrencias_de(plantilla, excepciones, fecha, fecha, None):
+            resultado.setdefault(plantilla.idUsuario, []).append(ocurrencia)
+    return resultado
+
+
+def es_ocurrencia(recurrencia, fecha):
+    plantilla = recurrencia.tarea
+    return any(True for _ in fechas_ocurrencias(plantilla.fecha, recurrencia.frecuencia, recurrencia.intervalo,
+                                                recurrencia.diasSemana, recurrencia.hasta, recurrencia.cantidad,
+                                                fecha, fecha))
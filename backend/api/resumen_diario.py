@@ -0,0 +1,172 @@
+import os
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import IntegrityError
+
+from api.models import db, Usuario, Tarea, Recurrencia, EjecucionResumenDiario
+from api.mensajeria import despachador, encolar_mensaje
+from api.metricas import metricas
+from api.limites import TokenBucket
+from api.recurrencia import ocurrencias_por_usuario
+
+# WhatsApp corta los mensajes largos; más allá de esto se resume con "y N más"
+MAXIMO_TAREAS_EN_RESUMEN = 20
+
+
+def texto_resumen(nombre, fecha, tareas):
+    """tareas: lista de (horaInicio, titulo) ya ordenada."""
+    lineas = [f"☀️ ¡Buen día, {nombre}!", f"📋 Tus tareas de hoy ({fecha.strftime('%d/%m')}):"]
+    for hora_inicio, titulo in tareas[:MAXIMO_TAREAS_EN_RESUMEN]:
+        lineas.append(f"📌 {titulo} a las {hora_inicio.strftime('%H:%M')}")
+    if len(tareas) > MAXIMO_TAREAS_EN_RESUMEN:
+        lineas.append(f"… y {len(tareas) - MAXIMO_TAREAS_EN_RESUMEN} más")
+    return "\n".join(lineas)
+
+
+class EnviadorResumenDiario:
+    """
+    Manda a cada usuario con teléfono el resumen de sus tareas del día.
+
+    Recorre los usuarios por lotes de idUsuario (keyset) y trae las tareas de todo el lote con una
+    consulta (más dos para las recurrentes), no una por usuario. Los envíos salen en paralelo con
+    un pool de workers, todos bajo el mismo token bucket para no pasar el límite de Twilio; los que
+    fallan se encolan en el outbox y los reintenta el despachador.
+
+    Al terminar cada lote se guarda el checkpoint (ejecucion_resumen_diario.ultimoUsuario) en la
+    misma transacción que los reencolados. Una corrida cortada sigue desde ahí: a lo sumo se repiten
+    los mensajes del lote que estaba en curso. El checkpoint se avanza con un UPDATE condicional,
+    así dos corridas simultáneas del mismo día no recorren los mismos lotes.
+    """
+
+    def __init__(self, lote=500, workers=8, mensajes_por_segundo=20.0, rafaga=None):
+        self.app = None
+        self.transporte = None
+        self.lote = lote
+        self.workers = workers
+        self.mensajes_por_segundo = mensajes_por_segundo
+        self.rafaga = rafaga
+        self.limitador = TokenBucket(mensajes_por_segundo, rafaga)
+
+    def init_app(self, app, transporte):
+        self.app = app
+        self.transporte = transporte
+        self.lote = int(os.getenv('RESUMEN_DIARIO_LOTE', self.lote))
+        self.workers = int(os.getenv('RESUMEN_DIARIO_WORKERS', self.workers))
+        self.mensajes_por_segundo = float(os.getenv('RESUMEN_DIARIO_MENSAJES_POR_SEGUNDO', self.mensajes_por_segundo))
+        rafaga = os.getenv('RESUMEN_DIARIO_RAFAGA')
+        self.rafaga = float(rafaga) if rafaga else self.rafaga
+        self.limitador = TokenBucket(self.mensajes_por_segundo, self.rafaga)
+
+    # ---- Checkpoint
+    def _ejecucion(self, fecha, reiniciar):
+        ejecucion = db.session.get(EjecucionResumenDiario, fecha)
+        if ejecucion is None:
+            try:
+                ejecucion = EjecucionResumenDiario(fecha=fecha, ultimoUsuario=0, estado='en_curso',
+                                                   enviados=0, sinTareas=0, reencolados=0)
+                db.session.add(ejecucion)
+                db.session.commit()
+            except IntegrityError:
+                # Otra corrida la creó recién
+                db.session.rollback()
+                ejecucion = db.session.get(EjecucionResumenDiario, fecha)
+        elif reiniciar:
+            ejecucion.ultimoUsuario = 0
+            ejecucion.estado = 'en_curso'
+            ejecucion.enviados = ejecucion.sinTareas = ejecucion.reencolados = 0
+            ejecucion.inicio = ejecucion.actualizado = datetime.now()
+            db.session.commit()
+        return ejecucion
+
+    def _avanzar(self, fecha, desde, hasta, enviados, sin_tareas, reencolados, completo=False):
+        tabla = EjecucionResumenDiario
+        valores = {'ultimoUsuario': hasta, 'actualizado': datetime.now(),
+                   'enviados': tabla.enviados + enviados, 'sinTareas': tabla.sinTareas + sin_tareas,
+                   'reencolados': tabla.reencolados + reencolados}
+        if completo:
+            valores['estado'] = 'completo'
+        return db.session.execute(
+            db.update(tabla)
+            .where(tabla.fecha == fecha, tabla.ultimoUsuario == desde, tabla.estado == 'en_curso')
+            .values(**valores)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    # ---- Lectura por lotes
+    def _usuarios(self, despues_de):
+        return db.session.query(Usuario.idUsuario, Usuario.nombre, Usuario.telefono).filter(
+            Usuario.idUsuario > despues_de,
+            Usuario.telefono.like('+%')
+        ).order_by(Usuario.idUsuario).limit(self.lote).all()
+
+    def _tareas_del_lote(self, ids, fecha):
+        """{idUsuario: [(horaInicio, titulo), ...]} ordenado por hora."""
+        tareas = {}
+        filas = db.session.query(Tarea.idUsuario, Tarea.horaInicio, Tarea.titulo).filter(
+            Tarea.idUsuario.in_(ids),
+            Tarea.fecha == fecha,
+            ~db.exists().where(Recurrencia.idTarea == Tarea.idTarea)
+        )
+        for id_usuario, hora_inicio, titulo in filas:
+            tareas.setdefault(id_usuario, []).append((hora_inicio, titulo))
+        for id_usuario, ocurrencias in ocurrencias_por_usuario(ids, fecha).items():
+            tareas.setdefault(id_usuario, []).extend((o.horaInicio, o.titulo) for o in ocurrencias)
+        for lista in tareas.values():
+            lista.sort()
+        return tareas
+
+    # ---- Envío
+    def _enviar(self, destino, cuerpo):
+        self.limitador.esperar()
+        try:
+            with metricas.span('resumen_diario_envio'):
+                self.transporte.send(destino, cuerpo)
+            return None
+        except Exception as ex:
+            return str(ex) or ex.__class__.__name__
+
+    def ejecutar(self, fecha=None, reiniciar=False):
+        """Corre (o retoma) el envío del día en el hilo actual. Devuelve la ejecución serializada."""
+        fecha = fecha or datetime.now().date()
+        ejecucion = self._ejecucion(fecha, reiniciar)
+        cursor = ejecucion.ultimoUsuario
+        if ejecucion.estado == 'completo':
+            return ejecucion.serialize()
+        db.session.rollback()
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='resumen-diario') as pool:
+            while True:
+                usuarios = self._usuarios(cursor)
+                if not usuarios:
+                    self._avanzar(fecha, cursor, cursor, 0, 0, 0, completo=True)
+                    db.session.commit()
+                    break
+
+                tareas = self._tareas_del_lote([u.idUsuario for u in usuarios], fecha)
+                db.session.rollback()  # no retener la transacción de lectura mientras se envía
+                mensajes = [(u.telefono, texto_resumen(u.nombre, fecha, tareas[u.idUsuario]))
+                            for u in usuarios if u.idUsuario in tareas]
+                errores = list(pool.map(lambda m: self._enviar(*m), mensajes))
+
+                # Los fallidos quedan en el outbox, en la misma transacción que el checkpoint
+                fallidos = [m for m, error in zip(mensajes, errores) if error is not None]
+                for telefono, cuerpo in fallidos:
+                    encolar_mensaje(telefono, cuerpo)
+                siguiente = usuarios[-1].idUsuario
+                avanzado = self._avanzar(fecha, cursor, siguiente, len(mensajes) - len(fallidos),
+                                         len(usuarios) - len(mensajes), len(fallidos))
+                if not avanzado:
+                    # Otra corrida avanzó el checkpoint: la dejamos seguir a ella
+                    db.session.rollback()
+                    break
+                db.session.commit()
+                if fallidos:
+                    despachador.notificar()
+                cursor = siguiente
+
+        db.session.expire_all()
+        return db.session.get(EjecucionResumenDiario, fecha).serialize()
+
+
+resumen_diario = EnviadorResumenDiario()
@@ -0,0 +1,121 @@
+import re
+import json
+
+from flask import current_app
+
+from api.models import Tarea, Usuario
+from api.recurrencia import Ocurrencia
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el json de la librería estándar
+    orjson = None
+
+
+# Camino rápido para listados de tareas: en vez de hidratar objetos Tarea y llamar a serialize()
+# por fila, se seleccionan solo estas columnas como tuplas y se formatean en bloque.
+# El orden es el mismo que el de Tarea.serialize().
+COLUMNAS_TAREA = (
+    Tarea.idTarea,
+    Tarea.titulo,
+    Tarea.descripcion,
+    Tarea.fecha,
+    Tarea.horaInicio,
+    Tarea.horaFin,
+    Tarea.etiqueta,
+    Tarea.imageUrl,
+    Tarea.idUsuario,
+)
+
+# Igual que Usuario.serialize(), sin hidratar objetos
+COLUMNAS_USUARIO = (
+    Usuario.idUsuario,
+    Usuario.nombre,
+    Usuario.email,
+    Usuario.telefono,
+)
+
+_RE_NO_ASCII = re.compile(r"[^\x00-\x7f]")
+
+
+def serializar_filas_tarea(filas):
+    """
+    Equivalente a [t.serialize() for t in tareas] para filas (idTarea, titulo, ..., idUsuario).
+    Las ocurrencias de tareas recurrentes llevan además 'recurrente': True.
+    """
+    # Las fechas y horas se repiten mucho en un listado: se formatea cada valor distinto una sola vez
+    fechas = {}
+    horas = {}
+    resultado = []
+    for fila in filas:
+        id_tarea, titulo, descripcion, fecha, hora_inicio, hora_fin, etiqueta, image_url, id_usuario = fila
+        fecha_str = fechas.get(fecha)
+        if fecha_str is None:
+            fecha_str = fechas[fecha] = fecha.strftime('%Y-%m-%d')
+        inicio_str = horas.get(hora_inicio)
+        if inicio_str is None:
+            inicio_str = horas[hora_inicio] = hora_inicio.strftime('%H:%M')
+        fin_str = horas.get(hora_fin)
+        if fin_str is None:
+            fin_str = horas[hora_fin] = hora_fin.strftime('%H:%M')
+        resultado.append({
+            'idTarea': id_tarea,
+            'titulo': titulo,
+            'descripcion': descripcion,
+            'fecha': fecha_str,
+            'horaInicio': inicio_str,
+            'horaFin': fin_str,
+            'etiqueta': etiqueta,
+            'imageUrl': image_url,
+            'idUsuario': id_usuario
+        })
+        if type(fila) is Ocurrencia:
+            resultado[-1]['recurrente'] = True
+    return resultado
+
+
+def serializar_fila_usuario(fila):
+    id_usuario, nombre, email, telefono = fila
+    return {'idUsuario': id_usuario, 'nombre': nombre, 'email': email, 'telefono': telefono}
+
+
+def _escape_unicode(match):
+    codigo = ord(match.group())
+    if codigo < 0x10000:
+        return '\\u%04x' % codigo
+    codigo -= 0x10000
+    return '\\u%04x\\u%04x' % (0xd800 | (codigo >> 10), 0xdc00 | (codigo & 0x3ff))
+
+
+def dumps_rapido(datos, sort_keys=True, ensure_ascii=True):
+    """
+    Igual que json.dumps(datos, separators=(",", ":"), sort_keys=..., ensure_ascii=...) byte a byte,
+    pero con orjson cuando está instalado.
+    """
+    if orjson is not None:
+        try:
+            texto = orjson.dumps(datos, option=orjson.OPT_SORT_KEYS if sort_keys else 0).decode()
+        except (TypeError, orjson.JSONEncodeError):
+            texto = None
+        if texto is not None:
+            if ensure_ascii and not texto.isascii():
+                texto = _RE_NO_ASCII.sub(_escape_unicode, texto)
+            return texto
+    return json.dumps(datos, separators=(",", ":"), sort_keys=sort_keys, ensure_ascii=ensure_ascii)
+
+
+def respuesta_json(datos, status=200):
+    """Reemplazo de jsonify(...) con la misma salida; en modo debug delega en jsonify (indentado)."""
+    app = current_app
+    proveedor = app.json
+    compact = getattr(proveedor, 'compact', None)
+    if not hasattr(proveedor, 'sort_keys') or (compact is None and app.debug) or compact is False:
+        return proveedor.response(datos), status
+    cuerpo = dumps_rapido(datos, sort_keys=proveedor.sort_keys, ensure_ascii=proveedor.ensure_ascii)
+    return app.response_class(f"{cuerpo}\n", mimetype=proveedor.mimetype), status
+
+
+def opciones_json():
+    """(sort_keys, ensure_ascii) del proveedor JSON de la app, para serializar igual que jsonify."""
+    proveedor = current_app.json
+    return getattr(proveedor, 'sort_keys', True), getattr(proveedor, 'ensure_ascii', True)
@@ -1,15 +1,42 @@
 import os
-import requests
-from openai import OpenAI
-from twilio.rest import Client as TwilioClient
+import time
+import uuid
+import base64
+import zlib
+import heapq
+import itertools
+import threading
 import json
-from flask import Flask, jsonify, request
+import click
+from collections import namedtuple
+from flask import Flask, jsonify, request, stream_with_context
 from flask_migrate import Migrate, upgrade
 from flask_cors import CORS
 from dotenv import load_dotenv
-from api.models import db, Usuario, Tarea  
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, JWTManager
+from api.models import db, Usuario, Tarea, MensajeEntrante, Recurrencia, ExcepcionRecurrencia, incrementar_revision_tareas
+from api.models import ResumenSemanal, acumular_resumen, aplicar_resumen_semanal, semana_iso, Recordatorio
+from api.models import CursorListadoWhatsapp
+from api.mensajeria import despachador, encolar_mensaje, TransporteTwilio, TransporteFalso
+from api.mensajeria import TransporteTwilioHttp, TransporteLimitado
+from api.entrantes import procesador_entrantes
+from api.recordatorios import programador_recordatorios, programar_recordatorio, validar_minutos_antes
+from api.resumen_diario import resumen_diario
+from api.intenciones import clasificador_intenciones
+from api.parser_tareas import parsear_tarea, estadisticas_parser, UMBRAL_CONFIANZA
+from api.cache_extraccion import cache_extraccion, CacheLRU
+from api.serializacion import COLUMNAS_TAREA, serializar_filas_tarea, respuesta_json
+from api.serializacion import COLUMNAS_USUARIO, serializar_fila_usuario, dumps_rapido, opciones_json
+from api.recurrencia import validar_recurrencia, expandir_recurrencias, es_ocurrencia, clave_orden
+from api.motor import opciones_motor, configurar_motor
+from api.metricas import metricas
+from api.circuito import Circuito
+from api.proveedores_ia import ProveedorOpenAI, ProveedorChatHttp, EnrutadorIA, IANoDisponible, json_de_respuesta
+from api.prompt_tareas import ConstructorPrompt, validar_tarea, ESQUEMA_TAREA
+from api.intervalos import indice_intervalos, rango_minutos, a_minutos, minutos_a_hora
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt, JWTManager
 from datetime import timedelta, datetime, date
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError
 
 
 
@@ -20,7 +47,7 @@ CORS(app,
      resources={r"/*": {"origins": "https://planificador-semanal-omega.vercel.app"}},
      supports_credentials=False,
      allow_headers=["Content-Type", "Authorization"],
-     expose_headers=["Content-Type", "Authorization"],
+     expose_headers=["Content-Type", "Authorization", "X-Siguiente-Cursor", "ETag"],
      methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
 
 
@@ -35,9 +62,131 @@ OPENAI_PROJECT_ID = os.getenv("OPENAI_PROJECT_ID")
 
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
 
+# Plazo por llamada y circuit breaker de cada proveedor de IA: si está lento o caído, después de
+# <PROVEEDOR>_CIRCUITO_UMBRAL fallos seguidos (error, timeout o más de <PROVEEDOR>_CIRCUITO_LENTA
+# segundos) se deja de llamar durante <PROVEEDOR>_CIRCUITO_APERTURA segundos y se usa el otro
+# proveedor, o el bot responde sin IA.
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', 8))
+OPENAI_REINTENTOS = int(os.getenv('OPENAI_REINTENTOS', 0))
+DEEPSEEK_TIMEOUT = float(os.getenv('DEEPSEEK_TIMEOUT', 8))
+
+
+def circuito_ia(nombre):
+    prefijo = nombre.upper()
+    return Circuito(
+        nombre,
+        umbral=int(os.getenv(f'{prefijo}_CIRCUITO_UMBRAL', 5)),
+        lenta=float(os.getenv(f'{prefijo}_CIRCUITO_LENTA', 5)),
+        apertura=float(os.getenv(f'{prefijo}_CIRCUITO_APERTURA', 30))
+    )
+
 # print(f"TW_SID: {TW_SID}, TW_FROM: {TW_FROM}, OPENAI_API_KEY: {OPENAI_API_KEY}")
-openai_client = OpenAI(api_key=OPENAI_API_KEY,project=OPENAI_PROJECT_ID)
-twilio_client = TwilioClient(TW_SID, TW_TOKEN)
+
+# Los clientes (y los SDK de openai/twilio, que pesan) se crean recién en el primer uso,
+# así los workers que solo sirven /tareas no pagan ese costo al arrancar.
+openai_client = None
+twilio_client = None
+_clientes_lock = threading.Lock()
+
+
+def get_openai_client():
+    global openai_client
+    if openai_client is None:
+        with _clientes_lock:
+            if openai_client is None:
+                from openai import OpenAI
+                openai_client = OpenAI(api_key=OPENAI_API_KEY, project=OPENAI_PROJECT_ID,
+                                       timeout=OPENAI_TIMEOUT, max_retries=OPENAI_REINTENTOS)
+    return openai_client
+
+
+def get_twilio_client():
+    global twilio_client
+    if twilio_client is None:
+        with _clientes_lock:
+            if twilio_client is None:
+                from twilio.rest import Client as TwilioClient
+                twilio_client = TwilioClient(TW_SID, TW_TOKEN)
+    return twilio_client
+
+
+# Proveedores de IA para interpretar tareas:
+#   "openai"      -> SDK oficial de OpenAI (por defecto)
+#   "openai_http" -> la API de OpenAI directo por HTTP, sin el SDK
+#   "deepseek"    -> API de DeepSeek (compatible con la de OpenAI)
+# IA_SECUNDARIO (opcional) es el respaldo cuando el primario no responde o devuelve cualquier cosa.
+# Con IA_HEDGING=1, además, si el primario tarda más que su p90 (IA_HEDGING_PERCENTIL) se le
+# pide también al secundario y se usa la primera respuesta válida.
+# IA_FORMATO: "esquema" (JSON validado contra ESQUEMA_TAREA por la API, por defecto), "json" o
+# "texto". Los modos JSON necesitan un modelo que los admita (gpt-4o, gpt-4o-mini, deepseek-chat);
+# con OPENAI_MODELO=gpt-4 hay que usar IA_FORMATO=texto.
+OPENAI_MODELO = os.getenv('OPENAI_MODELO', 'gpt-4o-mini')
+DEEPSEEK_MODELO = os.getenv('DEEPSEEK_MODELO', 'deepseek-chat')
+IA_FORMATO = os.getenv('IA_FORMATO', 'esquema')
+IA_MAX_TOKENS = int(os.getenv('IA_MAX_TOKENS', 150))
+
+
+def crear_proveedor_ia(tipo):
+    if tipo == 'openai':
+        return ProveedorOpenAI(get_openai_client, OPENAI_MODELO, OPENAI_TIMEOUT, circuito_ia('openai'), IA_FORMATO)
+    if tipo == 'openai_http':
+        return ProveedorChatHttp('openai_http',
+                                 os.getenv('OPENAI_API_URL', 'https://api.openai.com/v1/chat/completions'),
+                                 OPENAI_API_KEY, OPENAI_MODELO, OPENAI_TIMEOUT, circuito_ia('openai_http'),
+                                 IA_FORMATO, admite_esquema=True)
+    if tipo == 'deepseek':
+        return ProveedorChatHttp('deepseek',
+                                 os.getenv('DEEPSEEK_API_URL', 'https://api.deepseek.com/v1/chat/completions'),
+                                 DEEPSEEK_API_KEY, DEEPSEEK_MODELO, DEEPSEEK_TIMEOUT, circuito_ia('deepseek'),
+                                 IA_FORMATO)
+    raise ValueError(f"Proveedor de IA desconocido: {tipo}")
+
+
+IA_SECUNDARIO = os.getenv('IA_SECUNDARIO')
+enrutador_ia = EnrutadorIA(
+    crear_proveedor_ia(os.getenv('IA_PROVEEDOR', 'openai')),
+    crear_proveedor_ia(IA_SECUNDARIO) if IA_SECUNDARIO else None,
+    hedging=os.getenv('IA_HEDGING', '0') == '1',
+    percentil=float(os.getenv('IA_HEDGING_PERCENTIL', 0.9)),
+    espera_inicial=float(os.getenv('IA_HEDGING_ESPERA', 2))
+)
+# Tope (estimado) de tokens del prompt de extracción: los ejemplos que no entran se omiten
+constructor_prompt = ConstructorPrompt(presupuesto=int(os.getenv('IA_PRESUPUESTO_PROMPT', 600)))
+
+
+def validar_respuesta_tarea(contenido):
+    return validar_tarea(json_de_respuesta(contenido))
+
+
+# Transporte de WhatsApp:
+#   "twilio"     -> API REST de Twilio con un pool de conexiones keep-alive por proceso (por defecto)
+#   "twilio_sdk" -> cliente oficial de Twilio
+#   "falso"      -> en memoria, para pruebas y corridas de carga
+TIPO_TRANSPORTE = os.getenv('WHATSAPP_TRANSPORTE', 'twilio')
+if TIPO_TRANSPORTE == 'falso':
+    transporte_whatsapp = TransporteFalso(latencia=float(os.getenv('WHATSAPP_FALSO_LATENCIA', 0)))
+elif TIPO_TRANSPORTE == 'twilio_sdk':
+    transporte_whatsapp = TransporteTwilio(get_twilio_client, TW_FROM)
+else:
+    transporte_whatsapp = TransporteTwilioHttp(
+        TW_SID, TW_TOKEN, TW_FROM,
+        base_url=os.getenv('TWILIO_API_URL', 'https://api.twilio.com'),
+        pool=int(os.getenv('TWILIO_POOL', 10)),
+        timeout=float(os.getenv('TWILIO_TIMEOUT', 10)),
+        reintentos=int(os.getenv('TWILIO_REINTENTOS', 2))
+    )
+
+# Límite de mensajes por segundo del proceso (0 = sin límite). Con el bucket vacío:
+# WHATSAPP_MODO_LIMITE=bloquear (espera), encolar (vuelve al outbox) o fallar (cuenta como intento fallido)
+MENSAJES_POR_SEGUNDO = float(os.getenv('WHATSAPP_MENSAJES_POR_SEGUNDO', 80))
+if MENSAJES_POR_SEGUNDO > 0:
+    rafaga = os.getenv('WHATSAPP_RAFAGA')
+    transporte_whatsapp = TransporteLimitado(
+        transporte_whatsapp, MENSAJES_POR_SEGUNDO,
+        rafaga=float(rafaga) if rafaga else None,
+        modo=os.getenv('WHATSAPP_MODO_LIMITE', 'bloquear'),
+        espera_maxima=float(os.getenv('WHATSAPP_ESPERA_MAXIMA', 30))
+    )
 
 #----------------------------------------------------- Base de Datos -----------------------------------------------------------------
 
@@ -49,10 +198,16 @@ default_uri = f"sqlite:///{ruta_sqlite}"
 # 2) Usa DATABASE_URL si está definido, si no, SQLite local
 db_uri = os.getenv("DATABASE_URL", default_uri).replace("postgres://", "postgresql://")
 app.config["SQLALCHEMY_DATABASE_URI"] = db_uri
+# 3) Perfil de ajuste del motor (DB_PERFIL=auto|ninguno): WAL y pragmas en SQLite, pool en Postgres
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = opciones_motor(db_uri)
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
 db.init_app(app)
 Migrate(app, db, compare_type=True)
+with app.app_context():
+    configurar_motor(db.engine)
+    # Latencia por endpoint, SQL por request y spans, expuestos en /metrics
+    metricas.init_app(app, db.engine)
 
 # Configuraciones de JWT
 app.config["JWT_SECRET_KEY"] = "clave-secreta"
@@ -60,6 +215,117 @@ app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=1)
 
 jwt = JWTManager(app)
 
+# ---- Usuario autenticado
+# El token trae el idUsuario como claim, así las rutas no necesitan buscar al usuario por email.
+# Cuando sí hacen falta sus datos, se usa una caché chica por id que se invalida al borrarlo.
+UsuarioCacheado = namedtuple('UsuarioCacheado', ['idUsuario', 'nombre', 'email', 'telefono'])
+cache_usuarios = CacheLRU(maximo=int(os.getenv('CACHE_USUARIOS_MAXIMO', 2048)),
+                          ttl=int(os.getenv('CACHE_USUARIOS_TTL', 300)))
+
+
+def usuario_actual():
+    id_usuario = get_jwt().get('idUsuario')
+    if id_usuario is not None:
+        cacheado = cache_usuarios.get(id_usuario)
+        if cacheado is not None:
+            return cacheado
+        usuario = db.session.get(Usuario, id_usuario)
+    else:
+        # Tokens emitidos antes de incluir el claim idUsuario
+        email_user = get_jwt_identity()
+        usuario = Usuario.query.filter_by(email=email_user).first() if email_user else None
+
+    if not usuario:
+        return None
+    cacheado = UsuarioCacheado(usuario.idUsuario, usuario.nombre, usuario.email, usuario.telefono)
+    cache_usuarios.set(cacheado.idUsuario, cacheado)
+    return cacheado
+
+
+def id_usuario_actual():
+    id_usuario = get_jwt().get('idUsuario')
+    if id_usuario is not None:
+        return id_usuario
+    usuario = usuario_actual()
+    return usuario.idUsuario if usuario else None
+
+# Despachador del outbox de WhatsApp. Corre dentro del proceso web salvo OUTBOX_EN_PROCESO=0,
+# en cuyo caso se levanta aparte con `flask despachar-mensajes`.
+despachador.init_app(app, transporte_whatsapp)
+OUTBOX_EN_PROCESO = os.getenv('OUTBOX_EN_PROCESO', '1') == '1'
+
+# Programador de recordatorios: igual que el despachador, en proceso salvo RECORDATORIOS_EN_PROCESO=0
+# (entonces corre aparte con `flask programar-recordatorios`)
+programador_recordatorios.init_app(app)
+RECORDATORIOS_EN_PROCESO = os.getenv('RECORDATORIOS_EN_PROCESO', '1') == '1'
+
+@app.before_request
+def iniciar_despachador():
+    if OUTBOX_EN_PROCESO:
+        despachador.iniciar()
+    if RECORDATORIOS_EN_PROCESO:
+        programador_recordatorios.iniciar()
+    procesador_entrantes.iniciar()
+
+
+@app.cli.command('despachar-mensajes')
+def despachar_mensajes():
+    despachador.iniciar()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        despachador.detener()
+
+
+@app.cli.command('programar-recordatorios')
+def programar_recordatorios():
+    programador_recordatorios.iniciar()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        programador_recordatorios.detener()
+
+
+# Resumen de las tareas del día por WhatsApp a todos los usuarios. Pensado para un cron por la
+# mañana; si se corta, volver a correrlo sigue desde el último lote completo.
+resumen_diario.init_app(app, transporte_whatsapp)
+
+@app.cli.command('enviar-resumen-diario')
+@click.option('--fecha', default=None, help='YYYY-MM-DD (por defecto hoy)')
+@click.option('--reiniciar', is_flag=True, help='Empezar de cero aunque ya haya un checkpoint')
+def enviar_resumen_diario(fecha, reiniciar):
+    dia = datetime.strptime(fecha, "%Y-%m-%d").date() if fecha else None
+    inicio = time.perf_counter()
+    resultado = resumen_diario.ejecutar(dia, reiniciar=reiniciar)
+    print(f"Resumen diario {resultado['fecha']}: {resultado['estado']}, {resultado['enviados']} enviados, "
+          f"{resultado['sinTareas']} sin tareas, {resultado['reencolados']} al outbox "
+          f"({time.perf_counter() - inicio:.1f}s)")
+
+
+# Recalcula resumen_semanal desde cero (datos previos a la tabla o si se desincronizó).
+# Igual que al guardar, sin las plantillas recurrentes: esas se suman al leer la semana.
+@app.cli.command('recalcular-resumen-semanal')
+def recalcular_resumen_semanal():
+    deltas = {}
+    filas = db.session.execute(
+        db.select(Tarea.idUsuario, Tarea.fecha, Tarea.horaInicio, Tarea.horaFin, Tarea.etiqueta)
+        .where(~db.exists().where(Recurrencia.idTarea == Tarea.idTarea))
+        .execution_options(yield_per=5000)
+    )
+    for fila in filas:
+        acumular_resumen(deltas, *fila)
+
+    db.session.execute(db.delete(ResumenSemanal))
+    if deltas:
+        db.session.execute(db.insert(ResumenSemanal), [
+            {'idUsuario': id_usuario, 'semana': semana, 'etiqueta': etiqueta, 'cantidad': cantidad, 'minutos': minutos}
+            for (id_usuario, semana, etiqueta), (cantidad, minutos) in deltas.items()
+        ])
+    db.session.commit()
+    print(f"Resumen semanal recalculado: {len(deltas)} filas")
+
 #---------------------------------------------------- Termina la BD configuración -----------------------------------------------------
 
 
@@ -111,11 +377,72 @@ def crear_usuario():
 
 
 
-# Ruta para obtener todos los usuarios
+LIMITE_MAXIMO_USUARIOS = int(os.getenv('LIMITE_MAXIMO_USUARIOS', 1000))
+LOTE_STREAM_USUARIOS = int(os.getenv('LOTE_STREAM_USUARIOS', 1000))
+
+
+# ---- Recorre los usuarios con un cursor del lado del servidor, de a LOTE_STREAM_USUARIOS filas
+def iterar_usuarios(despues_de=None, limite=None):
+    consulta = db.select(*COLUMNAS_USUARIO).order_by(Usuario.idUsuario)
+    if despues_de is not None:
+        consulta = consulta.where(Usuario.idUsuario > despues_de)
+    if limite is not None:
+        consulta = consulta.limit(limite)
+    filas = db.session.execute(consulta.execution_options(yield_per=LOTE_STREAM_USUARIOS))
+    for fila in filas:
+        yield serializar_fila_usuario(fila)
+
+
+def stream_usuarios_ndjson(despues_de, limite):
+    sort_keys, ensure_ascii = opciones_json()
+    for usuario in iterar_usuarios(despues_de, limite):
+        yield dumps_rapido(usuario, sort_keys, ensure_ascii) + "\n"
+
+
+def stream_usuarios_array(despues_de):
+    # Mismo cuerpo que jsonify(lista), pero se arma de a un usuario
+    sort_keys, ensure_ascii = opciones_json()
+    separador = "["
+    for usuario in iterar_usuarios(despues_de):
+        yield separador + dumps_rapido(usuario, sort_keys, ensure_ascii)
+        separador = ","
+    yield "[]\n" if separador == "[" else "]\n"
+
+
+# Ruta para obtener los usuarios.
+# Con ?limit= pagina por idUsuario (?cursor= es el último idUsuario recibido, el siguiente va en
+# X-Siguiente-Cursor). Sin límite, la lista se transmite en chunks; con ?formato=ndjson, un usuario por línea.
+# En ningún caso se cargan todos los usuarios en memoria.
 @app.route('/usuarios', methods=['GET'])
 def obtener_usuarios():
-    usuarios = Usuario.query.all()
-    return jsonify([u.serialize() for u in usuarios]), 200
+    try:
+        despues_de = int(request.args['cursor']) if request.args.get('cursor') else None
+        limite = int(request.args['limit']) if request.args.get('limit') else None
+    except ValueError as err:
+        return jsonify({'msg': 'Parámetros inválidos', 'error': str(err)}), 400
+    if limite is not None and limite < 1:
+        return jsonify({'msg': 'El límite debe ser mayor a 0'}), 400
+
+    # NDJSON: el límite (si hay) solo corta el stream; para seguir, ?cursor= con el último idUsuario leído
+    if request.args.get('formato') == 'ndjson':
+        return app.response_class(stream_with_context(stream_usuarios_ndjson(despues_de, limite)),
+                                  mimetype='application/x-ndjson'), 200
+
+    if limite is None:
+        return app.response_class(stream_with_context(stream_usuarios_array(despues_de)),
+                                  mimetype=app.json.mimetype), 200
+
+    # Una fila de más para saber si hay otra página
+    limite = min(limite, LIMITE_MAXIMO_USUARIOS)
+    consulta = db.select(*COLUMNAS_USUARIO).order_by(Usuario.idUsuario).limit(limite + 1)
+    if despues_de is not None:
+        consulta = consulta.where(Usuario.idUsuario > despues_de)
+    filas = db.session.execute(consulta).all()
+
+    respuesta, status = respuesta_json([serializar_fila_usuario(f) for f in filas[:limite]], 200)
+    if len(filas) > limite:
+        respuesta.headers['X-Siguiente-Cursor'] = str(filas[limite - 1].idUsuario)
+    return respuesta, status
 
 
 
@@ -149,7 +476,7 @@ def login_usuario():
     access_token = create_access_token(
         identity=usuario.email,
         expires_delta=timedelta(hours=1),
-        additional_claims={"telefono": usuario.telefono, "nombre": usuario.nombre}
+        additional_claims={"idUsuario": usuario.idUsuario, "telefono": usuario.telefono, "nombre": usuario.nombre}
     )
     return jsonify({'msg' : 'Usuario Logeado Exitosamente', 'usuario' : usuario.serialize(), 'token': access_token}), 200
 
@@ -161,18 +488,21 @@ def login_usuario():
 def eliminar_usuario(email):
     
     # Verificamos si el usuario está autenticado
-    email_user = get_jwt_identity()
-    if not email_user:
-        return jsonify({'error': 'Usuario no autenticado'}), 401
+    id_usuario = id_usuario_actual()
+    if not id_usuario:
+        return jsonify({'error': 'Usuario no encontrado'}), 404
     
-    # Buscamos el usuario por email
-    usuario = Usuario.query.filter_by(email=email_user).first()
+    # Buscamos el usuario por id (claim del token)
+    usuario = db.session.get(Usuario, id_usuario)
     if not usuario:
         return jsonify({'error': 'Usuario no encontrado'}), 404
     
-    # Eliminamos el usuario
+    # Eliminamos el usuario (y su resumen semanal y cursor de WhatsApp)
+    db.session.execute(db.delete(ResumenSemanal).where(ResumenSemanal.idUsuario == id_usuario))
+    db.session.execute(db.delete(CursorListadoWhatsapp).where(CursorListadoWhatsapp.idUsuario == id_usuario))
     db.session.delete(usuario)
     db.session.commit()     
+    cache_usuarios.borrar(id_usuario)
 
     return jsonify({'msg': 'Usuario eliminado exitosamente'}), 200
 
@@ -201,10 +531,22 @@ def obtener_tareas_por_telefono(telefono):
     
     if not usuario:
         return jsonify({'error': 'Usuario no encontrado'}), 404
+
+    # Si el cliente ya tiene esta revisión, respondemos 304 sin consultar las tareas
+    etag = etag_tareas(usuario.idUsuario, usuario.revisionTareas)
+    if request.if_none_match.contains(etag):
+        return respuesta_no_modificada(etag)
     
-    # Obtenemos las tareas del usuario
-    tareas = usuario.tareas
-    return jsonify([t.serialize() for t in tareas]), 200
+    # Obtenemos las tareas del usuario (admite ?desde=&hasta=&limit=&cursor=)
+    try:
+        tareas, siguiente = consultar_tareas(usuario.idUsuario, request.args)
+    except ValueError as err:
+        return jsonify({'error': 'Parámetros inválidos', 'detalle': str(err)}), 400
+
+    respuesta, status = respuesta_json(serializar_filas_tarea(tareas), 200)
+    if siguiente:
+        respuesta.headers['X-Siguiente-Cursor'] = siguiente
+    return con_etag(respuesta, etag), status
 
 
 #------------------------------------------------------- Finalizan las rutas de Usuario -------------------------------------------------------------------------
@@ -213,27 +555,214 @@ def obtener_tareas_por_telefono(telefono):
 
 # ----------------------------------------------------------- Rutas para tareas ---------------------------------------------------------------------------------
 
+LIMITE_MAXIMO_TAREAS = 500
+# Si no se pide ?hasta=, las tareas recurrentes sin fin se expanden hasta hoy + este horizonte
+HORIZONTE_RECURRENCIA_DIAS = int(os.getenv('HORIZONTE_RECURRENCIA_DIAS', 365))
+
+
+def fin_ventana_recurrencias(hasta=None):
+    return hasta or (datetime.now().date() + timedelta(days=HORIZONTE_RECURRENCIA_DIAS))
+
+
+# ---- ETag de los listados: revisión de tareas del usuario + parámetros de la consulta
+def etag_tareas(id_usuario, revision):
+    etag = f"{id_usuario}-{revision}-{zlib.crc32(request.query_string):08x}"
+    # Sin ?hasta= la ventana de recurrencias avanza con el día aunque la revisión no cambie
+    if not request.args.get('hasta'):
+        etag += f"-{fin_ventana_recurrencias():%Y%m%d}"
+    return etag
+
+
+def revision_tareas(id_usuario):
+    return db.session.query(Usuario.revisionTareas).filter(Usuario.idUsuario == id_usuario).scalar()
+
+
+def con_etag(respuesta, etag):
+    respuesta.set_etag(etag)
+    # El navegador guarda la respuesta pero la revalida siempre con If-None-Match
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+
+def respuesta_no_modificada(etag):
+    return con_etag(app.response_class(status=304), etag)
+
+
+# ---- Cursor opaco para paginar por (fecha, horaInicio, idTarea)
+def codificar_cursor(tarea):
+    crudo = f"{tarea.fecha.strftime('%Y-%m-%d')}|{tarea.horaInicio.strftime('%H:%M:%S')}|{tarea.idTarea}"
+    return base64.urlsafe_b64encode(crudo.encode()).decode()
+
+
+def cursor_desde(momento):
+    # Cursor que arranca en el minuto de 'momento' (incluido): (fecha, hora, 0) < (fecha, hora, idTarea)
+    crudo = f"{momento.strftime('%Y-%m-%d')}|{momento.strftime('%H:%M')}:00|0"
+    return base64.urlsafe_b64encode(crudo.encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    fecha_str, hora_str, id_str = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return (
+        datetime.strptime(fecha_str, '%Y-%m-%d').date(),
+        datetime.strptime(hora_str, '%H:%M:%S').time(),
+        int(id_str)
+    )
+
+
+# ---- Consulta las tareas de un usuario con ventana ?desde=&hasta= y paginación ?limit=&cursor=
+# Devuelve (filas, siguiente_cursor) con las columnas de COLUMNAS_TAREA, sin hidratar objetos Tarea.
+# Las tareas recurrentes se expanden al vuelo (solo dentro de la ventana) y se intercalan en orden.
+# Lanza ValueError si algún parámetro es inválido.
+def consultar_tareas(id_usuario, args):
+    # Las plantillas de recurrencia no se listan tal cual: se listan sus ocurrencias
+    query = db.session.query(*COLUMNAS_TAREA).filter(
+        Tarea.idUsuario == id_usuario,
+        ~db.exists().where(Recurrencia.idTarea == Tarea.idTarea)
+    )
+
+    desde = hasta = despues_de = None
+    if args.get('desde'):
+        desde = datetime.strptime(args['desde'], '%Y-%m-%d').date()
+        query = query.filter(Tarea.fecha >= desde)
+    if args.get('hasta'):
+        hasta = datetime.strptime(args['hasta'], '%Y-%m-%d').date()
+        query = query.filter(Tarea.fecha <= hasta)
+
+    if args.get('cursor'):
+        try:
+            despues_de = decodificar_cursor(args['cursor'])
+        except Exception:
+            raise ValueError('Cursor inválido')
+        query = query.filter(
+            tuple_(Tarea.fecha, Tarea.horaInicio, Tarea.idTarea) > tuple_(*despues_de)
+        )
+
+    # Orden estable, coincide con el índice (idUsuario, fecha, horaInicio)
+    query = query.order_by(Tarea.fecha, Tarea.horaInicio, Tarea.idTarea)
+
+    ocurrencias = expandir_recurrencias(id_usuario, desde, fin_ventana_recurrencias(hasta), despues_de)
+
+    if not args.get('limit'):
+        return list(heapq.merge(query, ocurrencias, key=clave_orden)), None
+
+    limite = int(args['limit'])
+    if limite < 1:
+        raise ValueError('El límite debe ser mayor a 0')
+    limite = min(limite, LIMITE_MAXIMO_TAREAS)
+
+    # Pedimos una fila de más para saber si hay otra página; el generador de ocurrencias
+    # se corta apenas se completa la página
+    tareas = list(itertools.islice(
+        heapq.merge(query.limit(limite + 1), ocurrencias, key=clave_orden), limite + 1
+    ))
+    if len(tareas) > limite:
+        tareas = tareas[:limite]
+        return tareas, codificar_cursor(tareas[-1])
+    return tareas, None
+
 
 #Ruta para obtener las tareas de un usuario
 @app.route('/tareas', methods=['GET'])
 @jwt_required()
 def obtener_tareas():
 
-    email_user = get_jwt_identity()
-    if not email_user:
-        return jsonify({'msg': 'Usuario no autenticado'}), 401  
-    
-        # Obtenemos el usuario autenticado
-    user = Usuario.query.filter_by(email=email_user).first()
-    if not user:
+    # El idUsuario viene en el token, no hace falta buscar al usuario
+    id_usuario = id_usuario_actual()
+    if not id_usuario:
         return jsonify({'msg': 'Usuario no encontrado'}), 404
+
+    # Solo leemos la revisión; si el cliente ya la tiene, 304 sin consultar ni serializar tareas
+    revision = revision_tareas(id_usuario)
+    if revision is None:
+        return jsonify({'msg': 'Usuario no encontrado'}), 404
+    etag = etag_tareas(id_usuario, revision)
+    if request.if_none_match.contains(etag):
+        return respuesta_no_modificada(etag)
     
-    # Obtenemos las tareas del usuario autenticado
-    tareas = user.tareas
-    return jsonify({
+    # Obtenemos las tareas del usuario autenticado (admite ?desde=&hasta=&limit=&cursor=)
+    try:
+        tareas, siguiente = consultar_tareas(id_usuario, request.args)
+    except ValueError as err:
+        return jsonify({'msg': 'Parámetros inválidos', 'error': str(err)}), 400
+
+    respuesta, status = respuesta_json({
         "success": True,
-        "tareas": [t.serialize() for t in tareas]  # Envuelve en objeto
-    }), 200
+        "tareas": serializar_filas_tarea(tareas),  # Envuelve en objeto
+        "siguiente": siguiente
+    }, 200)
+    return con_etag(respuesta, etag), status
+
+
+# Franja del día en la que se buscan huecos libres si no se indica ?desde=&hasta=
+JORNADA_DESDE = os.getenv('JORNADA_DESDE', '07:00')
+JORNADA_HASTA = os.getenv('JORNADA_HASTA', '22:00')
+
+
+# Ruta para buscar huecos libres de un día: /tareas/libres?fecha=2025-07-01&duracion=60
+@app.route('/tareas/libres', methods=['GET'])
+@jwt_required()
+def obtener_huecos_libres():
+    id_usuario = id_usuario_actual()
+    if not id_usuario:
+        return jsonify({'msg': 'Usuario no encontrado'}), 404
+
+    try:
+        fecha = datetime.strptime(request.args['fecha'], '%Y-%m-%d').date()
+        duracion = int(request.args.get('duracion', 30))
+        desde = a_minutos(datetime.strptime(request.args.get('desde', JORNADA_DESDE), '%H:%M').time())
+        hasta = a_minutos(datetime.strptime(request.args.get('hasta', JORNADA_HASTA), '%H:%M').time())
+    except (KeyError, ValueError, TypeError) as err:
+        return jsonify({'msg': 'Parámetros inválidos', 'error': str(err)}), 400
+    if duracion < 1 or desde >= hasta:
+        return jsonify({'msg': 'La duración debe ser mayor a 0 y "desde" anterior a "hasta"'}), 400
+
+    indice, revision = indice_intervalos.obtener(id_usuario, fecha)
+    if revision is None:
+        return jsonify({'msg': 'Usuario no encontrado'}), 404
+
+    libres = [
+        {'horaInicio': minutos_a_hora(inicio), 'horaFin': minutos_a_hora(fin), 'minutos': fin - inicio}
+        for inicio, fin in indice.libres(desde, hasta, duracion)
+    ]
+    return jsonify({'fecha': fecha.strftime('%Y-%m-%d'), 'duracion': duracion, 'libres': libres}), 200
+
+
+# ---- Valida los datos de una tarea (mismas reglas para /tarea y /tareas/batch)
+# Devuelve (valores, error): valores son los campos listos para Tarea; error es el dict del 400.
+def validar_datos_tarea(data):
+    if not data or not isinstance(data, dict):
+        return None, {'msg': 'No se recibieron datos'}
+
+    # Campos requeridos
+    required_fields = ['titulo', 'fecha', 'horaInicio', 'horaFin', 'etiqueta']
+    empty_fields = [f for f in required_fields if not data.get(f)]
+    if empty_fields:
+        return None, {
+            'msg': 'Algunos campos están vacíos o faltan',  
+            'Campos vacíos o faltantes': empty_fields
+        }
+    
+    try:
+        fecha = datetime.strptime(data['fecha'], '%Y-%m-%d').date()
+        horaInicio = datetime.strptime(data['horaInicio'], '%H:%M').time()
+        horaFin    = datetime.strptime(data['horaFin'],    '%H:%M').time()
+    except (ValueError, TypeError) as err:
+        return None, {
+            'msg':   'Formato de fecha/hora inválido',
+            'error': str(err)
+        }
+
+    return {
+        'titulo': data.get('titulo'),
+        #Verificaamos si hay descripción, si no la hay, la dejamos en None
+        'descripcion': data.get('descripcion', "Descripcion de la tarea" + data.get('titulo', '')),
+        #Verificamos qe haya imagen
+        'imageUrl': data.get('imageUrl', ""),
+        'fecha': fecha,
+        'horaInicio': horaInicio,
+        'horaFin': horaFin,
+        'etiqueta': data.get('etiqueta')
+    }, None
 
 
 # Ruta para crear una nueva tarea
@@ -246,57 +775,48 @@ def crear_tarea():
         if not data:
             return jsonify({'msg': 'No se recibieron datos'}), 400
         
-        # Campos requeridos
-        required_fields = ['titulo', 'fecha', 'horaInicio', 'horaFin', 'etiqueta']
-        empty_fields = [f for f in required_fields if not data.get(f)]
-        if empty_fields:
-            return jsonify({
-                'msg': 'Algunos campos están vacíos o faltan',  
-                'Campos vacíos o faltantes': empty_fields
-            }), 400
-        
-        try:
-            fecha = datetime.strptime(data['fecha'], '%Y-%m-%d').date()
-            horaInicio = datetime.strptime(data['horaInicio'], '%H:%M').time()
-            horaFin    = datetime.strptime(data['horaFin'],    '%H:%M').time()
-        except ValueError as err:
-            return jsonify({
-                'msg':   'Formato de fecha/hora inválido',
-                'error': str(err)
-            }), 400
-
-        # Verificamos si el usuario está autenticado
-        email_user = get_jwt_identity()
-        if not email_user:
-            return jsonify({'msg': 'Usuario no autenticado'}), 401
-        
-        # Obtenemos el usuario autenticado
-        user = Usuario.query.filter_by(email=email_user).first()
+        valores, error = validar_datos_tarea(data)
+        if error:
+            return jsonify(error), 400
+
+        # Recurrencia opcional: {"frecuencia": "semanal", "intervalo": 1, "dias": [0, 2], "hasta": ..., "cantidad": ...}
+        valores_recurrencia = None
+        if data.get('recurrencia'):
+            valores_recurrencia, error = validar_recurrencia(data['recurrencia'], valores['fecha'])
+            if error:
+                return jsonify(error), 400
+
+        # Recordatorio opcional: minutos antes del inicio ("recordatorio": 15)
+        minutos_recordatorio = None
+        if data.get('recordatorio') is not None:
+            minutos_recordatorio, error = validar_minutos_antes(data['recordatorio'])
+            if error:
+                return jsonify(error), 400
+
+        # Obtenemos el usuario autenticado (caché por idUsuario del token)
+        user = usuario_actual()
         if not user:
             return jsonify({'msg': 'Usuario no encontrado'}), 404
         
+        # Choques con otras tareas del mismo día (índice en memoria, bisect sobre los inicios).
+        # Con ?permitirSolape=1 se crea igual y se devuelve una advertencia.
+        indice, revision = indice_intervalos.obtener(user.idUsuario, valores['fecha'])
+        conflictos = indice.solapes(*rango_minutos(valores['horaInicio'], valores['horaFin']))
+        if conflictos and request.args.get('permitirSolape') not in ('1', 'true'):
+            return jsonify({
+                'msg': 'La tarea se superpone con otras tareas',
+                'conflictos': conflictos
+            }), 409
 
-        #Verificaamos si hay descripción, si no la hay, la dejamos en None
-        descripcion = data.get('descripcion', "Descripcion de la tarea" + data.get('titulo', ''))
-
-        #Verificamos qe haya imagen
-        imageUrl = data.get('imageUrl', "")
-        
-        nueva_tarea = Tarea(
-            titulo=data.get('titulo'),
-            descripcion=descripcion,
-            imageUrl=imageUrl,
-            fecha=fecha,
-            horaInicio=horaInicio,
-            horaFin=horaFin,
-            etiqueta=data.get('etiqueta'),
-            idUsuario=user.idUsuario
-        )
+        nueva_tarea = Tarea(idUsuario=user.idUsuario, **valores)
+        if valores_recurrencia:
+            nueva_tarea.recurrencia = Recurrencia(idUsuario=user.idUsuario, **valores_recurrencia)
 
         db.session.add(nueva_tarea)
-        db.session.commit()
+        if minutos_recordatorio is not None:
+            programar_recordatorio(nueva_tarea, minutos_recordatorio)
 
-        # Enviar mensaje de WhatsApp al usuario
+        # Encolamos el WhatsApp en la misma transacción que la tarea; lo envía el despachador
         if user.telefono.startswith('+'):
             texto_whatsapp = (
                 "🆕 *Nueva Tarea Creada*\n\n"
@@ -305,10 +825,25 @@ def crear_tarea():
                 f"📅 *Fecha:* {nueva_tarea.fecha.strftime('%Y-%m-%d')}\n"
                 f"⏰ *Hora:* {nueva_tarea.horaInicio.strftime('%H:%M')} - {nueva_tarea.horaFin.strftime('%H:%M')}\n"
             )
-            send_message(user.telefono, texto_whatsapp)
+            encolar_mensaje(user.telefono, texto_whatsapp)
 
-
-        return jsonify({"mensaje": "Tarea creada exitosamente", "tarea": nueva_tarea.serialize()}), 201
+        db.session.commit()
+        despachador.notificar()
+        if minutos_recordatorio is not None:
+            programador_recordatorios.notificar()
+        if not valores_recurrencia:
+            indice_intervalos.registrar_alta(user.idUsuario, nueva_tarea.fecha, nueva_tarea.horaInicio,
+                                             nueva_tarea.horaFin, nueva_tarea.idTarea, revision)
+
+
+        respuesta = {"mensaje": "Tarea creada exitosamente", "tarea": nueva_tarea.serialize()}
+        if nueva_tarea.recurrencia:
+            respuesta["recurrencia"] = nueva_tarea.recurrencia.serialize()
+        if nueva_tarea.recordatorio:
+            respuesta["recordatorio"] = nueva_tarea.recordatorio.serialize()
+        if conflictos:
+            respuesta["advertencia"] = {'msg': 'La tarea se superpone con otras tareas', 'conflictos': conflictos}
+        return jsonify(respuesta), 201
 
     except Exception as ex:
             # imprime en consola el traceback
@@ -326,26 +861,299 @@ def crear_tarea():
 @app.route('/tarea/<int:id_tarea>', methods=['DELETE'])
 @jwt_required()
 def eliminar_tarea(id_tarea):
-    # Verificamos si el usuario está autenticado
-    email_user = get_jwt_identity()
-    if not email_user:
-        return jsonify({'msg': 'Usuario no autenticado'}), 401
-        
-    # Obtenemos el usuario autenticado
-    user = Usuario.query.filter_by(email=email_user).first()
-    if not user:
+    # El idUsuario viene en el token, no hace falta buscar al usuario
+    id_usuario = id_usuario_actual()
+    if not id_usuario:
         return jsonify({'msg': 'Usuario no encontrado'}), 404
     
     # Buscamos la tarea por ID
-    tarea = Tarea.query.filter_by(idTarea=id_tarea, idUsuario=user.idUsuario).first()
+    tarea = Tarea.query.filter_by(idTarea=id_tarea, idUsuario=id_usuario).first()
     if not tarea:
         return jsonify({'msg': 'Tarea no encontrada'}), 404
     
-    # Eliminamos la tarea
+    # Eliminamos la tarea (las recurrentes afectan varios días: su índice se reconstruye por revisión)
+    revision = revision_tareas(id_usuario)
+    fecha, recurrente = tarea.fecha, tarea.recurrencia is not None
     db.session.delete(tarea)
     db.session.commit()
+    if not recurrente:
+        indice_intervalos.registrar_baja(id_usuario, fecha, id_tarea, revision)
     return jsonify({'msg': 'Tarea eliminada exitosamente'}), 200
 
+
+# ---- Busca la recurrencia de una tarea del usuario y valida que la fecha sea una de sus ocurrencias
+def buscar_ocurrencia(id_tarea, fecha_str):
+    id_usuario = id_usuario_actual()
+    recurrencia = Recurrencia.query.filter_by(idTarea=id_tarea, idUsuario=id_usuario).first() if id_usuario else None
+    if not recurrencia:
+        return None, None, (jsonify({'msg': 'Tarea recurrente no encontrada'}), 404)
+    try:
+        fecha = datetime.strptime(fecha_str, '%Y-%m-%d').date()
+    except ValueError as err:
+        return None, None, (jsonify({'msg': 'Formato de fecha inválido', 'error': str(err)}), 400)
+    if not es_ocurrencia(recurrencia, fecha):
+        return None, None, (jsonify({'msg': 'La tarea no ocurre en esa fecha'}), 404)
+    excepcion = ExcepcionRecurrencia.query.filter_by(idRecurrencia=recurrencia.idRecurrencia, fecha=fecha).first()
+    if not excepcion:
+        excepcion = ExcepcionRecurrencia(idRecurrencia=recurrencia.idRecurrencia, fecha=fecha, cancelada=False)
+        db.session.add(excepcion)
+    return recurrencia, excepcion, None
+
+
+# Ruta para eliminar una sola ocurrencia de una tarea recurrente (queda registrada como excepción)
+@app.route('/tarea/<int:id_tarea>/ocurrencias/<string:fecha>', methods=['DELETE'])
+@jwt_required()
+def eliminar_ocurrencia(id_tarea, fecha):
+    recurrencia, excepcion, error = buscar_ocurrencia(id_tarea, fecha)
+    if error:
+        return error
+
+    excepcion.cancelada = True
+    incrementar_revision_tareas(db.session.connection(), [recurrencia.idUsuario])
+    reprogramar_recordatorio(recurrencia.tarea)
+    db.session.commit()
+    return jsonify({'msg': 'Ocurrencia eliminada exitosamente'}), 200
+
+
+# Ruta para editar una sola ocurrencia de una tarea recurrente (los campos enviados pisan a la plantilla)
+@app.route('/tarea/<int:id_tarea>/ocurrencias/<string:fecha>', methods=['PUT'])
+@jwt_required()
+def editar_ocurrencia(id_tarea, fecha):
+    data = request.get_json(silent=True) or {}
+    campos = {k: data[k] for k in ('titulo', 'descripcion', 'horaInicio', 'horaFin', 'etiqueta') if data.get(k)}
+    if not campos:
+        return jsonify({'msg': 'No se recibieron datos'}), 400
+    try:
+        for k in ('horaInicio', 'horaFin'):
+            if k in campos:
+                campos[k] = datetime.strptime(campos[k], '%H:%M').time()
+    except (ValueError, TypeError) as err:
+        return jsonify({'msg': 'Formato de fecha/hora inválido', 'error': str(err)}), 400
+
+    recurrencia, excepcion, error = buscar_ocurrencia(id_tarea, fecha)
+    if error:
+        return error
+
+    # Las horas que no se mandan salen de una edición anterior o de la plantilla
+    inicio = campos.get('horaInicio') or excepcion.horaInicio or recurrencia.tarea.horaInicio
+    fin = campos.get('horaFin') or excepcion.horaFin or recurrencia.tarea.horaFin
+    if inicio >= fin:
+        db.session.rollback()
+        return jsonify({'msg': 'La hora de inicio debe ser anterior a la de fin',
+                        'horaInicio': inicio.strftime('%H:%M'), 'horaFin': fin.strftime('%H:%M')}), 400
+
+    for k, v in campos.items():
+        setattr(excepcion, k, v)
+    excepcion.cancelada = False
+    incrementar_revision_tareas(db.session.connection(), [recurrencia.idUsuario])
+    reprogramar_recordatorio(recurrencia.tarea)
+    db.session.commit()
+    return jsonify({'msg': 'Ocurrencia actualizada exitosamente'}), 200
+
+
+# ---- Si la tarea tiene recordatorio, lo recalcula (p. ej. tras cancelar o mover una ocurrencia)
+def reprogramar_recordatorio(tarea):
+    if tarea.recordatorio is not None:
+        programar_recordatorio(tarea, tarea.recordatorio.minutosAntes)
+        programador_recordatorios.notificar()
+
+
+# Ruta para crear o cambiar el recordatorio de una tarea. Body: {"minutosAntes": 15}
+@app.route('/tarea/<int:id_tarea>/recordatorio', methods=['PUT'])
+@jwt_required()
+def programar_recordatorio_tarea(id_tarea):
+    data = request.get_json(silent=True) or {}
+    minutos, error = validar_minutos_antes(data.get('minutosAntes'))
+    if error:
+        return jsonify(error), 400
+
+    id_usuario = id_usuario_actual()
+    tarea = Tarea.query.filter_by(idTarea=id_tarea, idUsuario=id_usuario).first() if id_usuario else None
+    if not tarea:
+        return jsonify({'msg': 'Tarea no encontrada'}), 404
+
+    recordatorio = programar_recordatorio(tarea, minutos)
+    db.session.commit()
+    programador_recordatorios.notificar()
+    return jsonify({'msg': 'Recordatorio programado', 'recordatorio': recordatorio.serialize()}), 200
+
+
+# Ruta para quitar el recordatorio de una tarea
+@app.route('/tarea/<int:id_tarea>/recordatorio', methods=['DELETE'])
+@jwt_required()
+def eliminar_recordatorio_tarea(id_tarea):
+    id_usuario = id_usuario_actual()
+    recordatorio = Recordatorio.query.filter_by(idTarea=id_tarea, idUsuario=id_usuario).first() if id_usuario else None
+    if not recordatorio:
+        return jsonify({'msg': 'Recordatorio no encontrado'}), 404
+
+    db.session.delete(recordatorio)
+    db.session.commit()
+    return jsonify({'msg': 'Recordatorio eliminado exitosamente'}), 200
+
+
+MAXIMO_LOTE_TAREAS = int(os.getenv('MAXIMO_LOTE_TAREAS', 5000))
+
+
+# Ruta para crear muchas tareas en una sola transacción (importar un cuatrimestre, por ejemplo).
+# Body: {"tareas": [{...}, ...]}. Las inválidas se informan por índice y no frenan a las demás.
+@app.route('/tareas/batch', methods=['POST'])
+@jwt_required()
+def crear_tareas_batch():
+    data = request.get_json(silent=True) or {}
+    items = data.get('tareas') if isinstance(data, dict) else None
+    if not items or not isinstance(items, list):
+        return jsonify({'msg': 'Se esperaba una lista "tareas"'}), 400
+    if len(items) > MAXIMO_LOTE_TAREAS:
+        return jsonify({'msg': f'Máximo {MAXIMO_LOTE_TAREAS} tareas por lote'}), 400
+
+    user = usuario_actual()
+    if not user:
+        return jsonify({'msg': 'Usuario no encontrado'}), 404
+
+    resultados = [None] * len(items)
+    indices_validos = []
+    filas = []
+    for i, item in enumerate(items):
+        valores, error = validar_datos_tarea(item)
+        if not error and item.get('recurrencia'):
+            error = {'msg': 'Las tareas recurrentes se crean con POST /tarea'}
+        if error:
+            resultados[i] = {'indice': i, 'ok': False, **error}
+            continue
+        valores['idUsuario'] = user.idUsuario
+        indices_validos.append(i)
+        filas.append(valores)
+
+    if not filas:
+        return jsonify({'msg': 'Ninguna tarea es válida', 'resultados': resultados}), 400
+
+    try:
+        # Un solo INSERT ... RETURNING con executemany, en orden de parámetros para mapear los ids
+        ids = db.session.execute(
+            db.insert(Tarea).returning(Tarea.idTarea, sort_by_parameter_order=True), filas
+        ).scalars().all()
+        incrementar_revision_tareas(db.session.connection(), [user.idUsuario])
+        deltas = {}
+        for f in filas:
+            acumular_resumen(deltas, f['idUsuario'], f['fecha'], f['horaInicio'], f['horaFin'], f['etiqueta'])
+        aplicar_resumen_semanal(db.session.connection(), deltas)
+
+        # Un solo WhatsApp de resumen en vez de uno por tarea
+        if user.telefono.startswith('+'):
+            primeras = "\n".join(
+                f"📌 {f['titulo']} ({f['fecha'].strftime('%d/%m')} {f['horaInicio'].strftime('%H:%M')})"
+                for f in filas[:5]
+            )
+            resto = f"\n… y {len(filas) - 5} más" if len(filas) > 5 else ""
+            encolar_mensaje(user.telefono, f"🆕 *Se crearon {len(filas)} tareas*\n\n{primeras}{resto}")
+
+        db.session.commit()
+        despachador.notificar()
+    except Exception as ex:
+        db.session.rollback()
+        print(f"Error al crear tareas en lote: {ex}")
+        return jsonify({'msg': 'Error interno al crear tareas', 'error': str(ex)}), 500
+
+    tareas = serializar_filas_tarea(
+        (id_tarea, f['titulo'], f['descripcion'], f['fecha'], f['horaInicio'], f['horaFin'],
+         f['etiqueta'], f['imageUrl'], f['idUsuario'])
+        for id_tarea, f in zip(ids, filas)
+    )
+    for i, tarea in zip(indices_validos, tareas):
+        resultados[i] = {'indice': i, 'ok': True, 'tarea': tarea}
+
+    return respuesta_json({'mensaje': f'{len(filas)} tareas creadas', 'creadas': len(filas),
+                           'resultados': resultados}, 201)
+
+
+# Ruta para eliminar muchas tareas en una sola transacción. Body: {"ids": [1, 2, ...]}
+@app.route('/tareas/batch', methods=['DELETE'])
+@jwt_required()
+def eliminar_tareas_batch():
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids') if isinstance(data, dict) else None
+    if not ids or not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+        return jsonify({'msg': 'Se esperaba una lista "ids" de enteros'}), 400
+    if len(ids) > MAXIMO_LOTE_TAREAS:
+        return jsonify({'msg': f'Máximo {MAXIMO_LOTE_TAREAS} tareas por lote'}), 400
+
+    id_usuario = id_usuario_actual()
+    if not id_usuario:
+        return jsonify({'msg': 'Usuario no encontrado'}), 404
+
+    # Solo se borran las tareas que son del usuario; un único DELETE ... WHERE idTarea IN (...)
+    filas = db.session.execute(
+        db.select(Tarea.idTarea, Tarea.idUsuario, Tarea.fecha, Tarea.horaInicio, Tarea.horaFin, Tarea.etiqueta)
+        .where(Tarea.idUsuario == id_usuario, Tarea.idTarea.in_(ids))
+    ).all()
+    existentes = {fila[0] for fila in filas}
+    if existentes:
+        plantillas = set(db.session.scalars(db.select(Recurrencia.idTarea).where(Recurrencia.idTarea.in_(existentes))))
+        # Sin ORM no hay cascada: primero las recurrencias (y sus excepciones) de esas tareas
+        ids_recurrencia = db.select(Recurrencia.idRecurrencia).where(Recurrencia.idTarea.in_(existentes))
+        db.session.execute(db.delete(ExcepcionRecurrencia).where(ExcepcionRecurrencia.idRecurrencia.in_(ids_recurrencia)))
+        db.session.execute(db.delete(Recurrencia).where(Recurrencia.idTarea.in_(existentes)))
+        db.session.execute(db.delete(Recordatorio).where(Recordatorio.idTarea.in_(existentes)))
+        db.session.execute(
+            db.delete(Tarea).where(Tarea.idUsuario == id_usuario, Tarea.idTarea.in_(existentes))
+        )
+        incrementar_revision_tareas(db.session.connection(), [id_usuario])
+        deltas = {}
+        for fila in filas:
+            if fila[0] not in plantillas:
+                acumular_resumen(deltas, *fila[1:], signo=-1)
+        aplicar_resumen_semanal(db.session.connection(), deltas)
+        db.session.commit()
+
+    resultados = [{'idTarea': i, 'ok': i in existentes} for i in ids]
+    return jsonify({'msg': f'{len(existentes)} tareas eliminadas', 'eliminadas': len(existentes),
+                    'resultados': resultados}), 200
+
+
+# Ruta con horas por etiqueta de una semana: /estadisticas/semana?semana=2025-W27 (o ?fecha=2025-07-01).
+# Lee resumen_semanal por clave primaria: como mucho una fila por etiqueta, sin agregar sobre 'tarea'.
+# Las tareas recurrentes no están en resumen_semanal: se suman sus ocurrencias de esa semana (con
+# las excepciones ya aplicadas), que son a lo sumo 7 por plantilla.
+@app.route('/estadisticas/semana', methods=['GET'])
+@jwt_required()
+def estadisticas_semana():
+    id_usuario = id_usuario_actual()
+    if not id_usuario:
+        return jsonify({'msg': 'Usuario no encontrado'}), 404
+
+    try:
+        if request.args.get('semana'):
+            lunes = datetime.strptime(request.args['semana'] + '-1', '%G-W%V-%u').date()
+        else:
+            fecha = request.args.get('fecha')
+            fecha = datetime.strptime(fecha, '%Y-%m-%d').date() if fecha else date.today()
+            lunes = fecha - timedelta(days=fecha.weekday())
+    except ValueError as err:
+        return jsonify({'msg': 'Parámetros inválidos', 'error': str(err)}), 400
+    semana = semana_iso(lunes)
+
+    filas = db.session.execute(
+        db.select(ResumenSemanal.etiqueta, ResumenSemanal.cantidad, ResumenSemanal.minutos)
+        .where(ResumenSemanal.idUsuario == id_usuario, ResumenSemanal.semana == semana, ResumenSemanal.cantidad > 0)
+    ).all()
+    deltas = {(id_usuario, semana, etiqueta): [cantidad, minutos] for etiqueta, cantidad, minutos in filas}
+    for ocurrencia in expandir_recurrencias(id_usuario, lunes, lunes + timedelta(days=6)):
+        acumular_resumen(deltas, id_usuario, ocurrencia.fecha, ocurrencia.horaInicio, ocurrencia.horaFin,
+                         ocurrencia.etiqueta)
+
+    etiquetas = {
+        etiqueta: {'cantidad': cantidad, 'minutos': minutos, 'horas': round(minutos / 60, 2)}
+        for (_, _, etiqueta), (cantidad, minutos) in deltas.items()
+    }
+    total = sum(minutos for _, minutos in deltas.values())
+    return jsonify({
+        'semana': semana,
+        'etiquetas': etiquetas,
+        'totalTareas': sum(cantidad for cantidad, _ in deltas.values()),
+        'totalHoras': round(total / 60, 2)
+    }), 200
+
 # ----------------------------------------------------------- Finalizan las rutas para tareas -------------------------------------------------------------------------
 
 
@@ -354,15 +1162,30 @@ def eliminar_tarea(id_tarea):
 
 
 # ---- Para enviar enviar mensajes de WhatsApp
+# Solo encola en el outbox; el envío real a Twilio lo hace el despachador en segundo plano.
+@metricas.medir('send_message')
 def send_message(to, body):
-    twilio_client.messages.create(
-        from_=TW_FROM,
-        to=f"whatsapp:{to}",
-        body=body
-    )
+    encolar_mensaje(to, body)
+    db.session.commit()
+    despachador.notificar()
+
+
+# Ruta con las estadísticas del parser de reglas y de la caché de IA
+@app.route("/estadisticas/extraccion", methods=["GET"])
+def estadisticas_extraccion():
+    return jsonify({"parser": estadisticas_parser.serialize(), "cache": cache_extraccion.serialize(),
+                    "ia": enrutador_ia.serialize(), "prompt": constructor_prompt.serialize()}), 200
+
 
+# Métricas en formato de texto de Prometheus
+@app.route("/metrics", methods=["GET"])
+def exponer_metricas():
+    return app.response_class(metricas.exponer(), mimetype="text/plain; version=0.0.4")
 
-# Ruta para recibir mensajes de WhatsApp
+
+# Ruta para recibir mensajes de WhatsApp.
+# Solo registra el mensaje (MessageSid único) y responde al toque; el procesamiento con IA
+# corre en segundo plano. Si Twilio reintenta el mismo MessageSid, se descarta.
 @app.route("/whatsapp-webhook", methods=["POST"])
 def whatsapp_webhook():
     from_number = request.form.get('From', '').replace('whatsapp:', '')
@@ -371,167 +1194,148 @@ def whatsapp_webhook():
     if not from_number or not body:
         return "Faltan datos", 400
 
+    message_sid = request.form.get('MessageSid') or f"local-{uuid.uuid4().hex}"
+    entrante = MensajeEntrante(messageSid=message_sid, telefono=from_number, cuerpo=body)
+    db.session.add(entrante)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return "Mensaje duplicado", 200
+
+    procesador_entrantes.encolar(entrante.idMensaje)
+    return "Recibido", 200
+
+
+# ---- Listado "ver tareas" por WhatsApp
+# Solo las próximas (desde ahora), de a TAREAS_POR_MENSAJE y sin pasar el largo que acepta Twilio
+# (1600 caracteres). Si quedan más, el cursor se guarda y "más" sigue desde ahí.
+TAREAS_POR_MENSAJE = int(os.getenv('WHATSAPP_TAREAS_POR_MENSAJE', 10))
+MAXIMO_CARACTERES_LISTADO = 1400
+VIGENCIA_CURSOR_LISTADO = timedelta(hours=int(os.getenv('WHATSAPP_VIGENCIA_CURSOR_HORAS', 24)))
+
+
+def pagina_proximas_tareas(id_usuario, cursor):
+    """Devuelve (lineas, siguiente_cursor); usa el mismo keyset que GET /tareas."""
+    tareas, siguiente = consultar_tareas(id_usuario, {'cursor': cursor, 'limit': TAREAS_POR_MENSAJE})
+    lineas, largo = [], 0
+    for i, t in enumerate(tareas):
+        linea = f"📌 {t.titulo} ({t.fecha.strftime('%d/%m')} a las {t.horaInicio.strftime('%H:%M')})"
+        if lineas and largo + len(linea) + 1 > MAXIMO_CARACTERES_LISTADO:
+            return lineas, codificar_cursor(tareas[i - 1])
+        lineas.append(linea)
+        largo += len(linea) + 1
+    return lineas, siguiente
+
+
+def enviar_listado_tareas(id_usuario, telefono, cursor, encabezado, sin_tareas):
+    lineas, siguiente = pagina_proximas_tareas(id_usuario, cursor)
+
+    guardado = db.session.get(CursorListadoWhatsapp, id_usuario)
+    if siguiente:
+        if guardado is None:
+            guardado = CursorListadoWhatsapp(idUsuario=id_usuario)
+            db.session.add(guardado)
+        guardado.cursor = siguiente
+        guardado.expira = datetime.now() + VIGENCIA_CURSOR_LISTADO
+    elif guardado is not None:
+        db.session.delete(guardado)
+
+    # send_message hace el commit, así el cursor queda guardado junto con el mensaje encolado
+    if not lineas:
+        send_message(telefono, sin_tareas)
+        return
+    cuerpo = encabezado + "\n" + "\n".join(lineas)
+    if siguiente:
+        cuerpo += "\n\n➡️ Escribí *más* para ver las siguientes."
+    send_message(telefono, cuerpo)
+
+
+# Lógica del bot: se ejecuta en el pool de procesador_entrantes y devuelve una etiqueta de resultado
+def procesar_mensaje_whatsapp(from_number, body):
     user = Usuario.query.filter_by(telefono=from_number).first()
     if not user:
         send_message(from_number, "🚫 No estás registrado. Por favor regístrate para usar el Organizapp.")
-        return "Usuario no registrado", 200
+        return "Usuario no registrado"
+
+    # Una sola normalización y una pasada del clasificador precompilado (api/intenciones.py)
+    intencion = clasificador_intenciones.clasificar(body)
 
-    if body in ["hola", "menu", "opciones", "que tal", "buenas", "buenas tardes", "buenas noches", "Hola"]:
+    if intencion == 'menu':
         send_message(from_number,
             "👋 Hola " + user.nombre + "! , elige una opción:\n1️⃣ Crear tarea (Deshabilitada - en desarrollo) \n2️⃣ Ver tareas pendientes\n\nResponde con 1 o 2.")
-        return "Menú enviado", 200
-
-    elif body.startswith("1") or "crear tarea" in body:
+        return "Menú enviado"
+
+    elif intencion == 'mas':
+        guardado = db.session.get(CursorListadoWhatsapp, user.idUsuario)
+        if guardado is None or guardado.expira <= datetime.now():
+            send_message(from_number, "📭 No hay más tareas para mostrar. Escribí 2 para ver tus próximas tareas.")
+            return "Sin más tareas"
+        enviar_listado_tareas(user.idUsuario, from_number, guardado.cursor, "📋 Más tareas:",
+                              "📭 No hay más tareas para mostrar.")
+        return "Tareas listadas"
+
+    elif intencion == 'crear':
         send_message(from_number, "✍️ Por favor describe la tarea. Ejemplo:\n'Agendar paseo con el perro mañana a las 10 AM'")
-        return "Esperando descripción", 200
+        return "Esperando descripción"
     
     # elif body.startswith("3") or "registrar usuario" in body or "Registrar" in body:
 
-    elif any(word in body for word in ["mañana", "pasado", "am", "pm", "agendar", "a las", "para el", "el ", "día "]):
-        task_data = extract_task_fields_from_prompt(body)
+    elif intencion == 'nueva_tarea':
+        try:
+            task_data = interpretar_tarea(body)
+        except IANoDisponible:
+            send_message(from_number, "⏳ En este momento no puedo interpretar tareas. "
+                                      "Probá de nuevo más tarde o escribila con fecha y hora, "
+                                      "por ejemplo: 'dentista mañana a las 10'.")
+            return "IA no disponible"
         if not task_data:
             send_message(from_number, "❌ No pude entender la tarea. Intenta describirla de otra forma.")
-            return "Error IA", 200
+            return "Error IA"
         
         if not es_fecha_valida(task_data["date"]):
             send_message(from_number, "❌ No pude entender la fecha. Intentá usar frases como 'mañana', 'el 2 de julio', etc.")
-            return "Fecha inválida", 200
+            return "Fecha inválida"
 
         new_task = Tarea(
             idUsuario=user.idUsuario,
             titulo=task_data["title"],
             descripcion = task_data["description"],
-            imageUrl = ("", None),
+            imageUrl = "",
             fecha=datetime.strptime(task_data["date"], "%Y-%m-%d").date(),
             horaInicio=datetime.strptime(task_data["hour"], "%H:%M").time(),
             horaFin=datetime.strptime(task_data["endHour"], "%H:%M").time(),
             etiqueta=task_data["category"]
         )
+
+        # Por WhatsApp no hay forma de confirmar: se crea igual y se avisa del choque
+        indice, revision = indice_intervalos.obtener(user.idUsuario, new_task.fecha)
+        conflictos = indice.solapes(*rango_minutos(new_task.horaInicio, new_task.horaFin))
+
         db.session.add(new_task)
         db.session.commit()
+        indice_intervalos.registrar_alta(user.idUsuario, new_task.fecha, new_task.horaInicio,
+                                         new_task.horaFin, new_task.idTarea, revision)
 
         fecha_formateada = new_task.fecha.strftime("%A %d de %B")
         hora_formateada  = new_task.horaInicio.strftime("%H:%M")
         msg = f"✅ Tarea creada:\n📌 {new_task.titulo}\n📅 {fecha_formateada} 🕒 {hora_formateada}\n📂 {new_task.etiqueta}"
+        if conflictos:
+            msg += f"\n⚠️ Se superpone con {len(conflictos)} tarea(s) de ese día."
 
         send_message(from_number, msg)
-        return "Tarea creada", 201
+        return "Tarea creada"
 
-    elif body.startswith("2") or "ver tarea" in body or "pendiente" in body:
-        tasks = Tarea.query.filter_by(idUsuario=user.idUsuario).all()
-        if not tasks:
-            send_message(from_number, "📭 No tienes tareas pendientes.")
-        else:
-            listado = "\n".join([
-                f"📌 {t.titulo} ({t.fecha.strftime('%d/%m')} a las {t.horaInicio.strftime('%H:%M')})"
-                for t in tasks
-            ])
-            send_message(from_number, f"📋 Tus tareas pendientes:\n{listado}")
-        return "Tareas listadas", 200
+    elif intencion == 'ver':
+        enviar_listado_tareas(user.idUsuario, from_number, cursor_desde(datetime.now()),
+                              "📋 Tus tareas pendientes:", "📭 No tienes tareas pendientes.")
+        return "Tareas listadas"
 
     else:
         send_message(from_number, "🤖 No entendí. Escribí 'menu' para comenzar.")
-        return "Sin coincidencia", 200
+        return "Sin coincidencia"
     
 
-# Funcion para categorizar y  obtener datos con IA Deepseek
-# def extract_task_fields_from_prompt(text):
-#     try:
-#         today = datetime.now().date()
-#         prompt = f"""
-#             Sos un asistente que transforma descripciones de tareas en objetos JSON con formato preciso. Recibís frases informales, en español o spanglish, y devolvés exclusivamente un JSON con estos campos:
-
-#             - "title": título corto de la tarea
-#             - "date": fecha en formato YYYY-MM-DD (puede inferirse de palabras como "mañana", "pasado mañana", "lunes", "el 28", etc.)
-#             - "hour": hora de inicio en formato 24h HH:MM (ejemplo: 14:30)
-#             - "endHour": hora de finalización en formato 24h HH:MM. Si no está clara, sumá 1 hora a "hour"
-#             - "category": elegí una sola categoría de esta lista exacta (en mayúscula inicial): Personal, Trabajo, Estudio, Hogar, Salud, Otros
-
-#             ⚠️ Reglas clave:
-#             - No uses fechas anteriores a {today}.
-#             - Convertí palabras como "mañana", "pasado mañana" a fechas reales:
-#                 - "mañana" → {today + timedelta(days=1)}
-#                 - "pasado mañana" → {today + timedelta(days=2)}
-#             - Si dicen solo la hora ("a las 9"), asumí que es AM. Si dicen "a la noche", asumí PM.
-#             - Si falta hora fin, sumá 1 hora a la de inicio (pero nunca menor).
-#             - No incluyas ningún texto explicativo. Solo el JSON válido.
-#             - El JSON debe estar bien formado, sin comentarios ni saltos innecesarios.
-
-#             ✍️ Ejemplos:
-
-#             Entrada: "Tengo que ir al médico mañana a las 10"
-#             → JSON:
-#             {{
-#             "title": "Ir al médico",
-#             "date": "{(today + timedelta(days=1)).strftime('%Y-%m-%d')}",
-#             "hour": "10:00",
-#             "endHour": "11:00",
-#             "category": "Salud"
-#             }}
-
-#             Entrada: "Clase de inglés el sábado a las 15"
-#             → JSON:
-#             {{
-#             "title": "Clase de inglés",
-#             "date": "[calculá la próxima fecha que sea sábado]",
-#             "hour": "15:00",
-#             "endHour": "16:00",
-#             "category": "Estudio"
-#             }}
-
-#             Descripción original: "{text}"
-#             """
-
-#         # Configuración para DeepSeek API
-#         url = "https://api.deepseek.com/v1/chat/completions"
-#         headers = {
-#             "Authorization": f"Bearer {DEEPSEEK_API_KEY}",  # Usa la variable con f-string
-#             "Content-Type": "application/json"
-#         }
-#         data = {
-#             "model": "deepseek-chat",
-#             "messages": [{"role": "user", "content": prompt}],
-#             "max_tokens": 150,
-#             "temperature": 0.2,
-#             "stream": False
-#         }
-
-#         response = requests.post(url, headers=headers, json=data)
-#         if response.status_code != 200:
-#             print(f"Error en DeepSeek API: {response.status_code} - {response.text}")
-#             return None
-        
-#         response_data = response.json()
-
-#         if not response_data.get('choices') or not response_data['choices']:
-#             print("Respuesta sin choices:", response_data)
-#             return None
-        
-#         # Extraer el contenido del JSON
-#         content = response_data['choices'][0]['message']['content']
-        
-#         # Limpiar posibles espacios y saltos de línea
-#         content = content.strip()
-        
-#         # Manejar casos donde la respuesta pueda incluir texto adicional
-#         if content.startswith('{') and content.endswith('}'):
-#             return json.loads(content)
-#         else:
-#             # Intentar extraer solo el JSON si hay texto adicional
-#             start = content.find('{')
-#             end = content.rfind('}') + 1
-#             if start != -1 and end != 0:
-#                 json_str = content[start:end]
-#                 return json.loads(json_str)
-#             else:
-#                 print(f"No se pudo extraer JSON de: {content}")
-#                 return None
-
-#     except Exception as e:
-#         print(f"Error en DeepSeek: {e}")
-#         return None
-
-
 def es_fecha_valida(fecha_str):
     try:
         datetime.strptime(fecha_str, "%Y-%m-%d")
@@ -539,114 +1343,53 @@ def es_fecha_valida(fecha_str):
     except ValueError:
         return False
 
-# Funcion para categorizar y  obtener datos con IA chatgpt
+# Funcion para categorizar y  obtener datos con IA (el proveedor lo elige enrutador_ia)
+# Lanza IANoDisponible si ningún proveedor respondió a tiempo o sus circuitos están abiertos
+@metricas.medir('extract_task_fields_from_prompt')
 def extract_task_fields_from_prompt(text):
     try:
         today = datetime.now().date()
-        prompt = f"""
-            Sos un asistente que transforma descripciones de tareas en objetos JSON con formato preciso. Recibís frases informales, en español o spanglish, y devolvés exclusivamente un JSON con estos campos:
-
-            - "title": título corto de la tarea
-            - "date": fecha en formato YYYY-MM-DD (puede inferirse de palabras como "mañana", "pasado mañana", "lunes", "el 28", etc.)
-            - "hour": hora de inicio en formato 24h HH:MM (ejemplo: 14:30)
-            - "endHour": hora de finalización en formato 24h HH:MM. Si no está clara, sumá 1 hora a "hour"
-            - "category": elegí una sola categoría de esta lista exacta (en mayúscula inicial): Personal, Trabajo, Estudio, Hogar, Salud, Otros
-
-            ⚠️ Reglas clave:
-            - No uses fechas anteriores a {today}.
-            - Convertí palabras como "mañana", "pasado mañana" a fechas reales:
-                - "mañana" → {today + timedelta(days=1)}
-                - "pasado mañana" → {today + timedelta(days=2)}
-            - Si dicen solo la hora ("a las 9"), asumí que es AM. Si dicen "a la noche", asumí PM.
-            - Si falta hora fin, sumá 1 hora a la de inicio (pero nunca menor).
-            - No incluyas ningún texto explicativo. Solo el JSON válido.
-            - El JSON debe estar bien formado, sin comentarios ni saltos innecesarios.
-            - Si te dicen proximo sabado, o proximo dia o lo que sea, tu encargate de devolver la fecha correcta, no pongas [calculá la próxima fecha que sea sábado] ni nada por el estilo. DEvuelve la fehca con el formato especififcado.
-            - Intrepreta lo que te dicen, si faltan datos tu agregalo smanualmente calculando lo que falta, por ejemplo si te dicen "a las 10" vos poné "10:00" y "11:00" como hora de finalización, o si te dicen "el lunes a las 9" vos poné la fecha del próximo lunes y la hora de inicio y fin.
-            - Necesito que siempre registres los datos completos.
-            - Tambien necesito que ahora interpretes la descripcion, es decir que en base a lo que te digan devuelvas tambein un campo decripcion en base al titulo
-            - Explciando un poco mejor la DESCRIPCION ES SUPER IMPORTANTE, por ejemplo si te dicen "Tengo que ir al médico mañana a las 10" vos poné "Ir al médico" como título y "Tengo que ir al médico" como descripción, o si te dicen "Clase de inglés el sábado a las 15" vos poné "Clase de inglés" como título y "Clase de inglés el sábado a las 15" como descripción.
-            
-            Entrada: "Clase de inglés el sábado a las 15"
-            → JSON:
-            {{
-            "title": "Clase de inglés",
-            "date": "2025-07-05",  # reemplazá por el próximo sábado dinámico
-            "hour": "15:00",
-            "endHour": "16:00",
-            "category": "Estudio"
-            "description": "Clase de inglés el sábado a las 15"
-            }}
-
-            - Si te piden un día como "sábado", devolvé la PRÓXIMA fecha real que sea sábado (en formato YYYY-MM-DD)
-            ejemplo : next_saturday = next_weekday_date("sábado").strftime("%Y-%m-%d")
-
-            Entrada: "Clase de inglés el sábado a las 15"
-            → JSON:
-            {{
-            "title": "Clase de inglés",
-            "date": "2025-07-05",  # reemplazá por el próximo sábado dinámico
-            "hour": "15:00",
-            "endHour": "16:00",
-            "category": "Estudio"
-            "description": "Clase de inglés el sábado a las 15"
-            }}
-
-            Necesito que sigas tal cual te digo 
-
-
-            ✍️ Ejemplos:
-
-            Entrada: "Tengo que ir al médico mañana a las 10"
-            → JSON:
-            {{
-            "title": "Ir al médico",
-            "date": "{(today + timedelta(days=1)).strftime('%Y-%m-%d')}",
-            "hour": "10:00",
-            "endHour": "11:00",
-            "category": "Salud"
-            "description": "Tengo que ir al médico mañana a las 10"	
-            }}
-
-            Entrada: "Clase de inglés el sábado a las 15"
-            → JSON:
-            {{
-            "title": "Clase de inglés",
-            "date": "[calculá la próxima fecha que sea sábado]",
-            "hour": "15:00",
-            "endHour": "16:00",
-            "category": "Estudio"
-            }}
-
-            Descripción original: "{text}"
-            """
-
-
-        response = openai_client.chat.completions.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=150,
-            temperature=0.2
-        )
 
-        import json
-        return json.loads(response.choices[0].message.content.strip())
+        # Si ya interpretamos esta misma frase hoy, no volvemos a llamar a OpenAI
+        cacheado = cache_extraccion.get(text, today)
+        if cacheado is not None:
+            return cacheado
+
+        prompt, _ = constructor_prompt.construir(text, today)
+        resultado = enrutador_ia.extraer(prompt, validar=validar_respuesta_tarea, esquema=ESQUEMA_TAREA,
+                                         max_tokens=IA_MAX_TOKENS)
+        if resultado is None:
+            print(f"La IA no devolvió una tarea válida para: {text}")
+            return None
+        cache_extraccion.set(text, today, resultado)
+        return resultado
+    except IANoDisponible:
+        raise
     except Exception as e:
-        print(f"Error en OpenAI: {e}")
+        print(f"Error en la extracción con IA: {e}")
         return None
-    
 
-def next_weekday_date(dia_nombre):
-    dias = {
-        "lunes": 0, "martes": 1, "miércoles": 2,
-        "jueves": 3, "viernes": 4, "sábado": 5, "domingo": 6
-    }
-    today = datetime.now().date()
-    target = dias.get(dia_nombre.lower(), None)
-    if target is None:
-        return None
-    days_a_sumar = (target - today.weekday() + 7) % 7
-    return today + timedelta(days=days_a_sumar or 7)
+
+# Primero intenta el parser de reglas (instantáneo); solo si la confianza es baja llama al LLM
+def interpretar_tarea(text):
+    task_data, confianza = parsear_tarea(text)
+    if task_data and confianza >= UMBRAL_CONFIANZA:
+        estadisticas_parser.registrar("reglas")
+        return task_data
+
+    estadisticas_parser.registrar("llm")
+    try:
+        return extract_task_fields_from_prompt(text)
+    except IANoDisponible as ex:
+        print(f"IA no disponible: {ex}")
+        # Degradación: lo que haya sacado el parser de reglas, aunque con menos confianza
+        if task_data:
+            return task_data
+        raise
+
+
+# El pool de mensajes entrantes necesita la función del bot, definida más arriba
+procesador_entrantes.init_app(app, procesar_mensaje_whatsapp)
 
 
 if __name__ == '__main__':
@@ -0,0 +1 @@
+# Benchmarks del backend. Se ejecutan desde backend/: python -m benchmarks.<nombre>
@@ -0,0 +1,62 @@
+"""
+Mide el arranque en frío de un worker: tiempo de `import app` y memoria residente.
+Cada corrida usa un proceso nuevo para que no haya nada cacheado en sys.modules.
+
+    python -m benchmarks.bench_arranque
+    python -m benchmarks.bench_arranque --corridas 10 --presupuesto-ms 600 --presupuesto-mb 80
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SCRIPT = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+import app
+ms = (time.perf_counter() - inicio) * 1000
+print(json.dumps({
+    "import_ms": ms,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "openai_cargado": "openai" in sys.modules,
+    "twilio_cargado": "twilio" in sys.modules,
+}))
+"""
+
+
+def medir_una_vez():
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    salida = subprocess.run([sys.executable, "-c", SCRIPT], cwd=backend,
+                            capture_output=True, text=True, check=True)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corridas", type=int, default=5)
+    parser.add_argument("--presupuesto-ms", type=float, default=None)
+    parser.add_argument("--presupuesto-mb", type=float, default=None)
+    args = parser.parse_args()
+
+    medidas = [medir_una_vez() for _ in range(args.corridas)]
+    resultado = {
+        "corridas": args.corridas,
+        "import_ms_mediana": round(statistics.median(m["import_ms"] for m in medidas), 1),
+        "rss_mb_mediana": round(statistics.median(m["rss_mb"] for m in medidas), 1),
+        "openai_cargado": medidas[-1]["openai_cargado"],
+        "twilio_cargado": medidas[-1]["twilio_cargado"],
+    }
+    print(json.dumps(resultado, indent=2))
+
+    # Si se define un presupuesto, salimos con error cuando se excede (para CI)
+    excedido = (
+        (args.presupuesto_ms is not None and resultado["import_ms_mediana"] > args.presupuesto_ms) or
+        (args.presupuesto_mb is not None and resultado["rss_mb_mediana"] > args.presupuesto_mb)
+    )
+    sys.exit(1 if excedido else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Circuit breaker de OpenAI con un cliente falso: sano, lento (más que OPENAI_TIMEOUT), caído y
+recuperado. Para cada fase muestra cuánto tarda el webhook en contestar, cuántas llamadas
+llegaron a OpenAI y en qué estado queda el circuito.
+
+    python -m benchmarks.bench_circuito [--mensajes 20 --timeout 0.5 --apertura 2]
+"""
+import argparse
+import os
+import tempfile
+import time
+from collections import Counter
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+os.environ.setdefault("WHATSAPP_TRANSPORTE", "falso")
+os.environ.setdefault("OUTBOX_EN_PROCESO", "0")
+os.environ.setdefault("RECORDATORIOS_EN_PROCESO", "0")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mensajes", type=int, default=20, help="mensajes por fase")
+    parser.add_argument("--timeout", type=float, default=0.5)
+    parser.add_argument("--umbral", type=int, default=3)
+    parser.add_argument("--apertura", type=float, default=2.0)
+    args = parser.parse_args()
+
+    os.environ["OPENAI_TIMEOUT"] = str(args.timeout)
+    os.environ["OPENAI_CIRCUITO_UMBRAL"] = str(args.umbral)
+    os.environ["OPENAI_CIRCUITO_LENTA"] = str(args.timeout * 0.8)
+    os.environ["OPENAI_CIRCUITO_APERTURA"] = str(args.apertura)
+
+    import app as backend
+    from api.models import db, Usuario
+    from benchmarks.falsos import ClienteOpenAIFalso
+
+    cliente = backend.openai_client = ClienteOpenAIFalso(0.05)
+    with backend.app.app_context():
+        db.create_all()
+        db.session.add(Usuario(nombre="Bench", email="bench@bench.com", clave="x", telefono="+1999"))
+        db.session.commit()
+
+        fases = [
+            ("sana", lambda: setattr(cliente, "latencia", 0.05)),
+            ("lenta", lambda: setattr(cliente, "latencia", 30)),
+            ("caída", lambda: (setattr(cliente, "latencia", 0.01), setattr(cliente, "falla", True),
+                               time.sleep(args.apertura))),
+            ("recuperada", lambda: (setattr(cliente, "falla", False), time.sleep(args.apertura))),
+        ]
+        print(f"{'fase':11s} {'media':>8s} {'máx':>8s} {'OpenAI':>7s}  {'circuito':12s} resultados")
+        n = 0
+        for nombre, preparar in fases:
+            preparar()
+            llamadas_antes = cliente.llamadas
+            tiempos, resultados = [], Counter()
+            for _ in range(args.mensajes):
+                n += 1  # textos distintos: la caché de extracción no debe tapar la llamada
+                inicio = time.perf_counter()
+                resultados[backend.procesar_mensaje_whatsapp("+1999", f"recordame pagar la cuenta {n} el jueves")] += 1
+                tiempos.append(time.perf_counter() - inicio)
+            print(f"{nombre:11s} {sum(tiempos) / len(tiempos) * 1000:6.0f}ms {max(tiempos) * 1000:6.0f}ms "
+                  f"{cliente.llamadas - llamadas_antes:7d}  {backend.enrutador_ia.primario.circuito.estado:12s} {dict(resultados)}")
+    backend.procesador_entrantes.detener()
+
+
+if __name__ == "__main__":
+    main()
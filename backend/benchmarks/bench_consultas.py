@@ -0,0 +1,72 @@
+"""
+Cuenta las sentencias SQL por request en las rutas protegidas, antes y después de llevar
+el idUsuario en el JWT. "antes" usa un token sin el claim y la caché de usuarios vacía,
+que equivale a la búsqueda por email que hacía cada ruta.
+
+    python -m benchmarks.bench_consultas
+"""
+import json
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+os.environ.setdefault("WHATSAPP_TRANSPORTE", "falso")
+os.environ.setdefault("OUTBOX_EN_PROCESO", "0")
+
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+
+import app as backend
+from api.models import db, Usuario
+
+TAREA = {"titulo": "Bench", "fecha": "2030-01-01", "horaInicio": "10:00", "horaFin": "11:00", "etiqueta": "Otros"}
+# Todas las rondas crean la misma tarea: sin esto el segundo POST devuelve 409 por el solapamiento
+CREAR = "/tarea?permitirSolape=1"
+
+
+class ContadorSQL:
+    def __init__(self, engine):
+        self.total = 0
+        event.listen(engine, "before_cursor_execute", self._contar)
+
+    def _contar(self, *args, **kwargs):
+        self.total += 1
+
+
+def medir(cliente, contador, metodo, url, headers, limpiar_cache, **kwargs):
+    if limpiar_cache:
+        backend.cache_usuarios.limpiar()
+    contador.total = 0
+    respuesta = getattr(cliente, metodo)(url, headers=headers, **kwargs)
+    return contador.total, respuesta
+
+
+def main():
+    with backend.app.app_context():
+        db.create_all()
+        usuario = Usuario(nombre="Bench", email="bench@bench.com", clave="x", telefono="+10000000")
+        db.session.add(usuario)
+        db.session.commit()
+
+        token_viejo = create_access_token(identity=usuario.email)
+        token_nuevo = create_access_token(identity=usuario.email, additional_claims={"idUsuario": usuario.idUsuario})
+        contador = ContadorSQL(db.engine)
+
+    cliente = backend.app.test_client()
+    resultados = {}
+    for nombre, token, limpiar in (("antes", token_viejo, True), ("despues", token_nuevo, False)):
+        headers = {"Authorization": f"Bearer {token}"}
+        # Calentamos la caché de usuarios para el caso "despues"
+        medir(cliente, contador, "post", CREAR, headers, limpiar, json=TAREA)
+
+        n_listar, _ = medir(cliente, contador, "get", "/tareas", headers, limpiar)
+        n_crear, respuesta = medir(cliente, contador, "post", CREAR, headers, limpiar, json=TAREA)
+        id_tarea = respuesta.get_json()["tarea"]["idTarea"]
+        n_borrar, _ = medir(cliente, contador, "delete", f"/tarea/{id_tarea}", headers, limpiar)
+        resultados[nombre] = {"GET /tareas": n_listar, "POST /tarea": n_crear, "DELETE /tarea": n_borrar}
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
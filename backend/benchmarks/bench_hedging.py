@@ -0,0 +1,85 @@
+"""
+Latencia de la extracción con IA contra dos servidores locales con la forma de la API de chat
+(un "openai" y un "deepseek"), los dos con una cola lenta: una fracción de los pedidos tarda
+--cola segundos en vez de --latencia.
+
+1) Solo el primario.
+2) Primario con el secundario como respaldo (sin hedging).
+3) Hedging: si el primario no respondió en su p90 se le pide también al secundario.
+
+Muestra p50/p90/p99, cuántos pedidos extra recibió el secundario y quién ganó.
+
+    python -m benchmarks.bench_hedging [--pedidos 400 --workers 8 --latencia 0.05 --cola 1 --prob-cola 0.08]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api.circuito import Circuito
+from api.proveedores_ia import ProveedorChatHttp, EnrutadorIA, IANoDisponible
+from benchmarks.falsos import ServidorLLMFalso
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def proveedor(nombre, servidor, timeout):
+    # Circuito que no se abre: acá interesa la latencia, no el corte
+    return ProveedorChatHttp(nombre, servidor.url, "clave", "modelo", timeout,
+                             Circuito(nombre, umbral=10 ** 9, lenta=timeout, apertura=1))
+
+
+def correr(enrutador, pedidos, workers):
+    def extraer(i):
+        inicio = time.perf_counter()
+        try:
+            resultado = enrutador.extraer(f"Descripción original: \"tarea {i} mañana a las 10\"")
+        except IANoDisponible:
+            resultado = None
+        return time.perf_counter() - inicio, resultado is not None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(extraer, range(pedidos)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pedidos", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latencia", type=float, default=0.05)
+    parser.add_argument("--cola", type=float, default=1.0, help="latencia de la cola lenta (s)")
+    parser.add_argument("--prob-cola", type=float, default=0.08)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{args.pedidos} pedidos, {args.workers} en paralelo; latencia {args.latencia * 1000:.0f}ms "
+          f"y {args.prob_cola:.0%} de los pedidos a {args.cola * 1000:.0f}ms")
+    print(f"{'modo':22s} {'p50':>7s} {'p90':>7s} {'p99':>7s} {'máx':>7s} {'ok':>5s} "
+          f"{'secundario':>10s} {'ganó sec.':>9s}")
+
+    modos = [("solo primario", False, False), ("con respaldo", True, False), ("hedging p90", True, True)]
+    for nombre, con_secundario, hedging in modos:
+        primario_srv = ServidorLLMFalso("openai", args.latencia, args.cola, args.prob_cola, semilla=1).iniciar()
+        secundario_srv = ServidorLLMFalso("deepseek", args.latencia * 1.5, args.cola, args.prob_cola,
+                                          semilla=2).iniciar()
+        try:
+            primario = proveedor("openai_http", primario_srv, args.timeout)
+            secundario = proveedor("deepseek", secundario_srv, args.timeout) if con_secundario else None
+            # Hasta juntar muestras del p90 se espera un poco más que la latencia típica
+            enrutador = EnrutadorIA(primario, secundario, hedging=hedging, espera_inicial=args.latencia * 3,
+                                    workers=args.workers * 4)
+            resultados = correr(enrutador, args.pedidos, args.workers)
+            tiempos = [t for t, _ in resultados]
+            ganadas = secundario.estadisticas.serialize()['ganadas'] if secundario else 0
+            print(f"{nombre:22s} {percentil(tiempos, 0.5) * 1000:5.0f}ms {percentil(tiempos, 0.9) * 1000:5.0f}ms "
+                  f"{percentil(tiempos, 0.99) * 1000:5.0f}ms {max(tiempos) * 1000:5.0f}ms "
+                  f"{sum(ok for _, ok in resultados):5d} {secundario_srv.llamadas:10d} {ganadas:9d}")
+        finally:
+            primario_srv.detener()
+            secundario_srv.detener()
+
+
+if __name__ == "__main__":
+    main()
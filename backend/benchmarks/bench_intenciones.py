@@ -0,0 +1,97 @@
+"""
+Clasificación de mensajes de WhatsApp: la cadena de if/elif con `in` que tenía el webhook
+contra el clasificador precompilado de api/intenciones.py. Mide el tiempo por mensaje y lista
+los mensajes que cada uno enruta distinto.
+
+El corpus por defecto son mensajes reales anonimizados; con --db se leen los cuerpos grabados
+en mensaje_entrante de esa base.
+
+    python -m benchmarks.bench_intenciones [--repeticiones 2000]
+    python -m benchmarks.bench_intenciones --db sqlite:///sqlite/database.db
+"""
+import argparse
+import time
+from collections import Counter
+
+from api.intenciones import clasificador_intenciones, normalizar_mensaje
+
+CORPUS = [
+    "hola", "Hola", "menu", "buenas", "buenas tardes", "que tal", "opciones", "hola!", "Holaa",
+    "1", "2", "1️⃣", "2️⃣", "crear tarea", "quiero crear tarea", "ver tareas", "ver mis tareas pendientes",
+    "más", "mas", "Ver más", "pendientes",
+    "mañana a las 10 reunión con el equipo", "dentista el 30/10 a las 16:45",
+    "agendar paseo con el perro mañana a las 10 am", "recordame llamar a mamá el jueves",
+    "gym 7am", "clase de inglés el sábado a las 15", "pasado mañana 9 am", "turno médico el día 12",
+    "examen el 2 de noviembre a las 8:30", "lavar ropa hoy 18hs", "cena para el viernes",
+    "10 de mayo cumpleaños de la abuela", "20 minutos de meditación", "2 horas de estudio",
+    "1 de mayo dentista a las 10", "15/06 turno médico", "2 de julio vacuna", "1.",
+    "recordame llamar a mamá", "gracias", "ok", "dale", "perfecto, gracias!", "cancelar",
+    "tengo que comprar pan", "comprar papel higiénico", "programa de la semana", "ayuda",
+    "dame el listado", "quien sos?", "jajaja", "amo esta app", "llamar a Pamela",
+    "presentación del proyecto final", "camisa para planchar", "te mando un audio",
+]
+
+
+def clasificar_encadenado(body):
+    # La cadena original de procesar_mensaje_whatsapp (body ya viene en minúsculas del webhook)
+    if body in ["hola", "menu", "opciones", "que tal", "buenas", "buenas tardes", "buenas noches", "Hola"]:
+        return "menu"
+    elif body in ["más", "mas", "ver más", "ver mas"]:
+        return "mas"
+    elif body.startswith("1") or "crear tarea" in body:
+        return "crear"
+    elif any(word in body for word in ["mañana", "pasado", "am", "pm", "agendar", "a las", "para el", "el ", "día "]):
+        return "nueva_tarea"
+    elif body.startswith("2") or "ver tarea" in body or "pendiente" in body:
+        return "ver"
+    return None
+
+
+def cargar_corpus(uri):
+    if not uri:
+        return CORPUS
+    from sqlalchemy import create_engine, text
+    with create_engine(uri).connect() as conexion:
+        return [fila[0] for fila in conexion.execute(text("SELECT cuerpo FROM mensaje_entrante"))]
+
+
+def medir(funcion, mensajes, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for mensaje in mensajes:
+            funcion(mensaje)
+    return (time.perf_counter() - inicio) / (repeticiones * len(mensajes))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticiones", type=int, default=2000)
+    parser.add_argument("--db", default=None, help="URI de una base con mensaje_entrante grabados")
+    args = parser.parse_args()
+
+    mensajes = [m.strip().lower() for m in cargar_corpus(args.db)]
+    print(f"{len(mensajes)} mensajes")
+
+    encadenado = medir(clasificar_encadenado, mensajes, args.repeticiones)
+    compilado = medir(clasificador_intenciones.clasificar, mensajes, args.repeticiones)
+    solo_regex = medir(lambda m: clasificador_intenciones.clasificar(m, normalizado=True),
+                       [normalizar_mensaje(m) for m in mensajes], args.repeticiones)
+    print(f"if/elif con `in`:        {encadenado * 1e6:6.2f} µs/mensaje")
+    print(f"clasificador compilado:  {compilado * 1e6:6.2f} µs/mensaje "
+          f"({solo_regex * 1e6:.2f} µs sin contar la normalización)")
+
+    antes = Counter(clasificar_encadenado(m) for m in mensajes)
+    despues = Counter(clasificador_intenciones.clasificar(m) for m in mensajes)
+    print(f"\n{'intención':14s} {'antes':>6s} {'ahora':>6s}")
+    for intencion in sorted(set(antes) | set(despues), key=str):
+        print(f"{str(intencion):14s} {antes[intencion]:6d} {despues[intencion]:6d}")
+
+    distintos = [(m, clasificar_encadenado(m), clasificador_intenciones.clasificar(m)) for m in dict.fromkeys(mensajes)]
+    distintos = [d for d in distintos if d[1] != d[2]]
+    print(f"\n{len(distintos)} mensajes enrutados distinto (antes -> ahora):")
+    for mensaje, a, b in distintos:
+        print(f"  {mensaje!r:50s} {a} -> {b}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Lecturas y escrituras concurrentes contra SQLite con y sin el perfil del motor
+(DB_PERFIL=auto: WAL, synchronous=NORMAL, busy_timeout, cache/mmap; DB_PERFIL=ninguno: como antes).
+Cada perfil corre en un proceso aparte, con su propia base, lectores en GET /tareas y
+escritores en POST /tarea.
+
+    python -m benchmarks.bench_motor [--segundos 5] [--lectores 6] [--escritores 2]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+PERFILES = ("ninguno", "auto")
+
+
+def correr_perfil(segundos, lectores, escritores):
+    os.environ.setdefault("WHATSAPP_TRANSPORTE", "falso")
+    os.environ.setdefault("OUTBOX_EN_PROCESO", "0")
+
+    import app as backend
+    from api.models import db
+
+    with backend.app.app_context():
+        db.create_all()
+        modo = db.session.execute(db.text("PRAGMA journal_mode")).scalar()
+    cliente = backend.app.test_client()
+    cliente.post("/usuario", json={"nombre": "Bench", "email": "bench@bench.com", "clave": "x", "telefono": "bench"})
+    token = cliente.post("/login", json={"email": "bench@bench.com", "clave": "x"}).get_json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    conteos = {"lecturas": 0, "escrituras": 0, "errores": 0}
+    lock = threading.Lock()
+    fin = time.monotonic() + segundos
+
+    def trabajar(tipo):
+        cliente_hilo = backend.app.test_client()
+        i = 0
+        while time.monotonic() < fin:
+            i += 1
+            try:
+                if tipo == "lecturas":
+                    ok = cliente_hilo.get("/tareas?limit=50", headers=headers).status_code == 200
+                else:
+                    ok = cliente_hilo.post("/tarea?permitirSolape=1", headers=headers, json={
+                        "titulo": f"Bench {i}", "fecha": f"2030-01-{i % 28 + 1:02d}",
+                        "horaInicio": "10:00", "horaFin": "11:00", "etiqueta": "Otros"
+                    }).status_code == 201
+            except Exception:
+                ok = False
+            with lock:
+                conteos[tipo if ok else "errores"] += 1
+
+    hilos = [threading.Thread(target=trabajar, args=("lecturas",)) for _ in range(lectores)]
+    hilos += [threading.Thread(target=trabajar, args=("escrituras",)) for _ in range(escritores)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    print(json.dumps({
+        "perfil": os.environ["DB_PERFIL"],
+        "journal_mode": modo,
+        "lecturas_s": round(conteos["lecturas"] / segundos, 1),
+        "escrituras_s": round(conteos["escrituras"] / segundos, 1),
+        "errores": conteos["errores"],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--segundos", type=float, default=5)
+    parser.add_argument("--lectores", type=int, default=6)
+    parser.add_argument("--escritores", type=int, default=2)
+    parser.add_argument("--hijo", action="store_true")
+    args = parser.parse_args()
+
+    if args.hijo:
+        correr_perfil(args.segundos, args.lectores, args.escritores)
+        return
+
+    for perfil in PERFILES:
+        entorno = dict(os.environ, DB_PERFIL=perfil,
+                       DATABASE_URL="sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+        salida = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_motor", "--hijo", "--segundos", str(args.segundos),
+             "--lectores", str(args.lectores), "--escritores", str(args.escritores)],
+            capture_output=True, text=True, env=entorno, check=True
+        )
+        r = json.loads(salida.stdout.strip().splitlines()[-1])
+        print(f"{r['perfil']:8s} ({r['journal_mode']:6s})  lecturas/s {r['lecturas_s']:7.1f}  "
+              f"escrituras/s {r['escrituras_s']:7.1f}  errores {r['errores']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Compara la latencia del parser de reglas contra el camino LLM de extract_task_fields_from_prompt.
+
+    python -m benchmarks.bench_parser                 # LLM simulado con latencia fija
+    python -m benchmarks.bench_parser --real          # usa OpenAI de verdad (requiere OPENAI_APIKEY)
+    python -m benchmarks.bench_parser --latencia 1.5 --repeticiones 200
+"""
+import argparse
+import json
+import statistics
+import time
+
+from api.parser_tareas import parsear_tarea, UMBRAL_CONFIANZA, EstadisticasParser
+from benchmarks.falsos import ClienteOpenAIFalso
+
+CORPUS = [
+    "mañana a las 10",
+    "el sábado a las 15",
+    "pasado mañana 9 am",
+    "tengo que ir al médico mañana a las 10",
+    "clase de inglés el sábado a las 15",
+    "reunión con el cliente el lunes de 10 a 12",
+    "cena con amigos el viernes a las 9 de la noche",
+    "agendar paseo con el perro mañana a las 10 am",
+    "examen el 2 de noviembre a las 8:30",
+    "lavar ropa hoy 18hs",
+    "gym el 25 a las 7",
+    "dentista el 30/10 a las 16:45 hasta las 17:30",
+    "el jueves tengo que pagar la luz",
+    "recordame llamar a mamá",
+    "turno con el kinesiólogo el miércoles que viene por la tarde",
+]
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def resumen(tiempos):
+    return {
+        "n": len(tiempos),
+        "media_ms": round(statistics.mean(tiempos) * 1000, 4),
+        "p50_ms": round(percentil(tiempos, 0.50) * 1000, 4),
+        "p95_ms": round(percentil(tiempos, 0.95) * 1000, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticiones", type=int, default=1000)
+    parser.add_argument("--latencia", type=float, default=2.0, help="latencia simulada del LLM (s)")
+    parser.add_argument("--real", action="store_true", help="llamar a OpenAI de verdad")
+    args = parser.parse_args()
+
+    import app as backend
+    if not args.real:
+        backend.openai_client = ClienteOpenAIFalso(args.latencia)
+
+    estadisticas = EstadisticasParser()
+    tiempos_reglas = []
+    for _ in range(args.repeticiones):
+        for frase in CORPUS:
+            inicio = time.perf_counter()
+            datos, confianza = parsear_tarea(frase)
+            tiempos_reglas.append(time.perf_counter() - inicio)
+
+    tiempos_llm = []
+    tiempos_combinado = []
+    for frase in CORPUS:
+        inicio = time.perf_counter()
+        backend.extract_task_fields_from_prompt(frase)
+        tiempos_llm.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        datos, confianza = parsear_tarea(frase)
+        if datos and confianza >= UMBRAL_CONFIANZA:
+            estadisticas.registrar("reglas")
+        else:
+            estadisticas.registrar("llm")
+            backend.extract_task_fields_from_prompt(frase)
+        tiempos_combinado.append(time.perf_counter() - inicio)
+
+    print(json.dumps({
+        "reglas": resumen(tiempos_reglas),
+        "llm": resumen(tiempos_llm),
+        "reglas_con_respaldo_llm": resumen(tiempos_combinado),
+        "tasa_aciertos_reglas": estadisticas.serialize(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
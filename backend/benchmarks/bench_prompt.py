@@ -0,0 +1,186 @@
+"""
+Tamaño y validez del prompt de extracción: el prompt armado a mano que tenía app.py (ejemplos
+repetidos, JSON de ejemplo inválido) contra ConstructorPrompt de api/prompt_tareas.py.
+
+1) Tokens estimados del prompt y cuántos ejemplos son JSON válido.
+2) Una tanda de pedidos contra ServidorLLMFalso (que factura tokens con usage como OpenAI y
+   tarda más cuanto más largo es el prompt): tokens facturados, latencia y respuestas válidas.
+
+Termina con código 1 si el prompt nuevo pasa el presupuesto, para atrapar que el prompt engorde.
+
+    python -m benchmarks.bench_prompt [--pedidos 200 --presupuesto 600 --segundos-por-token 0.0001]
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from datetime import date, timedelta
+
+from api.circuito import Circuito
+from api.prompt_tareas import ConstructorPrompt, estimar_tokens, validar_tarea, ESQUEMA_TAREA
+from api.proveedores_ia import ProveedorChatHttp, json_de_respuesta
+from benchmarks.falsos import ServidorLLMFalso
+
+FRASES = [
+    "Tengo que ir al dentista mañana a las 10",
+    "clase de yoga el jueves 18hs",
+    "reunión con el cliente pasado mañana de 9 a 10:30",
+    "cumple de la abuela el 28 a la noche",
+    "llevar el auto al mecánico el lunes temprano",
+    "comprar regalos para navidad",
+]
+
+
+# El prompt tal como estaba en extract_task_fields_from_prompt, como línea de base
+def prompt_anterior(texto, hoy):
+    return f"""
+        Sos un asistente que transforma descripciones de tareas en objetos JSON con formato preciso. Recibís frases informales, en español o spanglish, y devolvés exclusivamente un JSON con estos campos:
+
+        - "title": título corto de la tarea
+        - "date": fecha en formato YYYY-MM-DD (puede inferirse de palabras como "mañana", "pasado mañana", "lunes", "el 28", etc.)
+        - "hour": hora de inicio en formato 24h HH:MM (ejemplo: 14:30)
+        - "endHour": hora de finalización en formato 24h HH:MM. Si no está clara, sumá 1 hora a "hour"
+        - "category": elegí una sola categoría de esta lista exacta (en mayúscula inicial): Personal, Trabajo, Estudio, Hogar, Salud, Otros
+
+        ⚠️ Reglas clave:
+        - No uses fechas anteriores a {hoy}.
+        - Convertí palabras como "mañana", "pasado mañana" a fechas reales:
+            - "mañana" → {hoy + timedelta(days=1)}
+            - "pasado mañana" → {hoy + timedelta(days=2)}
+        - Si dicen solo la hora ("a las 9"), asumí que es AM. Si dicen "a la noche", asumí PM.
+        - Si falta hora fin, sumá 1 hora a la de inicio (pero nunca menor).
+        - No incluyas ningún texto explicativo. Solo el JSON válido.
+        - El JSON debe estar bien formado, sin comentarios ni saltos innecesarios.
+        - Si te dicen proximo sabado, o proximo dia o lo que sea, tu encargate de devolver la fecha correcta, no pongas [calculá la próxima fecha que sea sábado] ni nada por el estilo. DEvuelve la fehca con el formato especififcado.
+        - Intrepreta lo que te dicen, si faltan datos tu agregalo smanualmente calculando lo que falta, por ejemplo si te dicen "a las 10" vos poné "10:00" y "11:00" como hora de finalización, o si te dicen "el lunes a las 9" vos poné la fecha del próximo lunes y la hora de inicio y fin.
+        - Necesito que siempre registres los datos completos.
+        - Tambien necesito que ahora interpretes la descripcion, es decir que en base a lo que te digan devuelvas tambein un campo decripcion en base al titulo
+        - Explciando un poco mejor la DESCRIPCION ES SUPER IMPORTANTE, por ejemplo si te dicen "Tengo que ir al médico mañana a las 10" vos poné "Ir al médico" como título y "Tengo que ir al médico" como descripción, o si te dicen "Clase de inglés el sábado a las 15" vos poné "Clase de inglés" como título y "Clase de inglés el sábado a las 15" como descripción.
+        
+        Entrada: "Clase de inglés el sábado a las 15"
+        → JSON:
+        {{
+        "title": "Clase de inglés",
+        "date": "2025-07-05",  # reemplazá por el próximo sábado dinámico
+        "hour": "15:00",
+        "endHour": "16:00",
+        "category": "Estudio"
+        "description": "Clase de inglés el sábado a las 15"
+        }}
+
+        - Si te piden un día como "sábado", devolvé la PRÓXIMA fecha real que sea sábado (en formato YYYY-MM-DD)
+        ejemplo : next_saturday = next_weekday_date("sábado").strftime("%Y-%m-%d")
+
+        Entrada: "Clase de inglés el sábado a las 15"
+        → JSON:
+        {{
+        "title": "Clase de inglés",
+        "date": "2025-07-05",  # reemplazá por el próximo sábado dinámico
+        "hour": "15:00",
+        "endHour": "16:00",
+        "category": "Estudio"
+        "description": "Clase de inglés el sábado a las 15"
+        }}
+
+        Necesito que sigas tal cual te digo 
+
+
+        ✍️ Ejemplos:
+
+        Entrada: "Tengo que ir al médico mañana a las 10"
+        → JSON:
+        {{
+        "title": "Ir al médico",
+        "date": "{(hoy + timedelta(days=1)).strftime('%Y-%m-%d')}",
+        "hour": "10:00",
+        "endHour": "11:00",
+        "category": "Salud"
+        "description": "Tengo que ir al médico mañana a las 10"	
+        }}
+
+        Entrada: "Clase de inglés el sábado a las 15"
+        → JSON:
+        {{
+        "title": "Clase de inglés",
+        "date": "[calculá la próxima fecha que sea sábado]",
+        "hour": "15:00",
+        "endHour": "16:00",
+        "category": "Estudio"
+        }}
+
+        Descripción original: "{texto}"
+        """
+
+
+def ejemplos_validos(prompt):
+    """(válidos, total) de los bloques {...} de ejemplo del prompt que parsean con json.loads."""
+    bloques = re.findall(r"\{[^{}]*\}", prompt)
+    validos = 0
+    for bloque in bloques:
+        try:
+            json.loads(bloque)
+            validos += 1
+        except ValueError:
+            pass
+    return validos, len(bloques)
+
+
+def correr(proveedor, armar, pedidos, hoy):
+    tiempos, validas = [], 0
+    for i in range(pedidos):
+        prompt = armar(FRASES[i % len(FRASES)], hoy)
+        inicio = time.perf_counter()
+        contenido = proveedor.completar(prompt, esquema=ESQUEMA_TAREA)
+        tiempos.append(time.perf_counter() - inicio)
+        validas += validar_tarea(json_de_respuesta(contenido)) is not None
+    tiempos.sort()
+    return tiempos, validas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pedidos", type=int, default=200)
+    parser.add_argument("--presupuesto", type=int, default=600)
+    parser.add_argument("--latencia", type=float, default=0.02)
+    parser.add_argument("--segundos-por-token", type=float, default=0.0001)
+    args = parser.parse_args()
+
+    hoy = date.today()
+    constructor = ConstructorPrompt(presupuesto=args.presupuesto)
+    armar_nuevo = lambda texto, dia: constructor.construir(texto, dia)[0]
+
+    print(f"{'prompt':10s} {'tokens':>7s} {'bytes':>6s} {'ejemplos JSON válidos':>22s}")
+    for nombre, armar in (("anterior", prompt_anterior), ("nuevo", armar_nuevo)):
+        prompt = armar(FRASES[0], hoy)
+        validos, total = ejemplos_validos(prompt)
+        print(f"{nombre:10s} {estimar_tokens(prompt):7d} {len(prompt.encode('utf-8')):6d} {validos:>14d} de {total}")
+    print(f"presupuesto {args.presupuesto}: {constructor.ejemplos_incluidos} de {len(constructor.ejemplos)} "
+          f"ejemplos incluidos, prompt más largo {constructor.tokens_maximos} tokens\n")
+
+    servidor = ServidorLLMFalso("openai", args.latencia, segundos_por_token=args.segundos_por_token).iniciar()
+    try:
+        print(f"{'prompt':10s} {'formato':8s} {'tokens prompt':>13s} {'respuesta':>9s} {'p50':>7s} {'p90':>7s} "
+              f"{'válidas':>8s}")
+        for nombre, armar, formato in (("anterior", prompt_anterior, "texto"), ("nuevo", armar_nuevo, "esquema")):
+            proveedor = ProveedorChatHttp("openai_http", servidor.url, "clave", "gpt-4o-mini", 10,
+                                          Circuito(nombre, umbral=10 ** 9, lenta=10, apertura=1), formato,
+                                          admite_esquema=True)
+            tiempos, validas = correr(proveedor, armar, args.pedidos, hoy)
+            estadisticas = proveedor.estadisticas.serialize()
+            print(f"{nombre:10s} {formato:8s} {estadisticas['promedioTokensPrompt']:13.0f} "
+                  f"{estadisticas['tokensRespuesta'] / args.pedidos:9.0f} "
+                  f"{tiempos[len(tiempos) // 2] * 1000:5.1f}ms {tiempos[int(len(tiempos) * 0.9)] * 1000:5.1f}ms "
+                  f"{validas:8d}")
+    finally:
+        servidor.detener()
+
+    # Reservando lugar para una entrada del largo máximo
+    maximo, _ = constructor.construir("x" * 1000, hoy)
+    if estimar_tokens(maximo) > args.presupuesto:
+        print(f"\nEl prompt nuevo ({estimar_tokens(maximo)} tokens) pasa el presupuesto de {args.presupuesto}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
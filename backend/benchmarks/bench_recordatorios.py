@@ -0,0 +1,77 @@
+"""
+Throughput del programador de recordatorios: siembra N recordatorios que vencen a lo largo de
+una hora y los procesa en un solo hilo (carga por ventana + heap + lotes encolados en el outbox).
+A mitad de camino se "reinicia" el programador para comprobar que no se duplica ni se pierde nada.
+
+    python -m benchmarks.bench_recordatorios [--recordatorios 100000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, time as hora
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+os.environ.setdefault("WHATSAPP_TRANSPORTE", "falso")
+os.environ.setdefault("OUTBOX_EN_PROCESO", "0")
+os.environ.setdefault("RECORDATORIOS_EN_PROCESO", "0")
+
+import app as backend
+from api.models import db, Usuario, Tarea, Recordatorio, MensajeSaliente
+from api.recordatorios import ProgramadorRecordatorios
+
+INICIO = datetime(2030, 1, 7, 8, 0)
+MINUTOS_ANTES = 90  # todas las tareas empiezan después de la hora simulada
+
+
+def sembrar(cantidad, usuarios=1000, lote=10000):
+    db.create_all()
+    db.session.execute(db.insert(Usuario), [
+        {"nombre": f"U{i}", "email": f"u{i}@bench.com", "clave": "x", "telefono": f"+1666{i:07d}"}
+        for i in range(usuarios)
+    ])
+    paso = 3600 / cantidad
+    for desde in range(0, cantidad, lote):
+        filas = []
+        for i in range(desde, min(desde + lote, cantidad)):
+            inicio = INICIO + timedelta(seconds=i * paso, minutes=MINUTOS_ANTES)
+            filas.append({"titulo": f"Tarea {i}", "descripcion": "", "imageUrl": "", "fecha": inicio.date(),
+                          "horaInicio": hora(inicio.hour, inicio.minute), "horaFin": hora(23, 59),
+                          "etiqueta": "Otros", "idUsuario": i % usuarios + 1})
+        ids = db.session.execute(db.insert(Tarea).returning(Tarea.idTarea, sort_by_parameter_order=True),
+                                 filas).scalars().all()
+        db.session.execute(db.insert(Recordatorio), [
+            {"idTarea": id_tarea, "idUsuario": f["idUsuario"], "minutosAntes": MINUTOS_ANTES, "estado": "pendiente",
+             "venceEn": datetime.combine(f["fecha"], f["horaInicio"]) - timedelta(minutes=MINUTOS_ANTES)}
+            for id_tarea, f in zip(ids, filas)
+        ])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recordatorios", type=int, default=100000)
+    parser.add_argument("--lote", type=int, default=500)
+    args = parser.parse_args()
+
+    with backend.app.app_context():
+        sembrar(args.recordatorios)
+
+        inicio = time.perf_counter()
+        # Primera media hora con una instancia; después otra nueva, como tras un reinicio
+        primero = ProgramadorRecordatorios(lote=args.lote).vaciar(INICIO + timedelta(minutes=30))
+        segundo = ProgramadorRecordatorios(lote=args.lote).vaciar(INICIO + timedelta(minutes=61))
+        segundos = time.perf_counter() - inicio
+
+        mensajes = db.session.query(MensajeSaliente).count()
+        pendientes = db.session.query(Recordatorio).filter(Recordatorio.estado == "pendiente").count()
+
+    total = primero + segundo
+    print(f"{total} recordatorios procesados en {segundos:.2f}s ({primero} + {segundo} tras el reinicio)")
+    print(f"{total / segundos:,.0f}/s  ->  {total / segundos * 3600:,.0f} por hora en un hilo")
+    print(f"mensajes en el outbox: {mensajes}  pendientes: {pendientes}  "
+          f"{'OK' if mensajes == args.recordatorios and not pendientes else 'DIFERENCIA'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Resumen diario: envío a N usuarios con un transporte falso que tarda como Twilio.
+Compara el camino ingenuo (una consulta y un envío bloqueante por usuario) contra
+EnviadorResumenDiario (lotes, una consulta por lote, pool de workers con token bucket).
+El ingenuo se mide sobre una muestra y se extrapola.
+
+    python -m benchmarks.bench_resumen_diario [--usuarios 20000 --latencia 0.1 --tasa 400 --workers 64]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, time as hora
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+os.environ.setdefault("WHATSAPP_TRANSPORTE", "falso")
+os.environ.setdefault("OUTBOX_EN_PROCESO", "0")
+os.environ.setdefault("RECORDATORIOS_EN_PROCESO", "0")
+
+import app as backend
+from api.models import db, Usuario, Tarea
+from api.mensajeria import TransporteFalso
+from api.resumen_diario import EnviadorResumenDiario, texto_resumen
+
+DIA = date(2030, 1, 7)
+
+
+def sembrar(usuarios, tareas_por_usuario, semilla=7, lote=10000):
+    rng = random.Random(semilla)
+    db.create_all()
+    db.session.execute(db.insert(Usuario), [
+        {"nombre": f"U{i}", "email": f"u{i}@bench.com", "clave": "x", "telefono": f"+1777{i:07d}"}
+        for i in range(usuarios)
+    ])
+    filas = []
+    for id_usuario in range(1, usuarios + 1):
+        for _ in range(rng.randrange(tareas_por_usuario * 2 + 1)):
+            inicio = rng.randrange(7, 21)
+            filas.append({"titulo": f"Tarea {rng.randrange(10**6)}", "descripcion": "", "imageUrl": "",
+                          "fecha": DIA, "horaInicio": hora(inicio), "horaFin": hora(inicio + 1),
+                          "etiqueta": "Otros", "idUsuario": id_usuario})
+    for desde in range(0, len(filas), lote):
+        db.session.execute(db.insert(Tarea), filas[desde:desde + lote])
+    db.session.commit()
+    return len(filas)
+
+
+def ingenuo(transporte, muestra):
+    # Lo que haría un bucle simple: por usuario, su consulta y un envío que espera a Twilio
+    for usuario in Usuario.query.order_by(Usuario.idUsuario).limit(muestra):
+        tareas = Tarea.query.filter_by(idUsuario=usuario.idUsuario, fecha=DIA).order_by(Tarea.horaInicio).all()
+        if tareas:
+            transporte.send(usuario.telefono, texto_resumen(usuario.nombre, DIA,
+                                                            [(t.horaInicio, t.titulo) for t in tareas]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=20000)
+    parser.add_argument("--tareas-por-usuario", type=int, default=3)
+    parser.add_argument("--latencia", type=float, default=0.1, help="segundos por envío")
+    parser.add_argument("--tasa", type=float, default=400, help="mensajes por segundo")
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--lote", type=int, default=500)
+    parser.add_argument("--muestra", type=int, default=200)
+    args = parser.parse_args()
+
+    with backend.app.app_context():
+        tareas = sembrar(args.usuarios, args.tareas_por_usuario)
+        print(f"{args.usuarios} usuarios, {tareas} tareas el {DIA}")
+
+        transporte = TransporteFalso(latencia=args.latencia)
+        inicio = time.perf_counter()
+        ingenuo(transporte, args.muestra)
+        por_usuario = (time.perf_counter() - inicio) / args.muestra
+        print(f"ingenuo:  {por_usuario * 1000:.1f} ms por usuario -> ~{por_usuario * args.usuarios / 60:.1f} min "
+              f"para todos (extrapolado de {args.muestra})")
+
+        transporte = TransporteFalso(latencia=args.latencia)
+        enviador = EnviadorResumenDiario(lote=args.lote, workers=args.workers, mensajes_por_segundo=args.tasa)
+        enviador.transporte = transporte
+        inicio = time.perf_counter()
+        resultado = enviador.ejecutar(DIA)
+        segundos = time.perf_counter() - inicio
+        print(f"por lotes: {segundos:.1f}s, {resultado['enviados']} enviados ({resultado['enviados'] / segundos:.0f}/s, "
+              f"tope {args.tasa:.0f}/s), {resultado['sinTareas']} sin tareas, {resultado['reencolados']} al outbox")
+        print(f"mensajes en el transporte: {len(transporte.enviados)}")
+
+
+if __name__ == "__main__":
+    main()
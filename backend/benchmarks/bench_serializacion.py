@@ -0,0 +1,106 @@
+"""
+Micro-benchmark del listado de tareas: ORM + Tarea.serialize() + jsonify (camino original)
+contra proyección de columnas + serializar_filas_tarea + respuesta_json (camino rápido).
+También verifica que ambos cuerpos sean idénticos byte a byte.
+
+    python -m benchmarks.bench_serializacion
+    python -m benchmarks.bench_serializacion --tamanios 1000 10000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import date, time as hora, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+os.environ.setdefault("WHATSAPP_TRANSPORTE", "falso")
+os.environ.setdefault("OUTBOX_EN_PROCESO", "0")
+
+from flask import jsonify
+
+import app as backend
+from api.models import db, Usuario, Tarea
+from api.serializacion import COLUMNAS_TAREA, serializar_filas_tarea, respuesta_json, orjson
+
+TITULOS = ["Clase de inglés", "Ir al médico", "Reunión con cliente", "Gym", "Cumpleaños 🎂", "Lavar ropa"]
+ETIQUETAS = ["Personal", "Trabajo", "Estudio", "Hogar", "Salud", "Otros"]
+
+
+def sembrar(id_usuario, n, azar):
+    inicio = date(2025, 1, 1)
+    filas = []
+    for i in range(n):
+        h = azar.randint(6, 21)
+        titulo = azar.choice(TITULOS)
+        filas.append({
+            "titulo": titulo, "descripcion": f"{titulo} #{i}", "imageUrl": "",
+            "fecha": inicio + timedelta(days=azar.randint(0, 365)),
+            "horaInicio": hora(h, azar.choice((0, 15, 30, 45))), "horaFin": hora(h + 1, 0),
+            "etiqueta": azar.choice(ETIQUETAS), "idUsuario": id_usuario,
+        })
+    db.session.execute(db.insert(Tarea), filas)
+    db.session.commit()
+
+
+def camino_original(id_usuario):
+    tareas = Tarea.query.filter(Tarea.idUsuario == id_usuario).order_by(
+        Tarea.fecha, Tarea.horaInicio, Tarea.idTarea).all()
+    respuesta = jsonify({"success": True, "tareas": [t.serialize() for t in tareas], "siguiente": None})
+    return respuesta.get_data()
+
+
+def camino_rapido(id_usuario):
+    filas = db.session.query(*COLUMNAS_TAREA).filter(Tarea.idUsuario == id_usuario).order_by(
+        Tarea.fecha, Tarea.horaInicio, Tarea.idTarea).all()
+    respuesta, _ = respuesta_json({"success": True, "tareas": serializar_filas_tarea(filas), "siguiente": None})
+    return respuesta.get_data()
+
+
+def cronometrar(funcion, id_usuario, repeticiones):
+    mejor = None
+    cuerpo = None
+    for _ in range(repeticiones):
+        # Sesión limpia en cada vuelta, como en un request nuevo
+        db.session.remove()
+        inicio = time.perf_counter()
+        cuerpo = funcion(id_usuario)
+        transcurrido = time.perf_counter() - inicio
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+    return mejor, cuerpo
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanios", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    backend.app.debug = False
+    azar = random.Random(42)
+    resultados = {"orjson": orjson is not None, "casos": []}
+    with backend.app.test_request_context():
+        db.create_all()
+        for i, n in enumerate(args.tamanios):
+            usuario = Usuario(nombre="Bench", email=f"bench{i}@bench.com", clave="x", telefono=f"+1000{i}")
+            db.session.add(usuario)
+            db.session.commit()
+            id_usuario = usuario.idUsuario
+            sembrar(id_usuario, n, azar)
+
+            t_original, cuerpo_original = cronometrar(camino_original, id_usuario, args.repeticiones)
+            t_rapido, cuerpo_rapido = cronometrar(camino_rapido, id_usuario, args.repeticiones)
+            resultados["casos"].append({
+                "filas": n,
+                "original_ms": round(t_original * 1000, 1),
+                "rapido_ms": round(t_rapido * 1000, 1),
+                "aceleracion": round(t_original / t_rapido, 2),
+                "bytes_identicos": cuerpo_original == cuerpo_rapido,
+            })
+
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Transporte de WhatsApp contra un servidor local con la forma de la API de Twilio.
+
+1) Conexión nueva por mensaje (requests.post suelto) vs TransporteTwilioHttp (sesión keep-alive).
+2) Una ráfaga contra un servidor que acepta --limite mensajes/s: sin límite propio (429 y
+   reintentos) vs TransporteLimitado con ese mismo límite.
+
+    python -m benchmarks.bench_transporte [--mensajes 2000 --workers 8 --workers-rafaga 32 --limite 100]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from api.metricas import metricas
+from api.mensajeria import TransporteTwilioHttp, TransporteLimitado
+from benchmarks.falsos import ServidorTwilioFalso
+
+
+def correr(transporte, mensajes, workers):
+    def enviar(i):
+        try:
+            transporte.send(f"+1555{i:07d}", f"Mensaje {i}")
+            return None
+        except Exception as ex:
+            return ex
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        errores = [e for e in pool.map(enviar, range(mensajes)) if e is not None]
+    return time.perf_counter() - inicio, errores
+
+
+class ConexionPorMensaje:
+    # Lo que pasa sin sesión compartida: cada envío abre (y cierra) su propia conexión
+    def __init__(self, url):
+        self.url = f"{url}/2010-04-01/Accounts/AC1/Messages.json"
+
+    def send(self, destino, cuerpo):
+        requests.post(self.url, data={"To": destino, "Body": cuerpo}, auth=("AC1", "x"), timeout=10).raise_for_status()
+
+
+def total(contador):
+    return sum(contador._valores.values())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mensajes", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--workers-rafaga", type=int, default=32)
+    parser.add_argument("--limite", type=int, default=100, help="mensajes/s que acepta el servidor")
+    args = parser.parse_args()
+
+    print("1) Conexiones")
+    for nombre, crear in (("conexión por mensaje", lambda url: ConexionPorMensaje(url)),
+                          ("sesión keep-alive", lambda url: TransporteTwilioHttp("AC1", "x", "+1000", base_url=url,
+                                                                                 pool=args.workers))):
+        servidor = ServidorTwilioFalso().iniciar()
+        segundos, errores = correr(crear(servidor.url), args.mensajes, args.workers)
+        servidor.detener()
+        print(f"   {nombre:22s} {args.mensajes / segundos:7.0f} msg/s  conexiones TCP: {servidor.conexiones:5d}  "
+              f"errores: {len(errores)}")
+
+    print(f"2) Ráfaga de {args.mensajes // 4} contra un servidor que acepta {args.limite}/s")
+    for nombre, limitar in (("sin límite propio", False), ("token bucket", True)):
+        servidor = ServidorTwilioFalso(latencia=0.02, limite=args.limite).iniciar()
+        transporte = TransporteTwilioHttp("AC1", "x", "+1000", base_url=servidor.url, pool=args.workers_rafaga,
+                                          reintentos=2, backoff=0.2)
+        if limitar:
+            # Un poco por debajo del límite del servidor: las ventanas de 1 s no están alineadas
+            transporte = TransporteLimitado(transporte, args.limite * 0.9, rafaga=args.limite * 0.1)
+        reintentos_antes = total(metricas.whatsapp_reintentos)
+        limitados_antes = total(metricas.whatsapp_limitados)
+        segundos, errores = correr(transporte, args.mensajes // 4, args.workers_rafaga)
+        servidor.detener()
+        print(f"   {nombre:22s} {segundos:5.1f}s  aceptados: {servidor.enviados:5d}  429: {servidor.rechazados:5d}  "
+              f"reintentos: {total(metricas.whatsapp_reintentos) - reintentos_antes:5d}  "
+              f"limitados: {total(metricas.whatsapp_limitados) - limitados_antes:5d}  perdidos: {len(errores)}")
+
+
+if __name__ == "__main__":
+    main()
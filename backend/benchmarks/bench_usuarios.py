@@ -0,0 +1,94 @@
+"""
+Pico de memoria (RSS) de GET /usuarios con muchos usuarios: la versión anterior
+(Usuario.query.all() + jsonify) contra el stream en array JSON y en NDJSON.
+Cada modo corre en un proceso aparte para que el pico de uno no tape al otro.
+
+    python -m benchmarks.bench_usuarios [--usuarios 500000]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+os.environ.setdefault("WHATSAPP_TRANSPORTE", "falso")
+os.environ.setdefault("OUTBOX_EN_PROCESO", "0")
+
+MODOS = ("lista_completa", "stream_array", "stream_ndjson")
+
+
+def pico_rss_mb():
+    # ru_maxrss está en KB en Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def sembrar(cantidad, lote=10000):
+    import app as backend
+    from api.models import db, Usuario
+
+    with backend.app.app_context():
+        db.create_all()
+        if db.session.query(Usuario.idUsuario).limit(1).first():
+            return
+        for inicio in range(0, cantidad, lote):
+            db.session.execute(db.insert(Usuario), [
+                {"nombre": f"Usuario {i}", "email": f"u{i}@bench.com", "clave": "x", "telefono": f"+{10**9 + i}"}
+                for i in range(inicio, min(inicio + lote, cantidad))
+            ])
+        db.session.commit()
+
+
+def correr_modo(modo):
+    import app as backend
+    from flask import jsonify
+    from api.models import Usuario
+
+    base = pico_rss_mb()
+    inicio = time.perf_counter()
+    bytes_totales = 0
+    if modo == "lista_completa":
+        with backend.app.test_request_context():
+            respuesta = jsonify([u.serialize() for u in Usuario.query.all()])
+            bytes_totales = len(respuesta.get_data())
+    else:
+        url = "/usuarios?formato=ndjson" if modo == "stream_ndjson" else "/usuarios"
+        respuesta = backend.app.test_client().get(url, buffered=False)
+        for chunk in respuesta.response:
+            bytes_totales += len(chunk)
+        respuesta.close()
+
+    print(json.dumps({
+        "modo": modo,
+        "segundos": round(time.perf_counter() - inicio, 2),
+        "bytes": bytes_totales,
+        "rss_base_mb": base,
+        "rss_pico_mb": pico_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=500000)
+    parser.add_argument("--modo", choices=MODOS)
+    args = parser.parse_args()
+
+    if args.modo:
+        correr_modo(args.modo)
+        return
+
+    sembrar(args.usuarios)
+    print(f"{args.usuarios} usuarios en {os.environ['DATABASE_URL']}")
+    for modo in MODOS:
+        salida = subprocess.run([sys.executable, "-m", "benchmarks.bench_usuarios", "--modo", modo],
+                                capture_output=True, text=True, env=os.environ.copy(), check=True)
+        resultado = json.loads(salida.stdout.strip().splitlines()[-1])
+        print(f"{modo:15s} {resultado['segundos']:7.2f}s  {resultado['bytes'] / 1e6:7.1f} MB de respuesta  "
+              f"RSS pico {resultado['rss_pico_mb']:7.1f} MB (base {resultado['rss_base_mb']} MB)")
+
+
+if __name__ == "__main__":
+    main()
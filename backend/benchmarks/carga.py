@@ -0,0 +1,279 @@
+"""
+Corrida de carga reproducible contra todas las rutas principales, en proceso (test client de Flask).
+
+Siembra N usuarios y M tareas con un generador determinístico, apunta el transporte de Twilio
+a un servidor HTTP local y reemplaza openai_client por un cliente local, ambos con latencia
+configurable, y lanza las peticiones con C hilos concurrentes. Escribe throughput y p50/p95/p99 por ruta en un JSON para comparar commits.
+
+    python -m benchmarks.carga
+    python -m benchmarks.carga --usuarios 500 --tareas 20000 --concurrencia 16 --peticiones 5000 \\
+        --latencia-twilio 0.2 --latencia-openai 1.0 --salida carga.json
+    python -m benchmarks.carga --mezcla "tareas=5,crear_tarea=1,webhook=1"
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, time as hora
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "carga.db"))
+
+ETIQUETAS = ["Personal", "Trabajo", "Estudio", "Hogar", "Salud", "Otros"]
+FECHA_BASE = date(2030, 1, 7)  # fija para que la corrida no dependa del día en que se ejecuta
+DIAS = 56
+
+MENSAJES_WHATSAPP = [
+    "hola",
+    "ver tareas",
+    "2",
+    "mañana a las 10 reunión con el equipo",
+    "dentista el 30/10 a las 16:45",
+    "agendar paseo con el perro mañana a las 10 am",
+    "recordame llamar a mamá el jueves",
+    "cualquier cosa",
+]
+
+MEZCLA_POR_DEFECTO = "login=1,tareas=4,crear_tarea=2,webhook=2,tareas_telefono=2,libres=1,estadisticas=1"
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def resumen(tiempos, errores, duracion):
+    if not tiempos:
+        return {"n": 0, "errores": errores}
+    return {
+        "n": len(tiempos),
+        "errores": errores,
+        "rps": round(len(tiempos) / duracion, 1),
+        "media_ms": round(sum(tiempos) / len(tiempos) * 1000, 3),
+        "p50_ms": round(percentil(tiempos, 0.50) * 1000, 3),
+        "p95_ms": round(percentil(tiempos, 0.95) * 1000, 3),
+        "p99_ms": round(percentil(tiempos, 0.99) * 1000, 3),
+    }
+
+
+def commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+# ---------------------------- Datos sintéticos ----------------------------
+
+def datos_usuario(i):
+    return {"nombre": f"Usuario {i}", "email": f"u{i}@carga.com", "clave": f"clave{i}",
+            "telefono": f"+1555{i:07d}"}
+
+
+def generar_tarea(rng, id_usuario):
+    inicio = rng.randrange(7 * 60, 21 * 60, 15)
+    fin = min(inicio + rng.choice((30, 45, 60, 90, 120)), 23 * 60 + 59)
+    return {
+        "titulo": f"Tarea {rng.randrange(10**6)}",
+        "descripcion": "Generada para la corrida de carga",
+        "imageUrl": "",
+        "fecha": FECHA_BASE + timedelta(days=rng.randrange(DIAS)),
+        "horaInicio": hora(inicio // 60, inicio % 60),
+        "horaFin": hora(fin // 60, fin % 60),
+        "etiqueta": rng.choice(ETIQUETAS),
+        "idUsuario": id_usuario,
+    }
+
+
+def sembrar(backend, usuarios, tareas, semilla, lote=5000):
+    from api.models import db, Usuario, Tarea
+
+    rng = random.Random(semilla)
+    db.create_all()
+    db.session.execute(db.insert(Usuario), [datos_usuario(i) for i in range(usuarios)])
+    ids = db.session.execute(db.select(Usuario.idUsuario).order_by(Usuario.idUsuario)).scalars().all()
+    for inicio in range(0, tareas, lote):
+        db.session.execute(db.insert(Tarea), [generar_tarea(rng, rng.choice(ids))
+                                              for _ in range(inicio, min(inicio + lote, tareas))])
+    db.session.commit()
+    backend.app.test_cli_runner().invoke(args=["recalcular-resumen-semanal"])
+    return ids
+
+
+# ---------------------------- Peticiones ----------------------------
+
+def construir_operaciones(rng, mezcla, cantidad, usuarios):
+    nombres = list(mezcla)
+    pesos = [mezcla[n] for n in nombres]
+    operaciones = []
+    for n in range(cantidad):
+        nombre = rng.choices(nombres, pesos)[0]
+        i = rng.randrange(usuarios)
+        fecha = FECHA_BASE + timedelta(days=rng.randrange(DIAS))
+        operaciones.append((nombre, i, fecha, rng.choice(MENSAJES_WHATSAPP), n))
+    return operaciones
+
+
+def ejecutar(cliente, tokens, operacion):
+    nombre, i, fecha, mensaje, n = operacion
+    usuario = datos_usuario(i)
+    headers = {"Authorization": f"Bearer {tokens[i]}"}
+    fecha_str = fecha.strftime("%Y-%m-%d")
+
+    if nombre == "login":
+        r = cliente.post("/login", json={"email": usuario["email"], "clave": usuario["clave"]})
+    elif nombre == "tareas":
+        r = cliente.get(f"/tareas?desde={fecha_str}&limit=50", headers=headers)
+    elif nombre == "crear_tarea":
+        r = cliente.post("/tarea?permitirSolape=1", headers=headers, json={
+            "titulo": f"Carga {n}", "fecha": fecha_str, "horaInicio": "10:00", "horaFin": "11:00",
+            "etiqueta": ETIQUETAS[n % len(ETIQUETAS)]
+        })
+    elif nombre == "webhook":
+        r = cliente.post("/whatsapp-webhook", data={
+            "From": f"whatsapp:{usuario['telefono']}", "Body": mensaje, "MessageSid": f"SMcarga{n:08d}"
+        })
+    elif nombre == "tareas_telefono":
+        r = cliente.get(f"/usuario/telefono/{usuario['telefono']}/tareas?desde={fecha_str}&limit=50")
+    elif nombre == "libres":
+        r = cliente.get(f"/tareas/libres?fecha={fecha_str}&duracion=60", headers=headers)
+    elif nombre == "estadisticas":
+        r = cliente.get(f"/estadisticas/semana?fecha={fecha_str}", headers=headers)
+    else:
+        raise ValueError(f"Operación desconocida: {nombre}")
+    return r.status_code
+
+
+def esperar_segundo_plano(timeout):
+    """Espera a que el outbox y los mensajes entrantes queden vacíos; devuelve los segundos que tardó."""
+    from api.models import db, MensajeSaliente, MensajeEntrante
+
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < timeout:
+        pendientes = db.session.query(MensajeSaliente).filter(
+            MensajeSaliente.estado.in_(("pendiente", "enviando"))).count()
+        pendientes += db.session.query(MensajeEntrante).filter(
+            MensajeEntrante.estado.in_(("pendiente", "procesando"))).count()
+        db.session.rollback()
+        if not pendientes:
+            return round(time.perf_counter() - inicio, 3)
+        time.sleep(0.1)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=100)
+    parser.add_argument("--tareas", type=int, default=5000)
+    parser.add_argument("--peticiones", type=int, default=2000)
+    parser.add_argument("--calentamiento", type=int, default=100, help="peticiones previas que no se miden")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--latencia-twilio", type=float, default=0.05, help="segundos por mensaje")
+    parser.add_argument("--latencia-openai", type=float, default=0.5, help="segundos por extracción")
+    parser.add_argument("--mezcla", default=MEZCLA_POR_DEFECTO, help="ruta=peso separados por coma")
+    parser.add_argument("--espera-segundo-plano", type=float, default=60)
+    parser.add_argument("--salida", default="resultados_carga.json")
+    args = parser.parse_args()
+
+    mezcla = {nombre: float(peso) for nombre, peso in (p.split("=") for p in args.mezcla.split(","))}
+
+    from benchmarks.falsos import ClienteOpenAIFalso, ServidorTwilioFalso
+
+    # El transporte de WhatsApp sigue siendo el HTTP de Twilio (pool, límite, reintentos),
+    # así el camino del outbox es el mismo que en producción; solo cambia la URL
+    servidor_twilio = ServidorTwilioFalso(args.latencia_twilio).iniciar()
+    os.environ["TWILIO_API_URL"] = servidor_twilio.url
+    os.environ.setdefault("TWILIO_ACCOUNT_SID", "ACcarga")
+    os.environ.setdefault("TWILIO_AUTH_TOKEN", "carga")
+    os.environ.setdefault("WHATSAPP_TRANSPORTE", "twilio")
+
+    import app as backend
+    from flask_jwt_extended import create_access_token
+
+    backend.openai_client = ClienteOpenAIFalso(args.latencia_openai, fecha=FECHA_BASE.strftime("%Y-%m-%d"))
+
+    with backend.app.app_context():
+        inicio = time.perf_counter()
+        ids = sembrar(backend, args.usuarios, args.tareas, args.semilla)
+        segundos_siembra = time.perf_counter() - inicio
+        tokens = [create_access_token(identity=datos_usuario(i)["email"],
+                                      additional_claims={"idUsuario": id_usuario})
+                  for i, id_usuario in enumerate(ids)]
+
+    rng = random.Random(args.semilla)
+    operaciones = construir_operaciones(rng, mezcla, args.calentamiento + args.peticiones, args.usuarios)
+    calentamiento, medidas = operaciones[:args.calentamiento], operaciones[args.calentamiento:]
+
+    locales = threading.local()
+    tiempos = {nombre: [] for nombre in mezcla}
+    errores = {nombre: 0 for nombre in mezcla}
+    lock = threading.Lock()
+
+    def correr(operacion, medir=True):
+        cliente = getattr(locales, "cliente", None)
+        if cliente is None:
+            cliente = locales.cliente = backend.app.test_client()
+        inicio = time.perf_counter()
+        try:
+            status = ejecutar(cliente, tokens, operacion)
+        except Exception:
+            status = None
+        duracion = time.perf_counter() - inicio
+        if not medir:
+            return
+        with lock:
+            if status is None or status >= 400:
+                errores[operacion[0]] += 1
+            else:
+                tiempos[operacion[0]].append(duracion)
+
+    with ThreadPoolExecutor(max_workers=args.concurrencia) as pool:
+        list(pool.map(lambda op: correr(op, medir=False), calentamiento))
+        inicio = time.perf_counter()
+        list(pool.map(correr, medidas))
+        duracion = time.perf_counter() - inicio
+
+    with backend.app.app_context():
+        drenaje = esperar_segundo_plano(args.espera_segundo_plano)
+    backend.despachador.detener()
+    backend.procesador_entrantes.detener()
+    servidor_twilio.detener()
+
+    todos = list(itertools.chain.from_iterable(tiempos.values()))
+    resultado = {
+        "meta": {
+            "commit": commit_actual(),
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "parametros": vars(args),
+            "siembra_s": round(segundos_siembra, 3),
+        },
+        "global": resumen(todos, sum(errores.values()), duracion),
+        "rutas": {nombre: resumen(tiempos[nombre], errores[nombre], duracion) for nombre in mezcla},
+        "segundo_plano": {
+            "drenaje_s": drenaje,
+            "mensajes_twilio": servidor_twilio.enviados,
+            "llamadas_openai": backend.openai_client.llamadas,
+        },
+    }
+    with open(args.salida, "w", encoding="utf-8") as archivo:
+        json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+
+    print(f"{'ruta':16s} {'n':>6s} {'err':>5s} {'rps':>8s} {'p50':>9s} {'p95':>9s} {'p99':>9s}")
+    for nombre, r in [("global", resultado["global"])] + list(resultado["rutas"].items()):
+        if r["n"]:
+            print(f"{nombre:16s} {r['n']:6d} {r['errores']:5d} {r['rps']:8.1f} "
+                  f"{r['p50_ms']:8.2f}ms {r['p95_ms']:8.2f}ms {r['p99_ms']:8.2f}ms")
+    print(f"Resultados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
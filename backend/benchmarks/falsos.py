@@ -0,0 +1,257 @@
+"""
+Clientes locales que reemplazan a twilio_client y openai_client en benchmarks y corridas de carga.
+Tienen la misma forma que los SDK en lo que usa app.py y una latencia configurable.
+ServidorTwilioFalso es un servidor HTTP local con la forma de la API REST de Twilio, para
+probar TransporteTwilioHttp (pool de conexiones, 429, reintentos) sin salir a la red.
+ServidorLLMFalso hace lo mismo con la API de chat de OpenAI/DeepSeek para ProveedorChatHttp.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+
+class ClienteOpenAIFalso:
+    """
+    Imita openai_client.chat.completions.create con una latencia fija. Respeta el timeout=
+    de la llamada como el SDK (espera hasta el plazo y lanza) y con falla=True responde con error.
+    """
+
+    def __init__(self, latencia, fecha="2030-01-01", falla=False):
+        self.latencia = latencia
+        self.fecha = fecha
+        self.falla = falla
+        self.llamadas = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, timeout=None, **kwargs):
+        with self._lock:
+            self.llamadas += 1
+        if timeout is not None and self.latencia > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("Request timed out.")
+        if self.latencia:
+            time.sleep(self.latencia)
+        if self.falla:
+            raise RuntimeError("Error simulado de OpenAI (500)")
+        contenido = json.dumps({"title": "Tarea", "date": self.fecha, "hour": "10:00",
+                                "endHour": "11:00", "category": "Otros", "description": "Tarea"})
+        prompt = kwargs.get("messages", [{}])[0].get("content", "")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=contenido))],
+                               usage=SimpleNamespace(prompt_tokens=len(prompt) // 4,
+                                                     completion_tokens=len(contenido) // 4))
+
+
+class ClienteTwilioFalso:
+    """Imita twilio_client.messages.create; guarda solo la cantidad de mensajes enviados."""
+
+    def __init__(self, latencia):
+        self.latencia = latencia
+        self.enviados = 0
+        self._lock = threading.Lock()
+        self.messages = SimpleNamespace(create=self._create)
+
+    def _create(self, from_=None, to=None, body=None):
+        if self.latencia:
+            time.sleep(self.latencia)
+        with self._lock:
+            self.enviados += 1
+            sid = f"SMfalso{self.enviados:08d}"
+        return SimpleNamespace(sid=sid, to=to, body=body, status="queued")
+
+
+class ServidorTwilioFalso:
+    """
+    POST /2010-04-01/Accounts/<sid>/Messages.json en 127.0.0.1 con un puerto libre.
+    Cuenta mensajes aceptados, conexiones TCP abiertas y respuestas 429. Con 'limite' (mensajes
+    por segundo) responde 429 con Retry-After como Twilio cuando se supera; 'tasa_error' fuerza
+    un porcentaje de 503.
+    """
+
+    def __init__(self, latencia=0.0, limite=None, tasa_error=0.0):
+        self.latencia = latencia
+        self.limite = limite
+        self.tasa_error = tasa_error
+        self.enviados = 0
+        self.conexiones = 0
+        self.rechazados = 0
+        self.errores = 0
+        self.cuerpos = []
+        self._ventana = (0, 0)  # (segundo, mensajes en ese segundo)
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), self._manejador())
+        self._servidor.daemon_threads = True
+        self._hilo = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._servidor.server_address[1]}"
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def _admitir(self):
+        with self._lock:
+            if self.tasa_error and (self.enviados + self.errores + self.rechazados) % int(1 / self.tasa_error) == 0:
+                self.errores += 1
+                return 503
+            segundo = int(time.monotonic())
+            actual, cantidad = self._ventana
+            cantidad = cantidad + 1 if actual == segundo else 1
+            self._ventana = (segundo, cantidad)
+            if self.limite and cantidad > self.limite:
+                self.rechazados += 1
+                return 429
+            self.enviados += 1
+            return 201
+
+    def _manejador(self):
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+            disable_nagle_algorithm = True  # sin esto, cabeceras y cuerpo por separado esperan el ACK diferido
+
+            def setup(self):
+                super().setup()
+                with servidor._lock:
+                    servidor.conexiones += 1
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                largo = int(self.headers.get("Content-Length", 0))
+                datos = parse_qs(self.rfile.read(largo).decode("utf-8"))
+                if not self.path.endswith("/Messages.json") or self.headers.get("Authorization") is None:
+                    return self._responder(404, {"message": "No encontrado"})
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+                status = servidor._admitir()
+                if status == 429:
+                    return self._responder(429, {"code": 20429, "message": "Too Many Requests"}, {"Retry-After": "1"})
+                if status == 503:
+                    return self._responder(503, {"message": "Service Unavailable"})
+                with servidor._lock:
+                    servidor.cuerpos.append((datos.get("To", [""])[0], datos.get("Body", [""])[0]))
+                    sid = f"SMfalso{servidor.enviados:08d}"
+                self._responder(201, {"sid": sid, "status": "queued"})
+
+            def _responder(self, status, cuerpo, headers=None):
+                datos = json.dumps(cuerpo).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                for nombre, valor in (headers or {}).items():
+                    self.send_header(nombre, valor)
+                self.end_headers()
+                self.wfile.write(datos)
+
+        return Manejador
+
+
+class ServidorLLMFalso:
+    """
+    POST /v1/chat/completions en 127.0.0.1 con la forma de la API de OpenAI (y de DeepSeek).
+    Cada pedido tarda 'latencia' segundos, salvo una fracción 'prob_cola' que tarda 'latencia_cola'
+    (la cola lenta que el hedging intenta cortar); 'segundos_por_token' suma tiempo por cada token
+    del prompt, como el prefill de un modelo real. 'tasa_error' responde 500 y 'tasa_invalida'
+    devuelve un contenido que no es JSON. Con 'semilla' la secuencia es reproducible.
+    Los tokens de usage se estiman en 4 caracteres por token.
+    """
+
+    def __init__(self, nombre="llm", latencia=0.05, latencia_cola=0.0, prob_cola=0.0, tasa_error=0.0,
+                 tasa_invalida=0.0, fecha="2030-01-01", semilla=None, segundos_por_token=0.0):
+        self.nombre = nombre
+        self.latencia = latencia
+        self.segundos_por_token = segundos_por_token
+        self.latencia_cola = latencia_cola
+        self.prob_cola = prob_cola
+        self.tasa_error = tasa_error
+        self.tasa_invalida = tasa_invalida
+        self.fecha = fecha
+        self.llamadas = 0
+        self.errores = 0
+        self.invalidas = 0
+        self._azar = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), self._manejador())
+        self._servidor.daemon_threads = True
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._servidor.server_address[1]}/v1/chat/completions"
+
+    def iniciar(self):
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def _sortear(self):
+        """(demora, resultado) del próximo pedido: resultado es 'ok', 'error' o 'invalida'."""
+        with self._lock:
+            self.llamadas += 1
+            demora = self.latencia_cola if self._azar.random() < self.prob_cola else self.latencia
+            sorteo = self._azar.random()
+            if sorteo < self.tasa_error:
+                self.errores += 1
+                return demora, 'error'
+            if sorteo < self.tasa_error + self.tasa_invalida:
+                self.invalidas += 1
+                return demora, 'invalida'
+            return demora, 'ok'
+
+    def _manejador(self):
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                pedido = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.endswith("/chat/completions") or self.headers.get("Authorization") is None:
+                    return self._responder(404, {"error": {"message": "No encontrado"}})
+                prompt = pedido.get("messages", [{}])[0].get("content", "")
+                demora, resultado = servidor._sortear()
+                time.sleep(demora + len(prompt) // 4 * servidor.segundos_por_token)
+                if resultado == 'error':
+                    return self._responder(500, {"error": {"message": f"Error simulado de {servidor.nombre}"}})
+                contenido = "Perdón, no entendí la tarea." if resultado == 'invalida' else json.dumps({
+                    "title": "Tarea", "date": servidor.fecha, "hour": "10:00", "endHour": "11:00",
+                    "category": "Otros", "description": "Tarea"})
+                self._responder(200, {
+                    "id": f"chatcmpl-{servidor.nombre}-{servidor.llamadas}",
+                    "object": "chat.completion",
+                    "model": pedido.get("model"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": contenido}}],
+                    "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(contenido) // 4,
+                              "total_tokens": (len(prompt) + len(contenido)) // 4}
+                })
+
+            def _responder(self, status, cuerpo):
+                datos = json.dumps(cuerpo).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+        return Manejador
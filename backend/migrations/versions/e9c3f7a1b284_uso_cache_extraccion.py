@@ -0,0 +1,34 @@
+"""columna usado en cache_extraccion (desalojo LRU)
+
+Revision ID: e9c3f7a1b284
+Revises: d7e2a4c9f150
+Create Date: 2026-10-18 21:40:05.731962
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9c3f7a1b284'
+down_revision = 'd7e2a4c9f150'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # La columna se agrega nullable, se completa con 'creado' y recién ahí pasa a NOT NULL
+    with op.batch_alter_table('cache_extraccion', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('usado', sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE cache_extraccion SET usado = creado")
+
+    with op.batch_alter_table('cache_extraccion', schema=None) as batch_op:
+        batch_op.alter_column('usado', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_index(batch_op.f('ix_cache_extraccion_usado'), ['usado'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('cache_extraccion', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_cache_extraccion_usado'))
+        batch_op.drop_column('usado')